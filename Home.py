@@ -94,7 +94,7 @@ def fetch_upcoming_events():
         return []
     return []
 
-from auth_utils import init_auth, login_form, render_sidebar
+from auth_utils import init_auth, login_form, render_sidebar, check_permission
 
 def main():
     """Main application page"""
@@ -139,11 +139,24 @@ def main():
             st.metric("Total Groups", len(groups))
         
         with status_col3:
-            # Fetch document and chunk counts
-            client = SupabaseClient.get_client()
-            doc_count = client.table("documents").select("id", count="exact").execute().count
-            chunk_count = client.table("embeddings").select("id", count="exact").execute().count
+            # Document and chunk totals (maintained corpus_stats rows, no table scans)
+            from embedding_service import EmbeddingService
+            totals = EmbeddingService.totals()
+            doc_count = totals.get('document', {}).get('sources', 0)
+            chunk_count = sum(t['chunks'] for t in totals.values())
             st.metric("Docs / Chunks", f"{doc_count} / {chunk_count}")
+            
+            # Exact recount on demand (full scans, admins only)
+            if check_permission('admin'):
+                if st.button("🔄 Recount", help="Recount documents and chunks exactly (full scan)"):
+                    with st.spinner("Recounting..."):
+                        stats = SupabaseClient.refresh_corpus_stats()
+                    EmbeddingService.invalidate_coverage([])  # drops the cached totals only
+                    refreshed = max((row.get('refreshed_at') or '' for row in stats), default='')
+                    st.session_state['corpus_recounted_at'] = refreshed[:19].replace('T', ' ')
+                    st.rerun()  # redraw the metrics above with the new totals
+                if st.session_state.get('corpus_recounted_at'):
+                    st.caption(f"Recounted at {st.session_state['corpus_recounted_at']}")
         
     except Exception as e:
         st.error(f"⚠️ System Error: {str(e)}")
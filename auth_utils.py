@@ -8,15 +8,13 @@ import datetime
 from supabase_client import SupabaseClient
 from config import Config
 
-import extra_streamlit_components as stx
-
 # Initialize Cookie Manager (Cached to avoid reloading)
 @st.cache_resource
 def get_manager():
+    # Imported on first use: only needed to restore, set or clear the login cookie
+    import extra_streamlit_components as stx
     return stx.CookieManager()
 
-cookie_manager = get_manager()
-
 def init_auth():
     """Initialize session state for auth and check persistence"""
     if 'authenticated' not in st.session_state:
@@ -32,7 +30,7 @@ def init_auth():
             # We store the user ID in the cookie. 
             # SECURITY NOTE: In a real prod app, use a secure session token, not just ID.
             # For this internal tool, we'll accept the risk for convenience as requested.
-            user_id = cookie_manager.get('wp29_auth_user')
+            user_id = get_manager().get('wp29_auth_user')
             
             if user_id:
                 # Valid cookie found, attempt auto-login logic
@@ -40,22 +38,14 @@ def init_auth():
                 # (Note: Supabase client normally needs a full session, 
                 # but we'll re-use the service role or anon key to just get the profile/role)
                 
-                # Verify user exists and get role
-                role = SupabaseClient.get_user_role(user_id)
+                # Verify user exists and get role + email (cached per user id)
+                profile = SupabaseClient.get_user_profile(user_id)
                 
-                if role: # If we successfully got a role, the user ID is valid
+                if profile: # If we found a profile, the user ID is valid
                     # Mock a user object since we don't have the full supabase session object from just an ID
                     # Ideally we would use a Refresh Token, but Streamlit cookies are simpler this way for now.
-                    
-                    # Fetch email for display
-                    client = SupabaseClient.get_client()
-                    # We can't easily get the email from just ID without admin rights in some setups,
-                    # but let's try reading our 'profiles' table which we control.
-                    profile = client.table('profiles').select('email').eq('id', user_id).execute()
-                    
-                    email = "Persistent User"
-                    if profile.data:
-                        email = profile.data[0].get('email', email)
+                    role = profile.get('role') or 'basic'
+                    email = profile.get('email') or "Persistent User"
                         
                     class MockUser:
                         def __init__(self, id, email):
@@ -69,6 +59,15 @@ def init_auth():
         except Exception as e:
             # Cookie invalid or other error
             print(f"Auth persistence error: {e}")
+    else:
+        # Pick up role changes (cached lookup, no round-trip on page navigation)
+        try:
+            user = st.session_state.get('user')
+            profile = SupabaseClient.get_user_profile(user.id) if user is not None else None
+            if profile and profile.get('role'):
+                st.session_state['role'] = profile['role']
+        except Exception as e:
+            print(f"Auth role refresh error: {e}")
 
 def login_form():
     """Display the login form"""
@@ -101,7 +100,8 @@ def login_form():
             
             with st.spinner("Authenticating..."):
                 try:
-                    client = SupabaseClient.get_client()
+                    # This session's own client: the sign-in must not change other users' auth
+                    client = SupabaseClient.get_session_client()
                     auth_response = client.auth.sign_in_with_password({
                         "email": email,
                         "password": password
@@ -121,6 +121,7 @@ def login_form():
                         st.rerun()
                         
                 except Exception as e:
+                    SupabaseClient.release_session_client(sign_out=False)
                     st.error(f"Login failed: {str(e)}")
 
 def render_sidebar():
@@ -145,11 +146,10 @@ def render_sidebar():
             st.markdown(f"**Role**: `{role.upper()}`")
             
             if st.button("Log Out", use_container_width=True):
-                client = SupabaseClient.get_client()
-                client.auth.sign_out()
+                SupabaseClient.release_session_client()
                 
                 # Clear persistence cookie
-                cookie_manager.delete('wp29_auth_user')
+                get_manager().delete('wp29_auth_user')
                 
                 st.session_state['authenticated'] = False
                 st.session_state['user'] = None
@@ -225,7 +225,8 @@ def login_form():
             
             with st.spinner("Authenticating..."):
                 try:
-                    client = SupabaseClient.get_client()
+                    # This session's own client: the sign-in must not change other users' auth
+                    client = SupabaseClient.get_session_client()
                     auth_response = client.auth.sign_in_with_password({
                         "email": email,
                         "password": password
@@ -241,13 +242,14 @@ def login_form():
                         st.session_state['role'] = role
                         
                         # SET PERSISTENCE COOKIE (Expires in 30 days)
-                        cookie_manager.set('wp29_auth_user', user_id, expires_at=datetime.datetime.now() + datetime.timedelta(days=30))
+                        get_manager().set('wp29_auth_user', user_id, expires_at=datetime.datetime.now() + datetime.timedelta(days=30))
                         
                         st.success(f"Welcome back! ({role})")
                         time.sleep(1)
                         st.rerun()
                         
                 except Exception as e:
+                    SupabaseClient.release_session_client(sign_out=False)
                     st.error(f"Login failed: {str(e)}")
 
 def require_auth():
@@ -0,0 +1,66 @@
+"""
+Backfill documents.content_sha256 (init_content_hash.sql) for documents
+ingested before duplicate detection, and list duplicate uploads found
+
+Files are not moved: existing file_url paths stay valid.
+
+Usage: python backfill_content_hashes.py [batch_size]
+"""
+import hashlib
+import sys
+from collections import defaultdict
+from supabase_client import SupabaseClient
+
+BATCH = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+client = SupabaseClient.get_client()
+
+print("=" * 70)
+print("BACKFILL DOCUMENT CONTENT HASHES")
+print("=" * 70)
+
+hashed = 0
+failed = set()
+while True:
+    query = client.table("documents").select("id, symbol, file_url") \
+        .is_("content_sha256", "null").not_.is_("file_url", "null")
+    if failed:
+        query = query.not_.in_("id", list(failed))
+    docs = query.order("id").limit(BATCH).execute().data or []
+    if not docs:
+        break
+
+    for doc in docs:
+        try:
+            pdf_bytes = SupabaseClient.download_file(SupabaseClient._storage_path(doc['file_url']))
+            digest = hashlib.sha256(pdf_bytes).hexdigest()
+            client.table("documents").update({"content_sha256": digest}).eq("id", doc['id']).execute()
+            hashed += 1
+            print(f"  [OK] {doc['symbol']}: {digest[:12]}")
+        except Exception as e:
+            failed.add(doc['id'])
+            print(f"  [FAIL] {doc['symbol']}: {e}")
+
+# Duplicate content already in the archive
+groups = defaultdict(list)
+after = ""
+while True:
+    rows = client.table("documents").select("id, symbol, content_sha256") \
+        .not_.is_("content_sha256", "null").gt("id", after or "00000000-0000-0000-0000-000000000000") \
+        .order("id").limit(1000).execute().data or []
+    if not rows:
+        break
+    for row in rows:
+        groups[row['content_sha256']].append(row['symbol'])
+    after = rows[-1]['id']
+
+duplicates = {h: symbols for h, symbols in groups.items() if len(symbols) > 1}
+
+print(f"\n{'='*70}")
+print(f"SUMMARY")
+print(f"{'='*70}")
+print(f"Hashed: {hashed}")
+print(f"Failed (missing file?): {len(failed)}")
+print(f"Duplicate content sets: {len(duplicates)}")
+for digest, symbols in list(duplicates.items())[:50]:
+    print(f"  {digest[:12]}: {', '.join(symbols)}")
@@ -0,0 +1,84 @@
+-- Benchmark: document search and pagination at 100k rows (ILIKE scan vs indexed search_documents_ranked)
+-- Run this in Supabase SQL Editor AFTER init_document_search.sql and init_document_keyset.sql
+--
+-- Everything runs inside one transaction and is rolled back at the end,
+-- so no benchmark data is left behind. Compare the "Execution Time" lines
+-- of the EXPLAIN ANALYZE outputs.
+
+BEGIN;
+
+-- 1. Seed: one group, 50 sessions, 100k documents
+INSERT INTO groups (id, full_name, type)
+VALUES ('BENCH', 'Benchmark Group', 'GR');
+
+INSERT INTO sessions (group_id, code, year)
+SELECT 'BENCH', 'B' || g, 2000 + (g % 25)
+FROM generate_series(1, 50) g;
+
+INSERT INTO documents (session_id, symbol, title, author, doc_type, regulation_mentioned, created_at)
+SELECT
+    (SELECT id FROM sessions WHERE group_id = 'BENCH' AND code = 'B' || (1 + g % 50)),
+    'ECE/TRANS/WP.29/BENCH/' || (2000 + g % 25) || '/' || g,
+    (ARRAY['Proposal for amendments to', 'Report on', 'Draft corrigendum to', 'Interpretation of'])[1 + g % 4]
+        || ' UN Regulation No. ' || (1 + g % 160)
+        || (ARRAY[' (Lighting)', ' (Electromagnetic compatibility)', ' (Headlamps)', ' (Braking)'])[1 + g % 4],
+    (ARRAY['Italy', 'Germany', 'OICA', 'CLEPA', 'France', 'Japan'])[1 + g % 6],
+    (ARRAY['Formal', 'Informal', 'Report', 'Agenda'])[1 + g % 4],
+    'R' || (1 + g % 160) || ', R' || (1 + (g * 7) % 160),
+    NOW() - (g || ' minutes')::interval
+FROM generate_series(1, 100000) g;
+
+ANALYZE documents;
+ANALYZE sessions;
+
+-- 2. Baseline: the old four-column ILIKE (page + separate count, as the page used to do)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT d.*, s.group_id, s.code, s.year
+FROM documents d
+JOIN sessions s ON s.id = d.session_id
+WHERE d.symbol ILIKE '%Headlamps%' OR d.title ILIKE '%Headlamps%'
+   OR d.author ILIKE '%Headlamps%' OR d.regulation_mentioned ILIKE '%Headlamps%'
+ORDER BY d.created_at DESC
+LIMIT 50 OFFSET 0;
+
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT count(*)
+FROM documents d
+JOIN sessions s ON s.id = d.session_id
+WHERE d.symbol ILIKE '%Headlamps%' OR d.title ILIKE '%Headlamps%'
+   OR d.author ILIKE '%Headlamps%' OR d.regulation_mentioned ILIKE '%Headlamps%';
+
+-- 3. Indexed search: ranked page + total count in one call
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_documents_ranked(p_search_text => 'Headlamps', p_limit => 50);
+
+-- Short code lookup (trigram path)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_documents_ranked(p_search_text => 'R48', p_limit => 50);
+
+-- Search combined with filters
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_documents_ranked(p_search_text => 'braking', p_group_id => 'BENCH', p_year => 2010, p_limit => 50);
+
+-- 4. Deep pages (init_document_keyset.sql): page 200 with OFFSET vs keyset cursor
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT d.*, s.group_id, s.code, s.year
+FROM documents d
+JOIN sessions s ON s.id = d.session_id
+ORDER BY d.created_at DESC, d.id DESC
+LIMIT 50 OFFSET 9950;
+
+-- Cursor = last row of page 199
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_documents_ranked(
+    p_limit => 50,
+    p_cursor_created_at => (SELECT created_at FROM documents ORDER BY created_at DESC, id DESC OFFSET 9949 LIMIT 1),
+    p_cursor_id => (SELECT id FROM documents ORDER BY created_at DESC, id DESC OFFSET 9949 LIMIT 1),
+    p_with_count => false
+);
+
+-- Same call for page 1, for comparison
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_documents_ranked(p_limit => 50, p_with_count => false);
+
+ROLLBACK;
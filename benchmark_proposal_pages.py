@@ -0,0 +1,92 @@
+"""
+Benchmark: page-range pre-pass of the adopted proposals scan
+
+Shows which pages ProposalExtractor would send to Gemini and how much smaller
+the upload gets, for local PDFs (e.g. downloaded WP.29 session reports).
+Without arguments a synthetic 60-page report with a 3-page proposals table is
+used; some of its prose pages mention "adopted proposals" and Regulation
+numbers and must not be selected.
+
+Usage: python benchmark_proposal_pages.py [report.pdf ...]
+"""
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+from config import Config
+from extract_proposals import ProposalExtractor
+
+
+PROSE_PAGES = (5, 12, 27, 33)  # discussion pages quoting adopted proposals and Regulation numbers
+
+
+def synthetic_report(pages=60, table_at=41):
+    """
+    A long report whose adopted proposals table spans pages table_at..table_at+2
+    (1-based); PROSE_PAGES discuss adopted proposals in running text
+    """
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        if number in PROSE_PAGES:
+            # Two row patterns each: Regulation numbers plus series of amendments or document symbols
+            reference = ("the 05 series of amendments" if number % 2 else f"ECE/TRANS/WP.29/2025/{number}")
+            lines = [f"Paragraph {number}. The World Forum recalled the adopted proposals for UN Regulation No. {number + 40}",
+                     f"and Regulation No. {number + 41}, and invited GRE to review Regulation No. {number + 42} and",
+                     f"Regulation No. {number + 43} together with {reference} at its next session."] * 3
+        elif number == table_at:
+            lines = ["Annex III", "Situation of entry into force of the proposals adopted by AC.1",
+                     "Regulation   Document   Series / Supplement   Entry into force"]
+        elif table_at < number <= table_at + 2:
+            lines = []
+        else:
+            lines = [f"Paragraph {number}. The World Forum discussed the agenda item and agreed to resume "
+                     "consideration at its next session."] * 8
+        if table_at <= number <= table_at + 2:
+            for row in range(12):
+                reg = 48 + row + number
+                lines.append(f"UN Regulation No. {reg}   ECE/TRANS/WP.29/2025/{row + number}   "
+                             f"0{row % 9} series of amendments, Supplement {row + 1}   [26.09.2025]")
+        y = 72
+        for line in lines:
+            page.insert_text((50, y), line, fontsize=9)
+            y += 14
+    data = doc.tobytes()
+    doc.close()
+    return "synthetic report", data, set(range(table_at - 1, table_at + 2))
+
+
+def main():
+    reports = []
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            reports.append((path, f.read(), None))
+    if not reports:
+        reports.append(synthetic_report())
+
+    print("=" * 70)
+    print(f"PROPOSAL PAGE PRE-PASS (min score {Config.PROPOSAL_PAGE_MIN_SCORE}, input {Config.PROPOSAL_INPUT})")
+    print("=" * 70)
+
+    for name, data, expected in reports:
+        start = time.perf_counter()
+        prepared = ProposalExtractor.prepare_input(data)
+        elapsed = time.perf_counter() - start
+        ratio = prepared['bytes_out'] / prepared['bytes_in'] if prepared['bytes_in'] else 1.0
+        print(f"\n{name}")
+        print(f"  Pages sent : {ProposalExtractor.page_ranges(prepared['pages'])} "
+              f"({len(prepared['pages'])} of {prepared['page_count']})")
+        print(f"  Size       : {prepared['bytes_out'] / 1024:.0f} KB of {prepared['bytes_in'] / 1024:.0f} KB "
+              f"({ratio:.0%})")
+        print(f"  Pre-pass   : {elapsed * 1000:.0f} ms")
+        if expected is not None:
+            extra = sorted(set(prepared['pages']) - expected)
+            missed = sorted(expected - set(prepared['pages']))
+            print(f"  Expected   : {ProposalExtractor.page_ranges(sorted(expected))} "
+                  f"({'OK' if not missed else 'missed ' + ProposalExtractor.page_ranges(missed)}"
+                  f"{', extra ' + ProposalExtractor.page_ranges(extra) if extra else ''})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: Regulation Library explorer data loading per render
+
+Compares the old loader (get_all_regulations + one get_regulation_versions
+call per regulation) with the single nested select used by the page now.
+Run against a live Supabase project: python benchmark_regulation_library.py [renders]
+"""
+import sys
+import time
+import statistics
+
+from supabase_client import SupabaseClient
+
+RENDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+
+def load_n_plus_one():
+    """Old explorer: one request for regulations, one per regulation for versions"""
+    client = SupabaseClient.get_client()
+    regulations = client.table("regulations").select("*").execute().data
+    for reg in regulations:
+        reg['regulation_versions'] = SupabaseClient.get_regulation_versions(reg['id'])
+    return regulations
+
+
+def load_nested():
+    """New explorer: one nested select, bypassing the process cache"""
+    SupabaseClient.invalidate_cache("regulations:versions")
+    return SupabaseClient.get_regulations_with_versions()
+
+
+def load_cached():
+    """New explorer on a warm process cache (typical rerun)"""
+    return SupabaseClient.get_regulations_with_versions()
+
+
+def bench(name, loader):
+    timings = []
+    result = []
+    for _ in range(RENDERS):
+        start = time.perf_counter()
+        result = loader()
+        timings.append((time.perf_counter() - start) * 1000)
+    versions = sum(len(r.get('regulation_versions') or []) for r in result)
+    print(f"{name:<14} regs={len(result):<4} versions={versions:<5} "
+          f"median={statistics.median(timings):8.1f} ms  max={max(timings):8.1f} ms")
+    return result
+
+
+print("=" * 70)
+print(f"REGULATION LIBRARY LOAD BENCHMARK ({RENDERS} renders each)")
+print("=" * 70)
+
+try:
+    old = bench("N+1", load_n_plus_one)
+    new = bench("nested", load_nested)
+    bench("nested cached", load_cached)
+
+    # Both loaders must return the same versions per regulation
+    old_map = {r['id']: sorted(v['id'] for v in r['regulation_versions']) for r in old}
+    new_map = {r['id']: sorted(v['id'] for v in r.get('regulation_versions') or []) for r in new}
+    print(f"\nSame data: {'✅ Yes' if old_map == new_map else '❌ No'}")
+
+except Exception as e:
+    print(f"ERROR: {e}")
+    import traceback
+    traceback.print_exc()
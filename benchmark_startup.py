@@ -0,0 +1,101 @@
+"""
+Benchmark: cold-start import time of Home.py and each page
+
+Runs the module-level imports of every app script in a fresh interpreter
+(what Streamlit pays the first time a page is opened in a new server process)
+and fails if a script exceeds the budget. The budget applies to the time on
+top of the bare `import streamlit` baseline, which no page can avoid.
+
+Usage: python benchmark_startup.py [--budget SECONDS] [--runs N] [--importtime]
+  --importtime  also print the 10 slowest modules of each script (python -X importtime)
+"""
+import argparse
+import ast
+import glob
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ["Home.py"] + sorted(glob.glob("pages/*.py", root_dir=ROOT))
+
+
+def top_level_imports(path):
+    """Module-level import statements of a script (imports inside functions/branches are lazy)"""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def time_imports(code, runs, importtime=False):
+    """Median wall time of running code in a fresh interpreter (and the -X importtime log of the last run)"""
+    timer = ("import time as _t\n_s = _t.perf_counter()\n" + code +
+             "\nprint('__elapsed__', _t.perf_counter() - _s)")
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", timer]
+    timings = []
+    stderr = ""
+    for _ in range(runs):
+        proc = subprocess.run(args, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+        elapsed = [line for line in proc.stdout.splitlines() if line.startswith("__elapsed__")]
+        timings.append(float(elapsed[-1].split()[1]))
+        stderr = proc.stderr
+    return statistics.median(timings), stderr
+
+
+def slowest_modules(importtime_log, top=10):
+    """Parse `python -X importtime` output into (cumulative_us, module), slowest first"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=float,
+                        default=float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0")),
+                        help="max import seconds per script above the streamlit baseline")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--importtime", action="store_true")
+    opts = parser.parse_args()
+
+    print("=" * 70)
+    print(f"STARTUP IMPORT BENCHMARK (budget {opts.budget:.2f}s over baseline, median of {opts.runs})")
+    print("=" * 70)
+
+    baseline, _ = time_imports("import streamlit", opts.runs)
+    print(f"\nBaseline (import streamlit): {baseline:.3f}s\n")
+
+    failures = []
+    for script in SCRIPTS:
+        try:
+            elapsed, log = time_imports(top_level_imports(script), opts.runs, opts.importtime)
+        except RuntimeError as e:
+            print(f"  [ERROR] {script}: {e}")
+            failures.append(script)
+            continue
+        extra = max(elapsed - baseline, 0.0)
+        status = "OK" if extra <= opts.budget else "OVER"
+        if status == "OVER":
+            failures.append(script)
+        print(f"  [{status:<4}] {script:<40} {elapsed:6.3f}s  (+{extra:.3f}s)")
+        if opts.importtime:
+            for cumulative, module in slowest_modules(log):
+                print(f"           {cumulative / 1e6:6.3f}s  {module}")
+
+    print(f"\n{'='*70}")
+    if failures:
+        print(f"❌ {len(failures)} script(s) over budget or failing: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"✅ All {len(SCRIPTS)} scripts within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-"""Check for orphaned files in storage"""
+"""Check for orphaned files in storage (one folder; reconcile_storage.py checks whole buckets)"""
 from supabase_client import SupabaseClient
 
 client = SupabaseClient.get_client()
@@ -1,4 +1,5 @@
 -- CLEAN ORPHANED EMBEDDINGS
+-- (reconcile_storage.py --check embeddings does this in batches, also for regulations)
 -- Some embeddings may have been left behind when interpretations were deleted
 -- before the cascading delete logic was implemented properly.
 -- These "ghost" embeddings appear in search but point to nothing (Unknown Source).
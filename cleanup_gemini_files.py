@@ -0,0 +1,28 @@
+"""
+Delete Gemini File API uploads made by the proposals scan
+
+Default: drop expired registry entries (and their remote files).
+  --orphans  also delete remote files unknown to the registry and older than
+             GEMINI_FILE_TTL (leaked by older scans; newer ones may be another host's)
+  --all      delete every registered upload
+
+Usage: python cleanup_gemini_files.py [--orphans] [--all]
+"""
+import sys
+from gemini_files import GeminiFileRegistry
+
+registry = GeminiFileRegistry.default()
+
+print("=" * 70)
+print("GEMINI FILE API CLEANUP")
+print("=" * 70)
+print(f"\nRegistry: {registry.path} ({len(registry.entries())} entries)")
+
+result = registry.cleanup(delete_all="--all" in sys.argv, orphans="--orphans" in sys.argv)
+
+print(f"\n{'='*70}")
+print(f"SUMMARY")
+print(f"{'='*70}")
+print(f"Remote files deleted: {result['deleted']}")
+print(f"Registry entries removed: {result['dropped']}")
+print(f"Registry entries left: {len(registry.entries())}")
@@ -1,4 +1,4 @@
-"""Cleanup orphaned files from storage"""
+"""Cleanup orphaned files from storage (hard-coded list; see reconcile_storage.py --delete)"""
 from supabase_client import SupabaseClient
 from config import Config
 
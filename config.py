@@ -22,12 +22,55 @@ class Config:
     # Storage
     STORAGE_BUCKET = "unece-archive"
     CHUNKS_CACHE_BUCKET = "chunks_cache"  # For storing chunk JSON files
+    STORAGE_CLEANUP_MAX_ATTEMPTS = int(os.getenv("STORAGE_CLEANUP_MAX_ATTEMPTS", "5"))  # queued removals, then left for inspection
+    
+    # Reference-data cache (groups, sessions, issuers, regulations)
+    REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "600"))  # seconds
+    REFERENCE_CACHE_VERSION_POLL = float(os.getenv("REFERENCE_CACHE_VERSION_POLL", "5"))  # seconds
+    PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))  # seconds, user id -> role/email
+    
+    # Shared HTTP connection pool (Supabase clients)
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # max open connections
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))  # seconds an idle connection is kept
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))  # seconds (large uploads)
+    HTTP2 = os.getenv("HTTP2", "true").lower() == "true"
+    
+    # Per-session Supabase clients (signed-in users)
+    CLIENT_POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", "100"))  # max signed-in sessions kept
+    CLIENT_POOL_IDLE_TTL = float(os.getenv("CLIENT_POOL_IDLE_TTL", "3600"))  # seconds before an idle client is dropped
     
     # AI Models (Gemini 2.x)
     GEMINI_FLASH_MODEL = "models/gemini-2.0-flash"
     GEMINI_PRO_MODEL = "models/gemini-2.5-pro"
     GEMINI_EMBEDDING_MODEL = "models/embedding-001"
     
+    # Report Generator: parallel per-regulation sections
+    REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "4"))  # Gemini calls in flight
+    REPORT_SECTION_RETRIES = int(os.getenv("REPORT_SECTION_RETRIES", "2"))  # extra attempts per section
+    REPORT_EXPORT_CONCURRENCY = int(os.getenv("REPORT_EXPORT_CONCURRENCY", "2"))  # sessions exported in parallel
+    
+    # Per-document summaries (map step of the reports)
+    DOC_SUMMARY_MAX_CHARS = int(os.getenv("DOC_SUMMARY_MAX_CHARS", "60000"))  # PDF text sent per document
+    DOC_SUMMARY_CONCURRENCY = int(os.getenv("DOC_SUMMARY_CONCURRENCY", "4"))
+    DOC_SUMMARY_MAX_ATTEMPTS = int(os.getenv("DOC_SUMMARY_MAX_ATTEMPTS", "3"))  # then the backfill skips the document
+    
+    # Adopted proposals scan: only the pages with the proposals table are sent to Gemini
+    PROPOSAL_INPUT = os.getenv("PROPOSAL_INPUT", "pdf")  # "pdf" (sliced PDF) or "text" (page text only)
+    PROPOSAL_PAGE_MIN_SCORE = int(os.getenv("PROPOSAL_PAGE_MIN_SCORE", "6"))  # plus a header or three row patterns
+    PROPOSAL_INLINE_MAX_BYTES = int(os.getenv("PROPOSAL_INLINE_MAX_BYTES", str(15 * 1024 * 1024)))  # else File API
+    PROPOSAL_SCAN_CONCURRENCY = int(os.getenv("PROPOSAL_SCAN_CONCURRENCY", "3"))  # batch scanner workers
+    PROPOSAL_SCAN_RPM = int(os.getenv("PROPOSAL_SCAN_RPM", "10"))  # Gemini requests per minute (quota)
+    PROPOSAL_SCAN_MAX_ATTEMPTS = int(os.getenv("PROPOSAL_SCAN_MAX_ATTEMPTS", "3"))
+    PROPOSAL_SCAN_RUNNING_TIMEOUT = int(os.getenv("PROPOSAL_SCAN_RUNNING_TIMEOUT", "30"))  # minutes before a 'running' scan is retaken
+    
+    # Gemini File API uploads, reused by content hash (gemini_files.py)
+    GEMINI_FILE_REGISTRY = os.getenv("GEMINI_FILE_REGISTRY", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".gemini_files.json"))
+    GEMINI_FILE_TTL = int(os.getenv("GEMINI_FILE_TTL", str(46 * 3600)))  # the API deletes files after 48h
+    
+    # Storage / database reconciliation (reconcile_storage.py)
+    RECONCILE_PAGE_SIZE = int(os.getenv("RECONCILE_PAGE_SIZE", "1000"))  # rows per stream page
+    RECONCILE_MIN_AGE_HOURS = float(os.getenv("RECONCILE_MIN_AGE_HOURS", "24"))  # newer orphans may be uploads in progress
+    
     # App Version
     APP_VERSION = "1.2.0"
     APP_DATE = "2026-01-15"
@@ -51,5 +94,5 @@ class Config:
         
         return True
 
-# Validate on import
-Config.validate()
+# Validated on first use (SupabaseClient.get_client, gemini_client.get_genai)
+# rather than on import, so pages and tools that never reach them start faster
@@ -2,7 +2,10 @@
 Embedding service for RAG (Retrieval Augmented Generation)
 Handles embedding generation and vector search
 """
-from typing import List, Dict, Optional
+import asyncio
+import threading
+import time
+from typing import List, Dict, Optional, Iterable
 from gemini_client import GeminiClient
 from supabase_client import SupabaseClient
 from pdf_processor import PDFProcessor
@@ -10,6 +13,12 @@ from pdf_processor import PDFProcessor
 class EmbeddingService:
     """Service for managing embeddings and vector search"""
     
+    # Short-lived coverage cache: (source_type, source_id) -> (loaded_at, chunk_count)
+    COVERAGE_TTL = 30  # seconds
+    _coverage_cache: Dict[tuple, tuple] = {}
+    _totals_cache: Optional[tuple] = None
+    _coverage_lock = threading.Lock()
+    
     @staticmethod
     def generate_document_embeddings(document_id: str, pdf_bytes: bytes, 
                                      doc_type: str, progress_callback=None) -> int:
@@ -112,6 +121,7 @@ class EmbeddingService:
         
         log_message(f"=== Finished: {embeddings_created} embeddings created ===\n")
         
+        EmbeddingService.invalidate_coverage([document_id], "document")
         return embeddings_created
     
     @staticmethod
@@ -156,43 +166,167 @@ class EmbeddingService:
             except Exception as e:
                 print(f"Error storing regulation embedding: {e}")
         
+        EmbeddingService.invalidate_coverage([regulation_version_id], "regulation")
         return embeddings_created
     
     @staticmethod
-    def search_with_reranking(query: str, limit: int = 10) -> List[Dict]:
+    def search_with_reranking(query: str, limit: int = 10, enrich: bool = False,
+                              trace: Optional[Dict] = None) -> List[Dict]:
         """
         Search embeddings with authority-based re-ranking
         
-        1. Generate query embedding
+        1. Optimize query (while speculatively embedding the raw query)
         2. Find similar vectors
         3. Re-rank by authority_level
+        4. Fetch chunk content (while enriching/signing sources if enrich=True)
+        
+        Independent stages run concurrently, see _search_pipeline.
+        If a trace dict is given it receives 'search_query' and per-stage
+        'timings' in seconds.
         
         Returns list of chunks with metadata
         """
+        # Bound to the caller's session: asyncio.to_thread copies the context into
+        # the stage threads, so signed-in users keep their RLS view (private interpretations)
+        return SupabaseClient.bind_session(asyncio.run)(
+            EmbeddingService._search_pipeline(query, limit, enrich, trace)
+        )
+    
+    @staticmethod
+    async def _search_pipeline(query: str, limit: int, enrich: bool,
+                               trace: Optional[Dict]) -> List[Dict]:
+        """Asyncio orchestration of the RAG retrieval stages"""
+        timings = {}
+        pipeline_start = time.perf_counter()
+        
+        async def run_stage(name, func, *args):
+            """Run a blocking stage in a worker thread and record its duration"""
+            stage_start = time.perf_counter()
+            try:
+                return await asyncio.to_thread(func, *args)
+            finally:
+                timings[name] = time.perf_counter() - stage_start
+        
         # 1. Optimize query for search (Translate to English if needed)
-        # This is critical for cross-lingual retrieval against English documents
-        search_query = GeminiClient.optimize_query(query)
+        # This is critical for cross-lingual retrieval against English documents.
+        # The optimizer (almost) always rewrites the query into keywords, so the
+        # raw query is not embedded speculatively: that vector would be discarded.
+        search_query = await run_stage("optimize_query", GeminiClient.optimize_query, query)
         print(f"DEBUG: Original query: '{query}' -> Search query: '{search_query}'")
         
         # 2. Generate query embedding using the optimized English query
-        query_embedding = GeminiClient.generate_query_embedding(search_query)
+        query_embedding = await run_stage(
+            "embed_search_query", GeminiClient.generate_query_embedding, search_query
+        )
         
         # Search using the English vector
         # Fetch more candidates to allow for effective re-ranking
-        results = EmbeddingService._vector_search(query_embedding, limit * 5)
-        
-        # NEW: Fetch chunk content from Storage for results that don't have it in DB
-        results_with_content = EmbeddingService._populate_chunk_content(results)
+        results = await run_stage(
+            "vector_search", EmbeddingService._vector_search, query_embedding, limit * 5
+        )
         
-        # Re-rank by authority level (higher authority first)
-        # Then by similarity score
+        # 3. Re-rank by authority level (higher authority first)
+        # Then by similarity score. Ranking only needs the vector search columns,
+        # so chunk text is fetched for the final results only.
         ranked_results = sorted(
-            results_with_content,
+            results,
             key=lambda x: (x.get('authority_level', 0), x.get('similarity', 0)),
             reverse=True
-        )
+        )[:limit]
         
-        return ranked_results[:limit]
+        # 4. Fetch chunk content from Storage while citations are resolved
+        stages = [run_stage("fetch_chunks", EmbeddingService._populate_chunk_content, ranked_results)]
+        if enrich:
+            stages.append(run_stage("enrich_sources", EmbeddingService._enrich_sources, ranked_results))
+        await asyncio.gather(*stages)
+        
+        timings["total"] = time.perf_counter() - pipeline_start
+        if trace is not None:
+            trace["search_query"] = search_query
+            trace["timings"] = timings
+        
+        return ranked_results
+    
+    @staticmethod
+    def _enrich_sources(results: List[Dict]) -> List[Dict]:
+        """
+        Attach citation info (symbol, doc_title, signed_url) to search results.
+        Looks up each source table once for all results and signs the distinct
+        file URLs in parallel.
+        
+        Args:
+            results: List of search results with source_id and source_type
+            
+        Returns:
+            Results with symbol, doc_title and signed_url populated (in-place)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        ids_by_type = {}
+        for result in results:
+            ids_by_type.setdefault(result.get('source_type'), set()).add(result['source_id'])
+        
+        def fetch_sources(source_type: str, source_ids: List[str]) -> Dict[str, Dict]:
+            """Resolve display info for all sources of one type"""
+            client = SupabaseClient.get_client()
+            sources = {}
+            try:
+                if source_type == 'document':
+                    rows = client.table("documents").select("id, symbol, title, file_url") \
+                        .in_("id", source_ids).execute().data
+                    for row in rows:
+                        sources[row['id']] = {
+                            'symbol': row['symbol'],
+                            'doc_title': row['title'],
+                            'file_url': row.get('file_url')
+                        }
+                elif source_type == 'interpretation':
+                    rows = client.table("interpretations").select("id, title, file_url, issue_date") \
+                        .in_("id", source_ids).execute().data
+                    for row in rows:
+                        date = row.get('issue_date', 'Unknown Date')
+                        sources[row['id']] = {
+                            'symbol': f"Interpretation ({date})",
+                            'doc_title': row['title'],
+                            'file_url': row.get('file_url')
+                        }
+                else:
+                    # Regulation
+                    rows = client.table("regulation_versions").select("id, regulation_id, series, revision, file_url") \
+                        .in_("id", source_ids).execute().data
+                    for row in rows:
+                        sources[row['id']] = {
+                            'symbol': f"{row['regulation_id']} {row['series']}",
+                            'doc_title': f"Regulation {row['regulation_id']}",
+                            'file_url': row.get('file_url')
+                        }
+            except Exception as e:
+                print(f"Error fetching {source_type} sources: {e}")
+            return sources
+        
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            sources = {}
+            lookups = [
+                executor.submit(SupabaseClient.bind_session(fetch_sources), source_type, list(source_ids))
+                for source_type, source_ids in ids_by_type.items()
+            ]
+            for lookup in lookups:
+                sources.update(lookup.result())
+            
+            # Generate signed URLs for the distinct files
+            file_urls = list({s['file_url'] for s in sources.values() if s.get('file_url')})
+            signed_urls = dict(zip(file_urls, executor.map(SupabaseClient.bind_session(SupabaseClient.get_signed_url), file_urls)))
+        
+        for result in results:
+            source = sources.get(result['source_id'])
+            if not source:
+                continue
+            result['symbol'] = source['symbol']
+            result['doc_title'] = source['doc_title']
+            if source.get('file_url'):
+                result['signed_url'] = signed_urls.get(source['file_url'])
+        
+        return results
     
     @staticmethod
     def _populate_chunk_content(results: List[Dict]) -> List[Dict]:
@@ -229,7 +363,8 @@ class EmbeddingService:
             
             # Use ThreadPoolExecutor for parallel downloads (max 10 concurrent)
             with ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_result = {executor.submit(fetch_content, r): r for r in to_fetch}
+                fetch = SupabaseClient.bind_session(fetch_content)
+                future_to_result = {executor.submit(fetch, r): r for r in to_fetch}
                 for future in as_completed(future_to_result):
                     # Results are updated in-place, just wait for completion
                     future.result()
@@ -308,6 +443,7 @@ class EmbeddingService:
                 last_error = str(e)
                 print(f"Error generating/storing embedding: {e}")
                 
+        EmbeddingService.invalidate_coverage([interpretation_id], "interpretation")
         return embeddings_created, last_error
 
     @staticmethod
@@ -324,3 +460,88 @@ class EmbeddingService:
             print(f"Error in vector search: {e}")
             # Fallback: return empty list
             return []
+    
+    @staticmethod
+    def coverage(source_ids: Iterable[str], source_type: str = "document") -> Dict[str, int]:
+        """
+        Number of embedded chunks per source, for any source type.
+        One grouped RPC for all ids not in the short-TTL cache.
+        
+        Args:
+            source_ids: Ids of documents, interpretations or regulation versions
+            source_type: 'document', 'interpretation' or 'regulation'
+            
+        Returns:
+            Dict {source_id: chunk_count} with an entry (possibly 0) for every id
+        """
+        ids = [str(i) for i in source_ids]
+        now = time.monotonic()
+        counts = {}
+        to_fetch = []
+        with EmbeddingService._coverage_lock:
+            for source_id in ids:
+                entry = EmbeddingService._coverage_cache.get((source_type, source_id))
+                if entry and now - entry[0] < EmbeddingService.COVERAGE_TTL:
+                    counts[source_id] = entry[1]
+                else:
+                    to_fetch.append(source_id)
+        
+        if to_fetch:
+            client = SupabaseClient.get_client()
+            try:
+                # Reads the trigger-maintained chunk_count (init_embedding_coverage.sql)
+                rows = client.rpc("get_embedding_coverage", {
+                    "p_source_ids": to_fetch,
+                    "p_source_type": source_type
+                }).execute().data
+                fetched = {str(row['source_id']): row['chunk_count'] for row in rows}
+            except Exception:
+                # Fallback for when RPC is not yet created: grouped count over embeddings
+                # (optimize_embedding_counts.sql)
+                rows = client.rpc("get_embedding_counts", {"doc_ids": to_fetch}).execute().data
+                fetched = {str(row['source_id']): row['count'] for row in rows}
+            
+            with EmbeddingService._coverage_lock:
+                for source_id in to_fetch:
+                    counts[source_id] = fetched.get(source_id, 0)
+                    EmbeddingService._coverage_cache[(source_type, source_id)] = (now, counts[source_id])
+        
+        return counts
+    
+    @staticmethod
+    def totals() -> Dict[str, Dict[str, int]]:
+        """
+        Archive-wide embedding totals per source type (short-TTL cached).
+        
+        Returns:
+            Dict {source_type: {'sources', 'embedded', 'chunks'}}
+        """
+        now = time.monotonic()
+        with EmbeddingService._coverage_lock:
+            cached = EmbeddingService._totals_cache
+        if cached and now - cached[0] < EmbeddingService.COVERAGE_TTL:
+            return dict(cached[1])
+        
+        rows = SupabaseClient.get_client().rpc("get_embedding_totals").execute().data
+        totals = {
+            row['source_type']: {
+                'sources': row['sources'],
+                'embedded': row['embedded'],
+                'chunks': row['chunks']
+            }
+            for row in rows
+        }
+        with EmbeddingService._coverage_lock:
+            EmbeddingService._totals_cache = (now, totals)
+        return dict(totals)
+    
+    @staticmethod
+    def invalidate_coverage(source_ids: Optional[Iterable[str]] = None, source_type: str = "document"):
+        """Drop cached coverage after embeddings were created or deleted (all if no ids)"""
+        with EmbeddingService._coverage_lock:
+            EmbeddingService._totals_cache = None
+            if source_ids is None:
+                EmbeddingService._coverage_cache.clear()
+                return
+            for source_id in source_ids:
+                EmbeddingService._coverage_cache.pop((source_type, str(source_id)), None)
@@ -0,0 +1,55 @@
+"""
+Export the session reports (Markdown + Word) of a whole group and/or year
+
+Generates every session report in parallel, uploads the files to the archive
+bucket (reports/{group}/{year}/) and records them in report_exports, where the
+Report Generator page lists them. Rerun the same command to resume: sessions
+already exported are skipped.
+
+Usage: python export_reports.py [--group GRE] [--year 2024] [--workers N] [--force]
+"""
+import argparse
+import sys
+from report_service import ReportService
+from supabase_client import SupabaseClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--group", help="group id, e.g. GRE")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--workers", type=int, help="sessions in parallel (default REPORT_EXPORT_CONCURRENCY)")
+    parser.add_argument("--force", action="store_true", help="re-export sessions already done")
+    opts = parser.parse_args()
+
+    if not opts.group and not opts.year:
+        parser.error("give --group and/or --year")
+
+    print("=" * 70)
+    print(f"EXPORT SESSION REPORTS (group: {opts.group or 'all'}, year: {opts.year or 'all'})")
+    print("=" * 70)
+
+    def report(done, total, session, result):
+        label = f"{session['group_id']} Session {session['code']} ({session['year']})"
+        detail = result.get('error') or f"{result.get('sections', 0)} sections, {result.get('cached_sections', 0)} cached"
+        print(f"  [{done}/{total}] [{result['status'].upper()}] {label}: {detail} ({result.get('seconds', 0)}s)")
+
+    # Service role: the job writes session_reports / report_exports and uploads without a signed-in user
+    with SupabaseClient.admin_scope():
+        counts = ReportService.export_reports(opts.group, opts.year, force=opts.force,
+                                              max_workers=opts.workers, progress_callback=report)
+
+    print(f"\n{'='*70}")
+    print(f"SUMMARY")
+    print(f"{'='*70}")
+    print(f"Exported: {counts['done']}")
+    print(f"Partial (failed sections, rerun to retry): {counts['partial']}")
+    print(f"Failed (rerun to retry): {counts['failed']}")
+    print(f"Skipped (already exported): {counts['skipped']}")
+
+    if counts['failed'] or counts['partial']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
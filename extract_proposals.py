@@ -1,15 +1,107 @@
-import google.generativeai as genai
 from config import Config
 from supabase_client import SupabaseClient
+from gemini_client import get_genai
+from pdf_processor import PDFProcessor
+from typing import Dict, List
+from gemini_files import GeminiFileRegistry
 import json
-import os
-import tempfile
-
-# Configure Gemini
-genai.configure(api_key=Config.GOOGLE_API_KEY)
+import re
 
 class ProposalExtractor:
     
+    # Page pre-pass: table headers / section titles (strong) and row patterns (weak)
+    HEADER_PATTERNS = [
+        re.compile(r"situation\s+of\s+entry\s+into\s+force", re.I),
+        re.compile(r"^\s*(?:list\s+of\s+)?adopted\s+proposals?\s*$", re.I | re.M),  # as a heading, not in prose
+        re.compile(r"consideration\s+and\s+vote\s+by\s+AC\.1", re.I),
+        re.compile(r"proposals?\s+for\s+(?:new\s+)?(?:series\s+of\s+)?amendments?\s+to\s+(?:UN\s+)?regulations?", re.I),
+    ]
+    HEADER_WEIGHT = 4
+    ROW_PATTERNS = [
+        re.compile(r"\b\d{2}\s+series\s+of\s+amendments", re.I),
+        re.compile(r"\bsupplement\s+\d+", re.I),
+        re.compile(r"\[\d{1,2}\.\d{1,2}\.\d{4}\]"),                  # [26.09.2025] entry-into-force dates
+        re.compile(r"ECE/TRANS/WP\.29/\d{4}/\d+"),
+        re.compile(r"\b(?:UN\s+)?Regulation\s+No\.\s*\d+", re.I),
+    ]
+    ROW_HITS_CAP = 4  # per pattern and page, so one long list does not dominate
+    ROW_PATTERNS_MIN = 3  # distinct row patterns a page needs without a header hit (prose often has two)
+    
+    @staticmethod
+    def score_page(text: str) -> int:
+        """Relevance of a page for the adopted proposals table"""
+        score = sum(ProposalExtractor.HEADER_WEIGHT for p in ProposalExtractor.HEADER_PATTERNS if p.search(text))
+        score += sum(min(len(p.findall(text)), ProposalExtractor.ROW_HITS_CAP) for p in ProposalExtractor.ROW_PATTERNS)
+        return score
+    
+    @staticmethod
+    def is_proposal_page(text: str, score: int) -> bool:
+        """
+        A page scoring at least PROPOSAL_PAGE_MIN_SCORE with a table header, or
+        with ROW_PATTERNS_MIN distinct row patterns (table continuations): prose
+        quoting Regulation numbers and series of amendments is not enough
+        """
+        if score < Config.PROPOSAL_PAGE_MIN_SCORE:
+            return False
+        if any(p.search(text) for p in ProposalExtractor.HEADER_PATTERNS):
+            return True
+        return sum(1 for p in ProposalExtractor.ROW_PATTERNS if p.search(text)) >= ProposalExtractor.ROW_PATTERNS_MIN
+    
+    @staticmethod
+    def locate_proposal_pages(page_texts: List[str]) -> List[int]:
+        """
+        Pages (0-based) likely to hold adopted proposals (is_proposal_page), plus
+        their neighbours with any hit (table heads and continuations). Empty
+        list if nothing matches.
+        """
+        scores = [ProposalExtractor.score_page(text) for text in page_texts]
+        selected = {i for i, (text, score) in enumerate(zip(page_texts, scores))
+                    if ProposalExtractor.is_proposal_page(text, score)}
+        for i in list(selected):
+            for j in (i - 1, i + 1):
+                if 0 <= j < len(scores) and scores[j] > 0:
+                    selected.add(j)
+        return sorted(selected)
+    
+    @staticmethod
+    def page_ranges(pages: List[int]) -> str:
+        """[0, 1, 2, 7] -> '1-3, 8' (1-based, for messages)"""
+        ranges = []
+        for page in pages:
+            if ranges and page == ranges[-1][1] + 1:
+                ranges[-1][1] = page
+            else:
+                ranges.append([page, page])
+        return ", ".join(f"{a + 1}-{b + 1}" if a != b else f"{a + 1}" for a, b in ranges)
+    
+    @staticmethod
+    def prepare_input(pdf_bytes: bytes) -> Dict:
+        """
+        Reduce a report to the pages with the proposals table.
+        
+        Returns:
+            {'pages': [0-based], 'page_count', 'pdf': sliced PDF bytes, 'text': page text
+             (PROPOSAL_INPUT='text' only), 'bytes_in', 'bytes_out'}
+            'pages' covers the whole document when the pre-pass finds nothing.
+        """
+        page_texts = PDFProcessor.extract_page_texts(pdf_bytes)
+        pages = ProposalExtractor.locate_proposal_pages(page_texts)
+        if not pages:
+            # Unknown layout: fall back to the full document rather than miss proposals
+            pages = list(range(len(page_texts)))
+        
+        prepared = {'pages': pages, 'page_count': len(page_texts), 'bytes_in': len(pdf_bytes),
+                    'pdf': None, 'text': None}
+        if Config.PROPOSAL_INPUT == "text":
+            prepared['text'] = "\n\n".join(
+                f"--- Page {i + 1} ---\n{page_texts[i]}" for i in pages
+            )
+            prepared['bytes_out'] = len(prepared['text'].encode("utf-8"))
+        else:
+            prepared['pdf'] = pdf_bytes if len(pages) == len(page_texts) else PDFProcessor.slice_pages(pdf_bytes, pages)
+            prepared['bytes_out'] = len(prepared['pdf'])
+        return prepared
+    
     @staticmethod
     def extract_proposals_from_doc(doc_id):
         """
@@ -42,72 +134,71 @@ class ProposalExtractor:
 
         pdf_bytes = SupabaseClient.download_file(file_path)
         
-        # 3. Create Temp File for Gemini 
-        # (Gemini API usually accepts path or bytes depending on SDK version, 
-        # but file API is best for PDFs)
-        suffix = ".pdf"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(pdf_bytes)
-            tmp_path = tmp.name
-            
-        try:
-            # 4. Upload to Gemini File API
-            # Note: For Flash, we can often pass data directly if small, or use File API.
-            # Using File API is safer for reports.
-            print("Uploading to Gemini...")
-            sample_file = genai.upload_file(path=tmp_path, display_name=doc_data['symbol'])
-            
-            # 5. Generate Content
-            print("Analyzing with Gemini...")
-            model = genai.GenerativeModel(Config.GEMINI_FLASH_MODEL)
-            
-            prompt = """
-            Analyze this WP.29 report/document. Identify all "Adopted Proposals" or "Amendments" to regulations.
-            For each adopted proposal, extract:
-            - regulation_id: The regulation number (e.g., "R48", "R13", "R129"). Format as "R" + number.
-            - series: The series of amendments (e.g., "09", "04"). If not specified, null.
-            - supplement: The supplement number (e.g., "12", "01").
-            - entry_date: The date of entry into force. Look specifically for dates in square brackets like "[26.09.2025]" or in the "Situation of Entry into Force" column. Format as YYYY-MM-DD. If unknown/TBD, null.
-            - document_code: The document symbol or number (e.g. "2025/67", "ECE/TRANS/WP.29/2025/57"). Found in "Document" column.
-            - description: A concise summary of WHAT changed (e.g., "Introduces requirements for step-lighting", "Clarifies test procedure for...").
-            - status: "Adopted" (default)
+        # 3. Pre-pass: keep only the pages with the adopted proposals
+        prepared = ProposalExtractor.prepare_input(pdf_bytes)
+        print(f"Sending pages {ProposalExtractor.page_ranges(prepared['pages'])} of {prepared['page_count']} "
+              f"({prepared['bytes_out'] / 1024:.0f} KB of {prepared['bytes_in'] / 1024:.0f} KB, {Config.PROPOSAL_INPUT})")
+        
+        # 4. Document part: page text, the sliced PDF inline, or the File API for large slices
+        if prepared['text'] is not None:
+            document_part = prepared['text']
+        elif prepared['bytes_out'] <= Config.PROPOSAL_INLINE_MAX_BYTES:
+            document_part = {"mime_type": "application/pdf", "data": prepared['pdf']}
+        else:
+            # Reused across scans while the upload is alive (keyed by source PDF + pages)
+            key = GeminiFileRegistry.content_key(pdf_bytes, ProposalExtractor.page_ranges(prepared['pages']))
+            print("Uploading to Gemini (or reusing a previous upload)...")
+            document_part = GeminiFileRegistry.default().get_or_upload(
+                prepared['pdf'], key=key, display_name=doc_data['symbol']
+            )
+        
+        # 5. Generate Content
+        print("Analyzing with Gemini...")
+        model = get_genai().GenerativeModel(Config.GEMINI_FLASH_MODEL)
+        
+        prompt = """
+        Analyze this WP.29 report/document. Identify all "Adopted Proposals" or "Amendments" to regulations.
+        For each adopted proposal, extract:
+        - regulation_id: The regulation number (e.g., "R48", "R13", "R129"). Format as "R" + number.
+        - series: The series of amendments (e.g., "09", "04"). If not specified, null.
+        - supplement: The supplement number (e.g., "12", "01").
+        - entry_date: The date of entry into force. Look specifically for dates in square brackets like "[26.09.2025]" or in the "Situation of Entry into Force" column. Format as YYYY-MM-DD. If unknown/TBD, null.
+        - document_code: The document symbol or number (e.g. "2025/67", "ECE/TRANS/WP.29/2025/57"). Found in "Document" column.
+        - description: A concise summary of WHAT changed (e.g., "Introduces requirements for step-lighting", "Clarifies test procedure for...").
+        - status: "Adopted" (default)
 
-            Return a valid JSON list of objects.
-            Example:
-            [
-                {"regulation_id": "R48", "series": "09", "supplement": "02", "entry_date": "2025-06-22", "description": "New requirements for AV signalling.", "status": "Adopted"}
-            ]
-            RETURN ONLY JSON.
-            """
-            
-            response = model.generate_content([prompt, sample_file])
-            
-            # Clean up file
-            # genai.delete_file(sample_file.name) # Cleanup if needed
-            
-            # Parse JSON
-            json_text = response.text
-            if json_text.startswith("```"):
-                parts = json_text.split("```")
-                # find json part
-                for p in parts:
-                    if p.strip().startswith("json"):
-                        json_text = p.strip()[4:].strip()
-                        break
-                    elif p.strip().startswith("["):
-                         json_text = p.strip()
-                         break
-            
-            try:
-                data = json.loads(json_text)
-                return data
-            except json.JSONDecodeError:
-                print(f"Failed to parse JSON: {json_text}")
-                return []
-                
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        Return a valid JSON list of objects.
+        Example:
+        [
+            {"regulation_id": "R48", "series": "09", "supplement": "02", "entry_date": "2025-06-22", "description": "New requirements for AV signalling.", "status": "Adopted"}
+        ]
+        RETURN ONLY JSON.
+        """
+        
+        response = model.generate_content([prompt, document_part])
+        
+        # Parse JSON
+        json_text = response.text
+        if json_text.startswith("```"):
+            parts = json_text.split("```")
+            # find json part
+            for p in parts:
+                if p.strip().startswith("json"):
+                    json_text = p.strip()[4:].strip()
+                    break
+                elif p.strip().startswith("["):
+                     json_text = p.strip()
+                     break
+        
+        # An unreadable reply is an error, not "no proposals": the batch scanner
+        # marks it failed and retries it instead of recording the report as empty
+        try:
+            data = json.loads(json_text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Gemini reply is not valid JSON ({e}): {json_text[:200]}")
+        if not isinstance(data, list):
+            raise ValueError(f"Gemini reply is not a JSON list: {json_text[:200]}")
+        return data
 
 if __name__ == "__main__":
     # Test run
@@ -2,21 +2,40 @@
 Google Gemini API client wrapper for UNECE WP.29 Archive
 Handles AI extraction, chat, and embeddings
 """
-import google.generativeai as genai
 from config import Config
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import json
+import time
 
-# Configure Gemini API
-genai.configure(api_key=Config.GOOGLE_API_KEY)
+_genai = None
+
+def get_genai():
+    """
+    Import and configure google-generativeai on first use.
+    Keeps the SDK import (and config validation) out of page start-up.
+    """
+    global _genai
+    if _genai is None:
+        Config.validate()
+        import google.generativeai as genai
+        genai.configure(api_key=Config.GOOGLE_API_KEY)
+        _genai = genai
+    return _genai
 
 class GeminiClient:
     """Google Gemini API wrapper"""
     
+    # Bump when the report section prompt changes: cached sections (session_reports) are regenerated
+    REPORT_PROMPT_VERSION = "2"
+    # Bump when the per-document summary prompt changes (document_summaries)
+    DOC_SUMMARY_PROMPT_VERSION = "1"
+    
     @staticmethod
     def get_model():
         """Get the configured GenerativeModel instance"""
-        return genai.GenerativeModel(Config.GEMINI_PRO_MODEL)
+        return get_genai().GenerativeModel(Config.GEMINI_PRO_MODEL)
     
     @staticmethod
     def extract_metadata(text: str) -> Dict:
@@ -24,7 +43,7 @@ class GeminiClient:
         Extract metadata from first page of PDF using Gemini Flash
         Returns: {symbol, title, author, regulation_ref, doc_type}
         """
-        model = genai.GenerativeModel(Config.GEMINI_FLASH_MODEL)
+        model = get_genai().GenerativeModel(Config.GEMINI_FLASH_MODEL)
         
         prompt = f"""
 You are analyzing a UNECE working document (Interpretations, Reports, or Regulations).
@@ -112,7 +131,7 @@ Return ONLY the JSON object, no other text.
     def generate_embedding(text: str) -> List[float]:
         """Generate embedding vector for text using Gemini embedding model"""
         try:
-            result = genai.embed_content(
+            result = get_genai().embed_content(
                 model=Config.GEMINI_EMBEDDING_MODEL,
                 content=text,
                 task_type="retrieval_document"
@@ -126,7 +145,7 @@ Return ONLY the JSON object, no other text.
     def generate_query_embedding(query: str) -> List[float]:
         """Generate embedding vector for search query"""
         try:
-            result = genai.embed_content(
+            result = get_genai().embed_content(
                 model=Config.GEMINI_EMBEDDING_MODEL,
                 content=query,
                 task_type="retrieval_query"
@@ -142,7 +161,7 @@ Return ONLY the JSON object, no other text.
         Generate answer using Gemini Pro with RAG context
         context_chunks: List of {content_chunk, source_id, source_type, ...}
         """
-        model = genai.GenerativeModel(Config.GEMINI_PRO_MODEL)
+        model = get_genai().GenerativeModel(Config.GEMINI_PRO_MODEL)
         
         # Build context from chunks with source type
         context_parts = []
@@ -186,7 +205,7 @@ Answer:
         Extracts powerful search keywords from the user's query.
         Prioritizes technical terms and synonyms in multiple languages.
         """
-        model = genai.GenerativeModel(Config.GEMINI_FLASH_MODEL)
+        model = get_genai().GenerativeModel(Config.GEMINI_FLASH_MODEL)
         prompt = f"""You are a search query optimizer for a database of:
 1. UN Vehicle Regulations (mostly English)
 2. Type Approval Authority Meeting (TAAM) Interpretations (English, German, French)
@@ -221,41 +240,110 @@ Keywords:
 
     
     @staticmethod
-    def summarize_session(documents: List[Dict]) -> str:
+    def report_fingerprint(docs: List[Dict]) -> str:
+        """SHA-256 of the document fields a report section is generated from, stored summary included (order-independent)"""
+        rows = sorted(
+            "\x1f".join(str(doc.get(field) or "") for field in ("id", "symbol", "title", "author", "summary"))
+            for doc in docs
+        )
+        return hashlib.sha256("\x1e".join(rows).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def summarize_document(text: str, symbol: str, title: str) -> str:
         """
-        Summarize session documents grouped by regulation using Gemini Pro
-        documents: List of document metadata with content
+        Compact summary of one document's content (map step of the session reports).
+        The text is truncated to DOC_SUMMARY_MAX_CHARS; raises on API errors.
         """
-        model = genai.GenerativeModel(Config.GEMINI_PRO_MODEL)
+        model = get_genai().GenerativeModel(Config.GEMINI_FLASH_MODEL)
         
-        # Group documents by regulation
-        by_regulation = {}
-        for doc in documents:
-            reg_ref = doc.get('regulation_ref_id', 'General')
-            if reg_ref not in by_regulation:
-                by_regulation[reg_ref] = []
-            by_regulation[reg_ref].append(doc)
+        prompt = f"""
+You are an expert UN regulation analyst.
+Summarize this UNECE WP.29 document in at most 120 words for a session report.
+State the regulation(s) concerned, what is proposed or reported, by whom, and any decision or request.
+Plain text, no headings.
+
+Document: {symbol} - {title}
+
+{text[:Config.DOC_SUMMARY_MAX_CHARS]}
+"""
+        response = model.generate_content(prompt)
+        return response.text.strip()
+    
+    @staticmethod
+    def format_document_line(doc: Dict) -> str:
+        """One document as a markdown list item, followed by its stored summary when available"""
+        line = f"- **{doc['symbol']}**: {doc['title']} (by {doc.get('author') or 'Unknown'})"
+        if doc.get('summary'):
+            line += f"\n  Summary: {doc['summary']}"
+        return line
+    
+    @staticmethod
+    def summarize_regulation(reg_id: str, docs: List[Dict], group: str, session_code: str) -> str:
+        """
+        Summarize the documents of one regulation for a session report (raises on API errors).
+        Reduces over the stored per-document summaries ('summary' key) when present.
+        """
+        doc_list = "\n".join(GeminiClient.format_document_line(doc) for doc in docs)
         
-        # Build summary for each regulation
-        summaries = []
-        for reg_id, docs in by_regulation.items():
-            doc_list = "\n".join([
-                f"- {doc['symbol']}: {doc['title']}"
-                for doc in docs
-            ])
-            
-            prompt = f"""
-Summarize the key discussions and decisions for regulation {reg_id} based on these documents:
+        prompt = f"""
+You are an expert UN regulation analyst.
+Summarize the key discussions and decisions for regulation {reg_id} based on these documents from {group} Session {session_code}:
 
 {doc_list}
 
-Provide a concise summary of the main topics, proposals, and outcomes.
+Provide a structured summary covering:
+1. Main topics discussed
+2. Key proposals and authors
+3. Decisions or outcomes (if mentioned)
+4. Next steps or pending items
+
+Be concise but comprehensive. Use bullet points for clarity.
 """
-            
-            try:
-                response = model.generate_content(prompt)
-                summaries.append(f"## {reg_id}\n\n{response.text}\n")
-            except Exception as e:
-                summaries.append(f"## {reg_id}\n\nError generating summary: {e}\n")
+        response = GeminiClient.get_model().generate_content(prompt)
+        return response.text
+    
+    @staticmethod
+    def summarize_regulations(by_regulation: Dict[str, List[Dict]], group: str, session_code: str,
+                              max_workers: Optional[int] = None,
+                              retries: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Summarize several regulations concurrently (at most max_workers calls in
+        flight, default REPORT_CONCURRENCY), retrying each failed section with
+        backoff (default REPORT_SECTION_RETRIES extra attempts).
+        
+        Yields one result per regulation as it completes:
+            {'regulation', 'text', 'error', 'seconds', 'attempts'}
+        'seconds' is the section's own generation time, so their sum is the
+        time a sequential run would have taken.
+        """
+        max_workers = max_workers or Config.REPORT_CONCURRENCY
+        retries = Config.REPORT_SECTION_RETRIES if retries is None else retries
+        get_genai()  # configure once before the worker threads start
+        
+        def run(reg_id: str, docs: List[Dict]) -> Dict:
+            start = time.perf_counter()
+            error = None
+            for attempt in range(1, retries + 2):
+                try:
+                    text = GeminiClient.summarize_regulation(reg_id, docs, group, session_code)
+                    return {'regulation': reg_id, 'text': text, 'error': None,
+                            'seconds': time.perf_counter() - start, 'attempts': attempt}
+                except Exception as e:
+                    error = str(e)
+                    if attempt <= retries:
+                        time.sleep(min(2 ** attempt, 10))
+            return {'regulation': reg_id, 'text': '', 'error': error,
+                    'seconds': time.perf_counter() - start, 'attempts': retries + 1}
         
-        return "\n".join(summaries)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [executor.submit(run, reg_id, docs) for reg_id, docs in by_regulation.items()]
+            for future in as_completed(futures):
+                yield future.result()
+        except GeneratorExit:
+            # Caller stopped iterating (e.g. Streamlit rerun): drop the queued
+            # sections instead of waiting for all of them
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
@@ -0,0 +1,231 @@
+"""
+Gemini File API upload registry
+Maps the SHA-256 of uploaded content to the remote file, so rescanning the same
+PDF reuses the upload instead of sending it again, and expired or leaked remote
+files can be cleaned up. LocalFileAPI stands in for the File API offline.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Optional
+from config import Config
+
+class LocalFileAPI:
+    """
+    In-memory stand-in for the Gemini File API (upload_file / get_file /
+    delete_file / list_files) with the same 48h expiry, for offline tests.
+    """
+
+    def __init__(self, ttl: float = 48 * 3600):
+        self.ttl = ttl
+        self.files: Dict[str, SimpleNamespace] = {}
+        self.uploads = 0
+        self.deletes = 0
+
+    def _check(self, name: str) -> SimpleNamespace:
+        file = self.files.get(name)
+        if file is None or file.expires_at <= time.time():
+            self.files.pop(name, None)
+            raise LookupError(f"File {name} not found")
+        return file
+
+    def upload_file(self, path: str, mime_type: Optional[str] = None, display_name: Optional[str] = None):
+        with open(path, "rb") as f:
+            size = len(f.read())
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        self.files[name] = SimpleNamespace(
+            name=name, display_name=display_name, mime_type=mime_type, size_bytes=size,
+            uri=f"local://{name}", state=SimpleNamespace(name="ACTIVE"),
+            create_time=datetime.now(timezone.utc), expires_at=time.time() + self.ttl
+        )
+        self.uploads += 1
+        return self.files[name]
+
+    def get_file(self, name: str):
+        return self._check(name)
+
+    def delete_file(self, name: str):
+        self._check(name)
+        del self.files[name]
+        self.deletes += 1
+
+    def list_files(self):
+        return [f for f in list(self.files.values()) if f.expires_at > time.time()]
+
+
+class GeminiFileRegistry:
+    """
+    Local JSON registry: content SHA-256 (plus an optional variant, e.g. the
+    page ranges of a sliced PDF) -> uploaded file name and expiry.
+    """
+
+    _default: Optional["GeminiFileRegistry"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None, api=None, ttl: Optional[float] = None):
+        """
+        Args:
+            path: Registry file (default GEMINI_FILE_REGISTRY)
+            api: Object with upload_file/get_file/delete_file/list_files
+                 (default: the google.generativeai module, loaded on first use)
+            ttl: Seconds an upload is reused (default GEMINI_FILE_TTL, below the API's 48h)
+        """
+        self.path = path or Config.GEMINI_FILE_REGISTRY
+        self._api = api
+        self.ttl = ttl if ttl is not None else Config.GEMINI_FILE_TTL
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.uploads = 0
+
+    @classmethod
+    def default(cls) -> "GeminiFileRegistry":
+        """Process-wide registry on the real File API"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def api(self):
+        if self._api is None:
+            from gemini_client import get_genai
+            self._api = get_genai()
+        return self._api
+
+    @staticmethod
+    def content_key(data: bytes, variant: str = "") -> str:
+        """SHA-256 of the content, with ':variant' when the uploaded bytes derive from it"""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{digest}:{variant}" if variant else digest
+
+    # -------------------------------------------------------------------------
+    # Registry file
+    # -------------------------------------------------------------------------
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries: Dict[str, Dict]):
+        # Write-then-rename so a crash never leaves a truncated registry
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            return self._load()
+
+    # -------------------------------------------------------------------------
+    # Upload / reuse
+    # -------------------------------------------------------------------------
+
+    def get_or_upload(self, data: bytes, key: Optional[str] = None, display_name: Optional[str] = None,
+                      mime_type: str = "application/pdf"):
+        """
+        Remote file for data: the registered upload if it is still alive,
+        otherwise a new upload (registered under key, default the content SHA-256).
+        """
+        key = key or self.content_key(data)
+        with self._lock:
+            entry = self._load().get(key)
+
+        if entry and entry["expires_at"] > time.time():
+            try:
+                file = self.api.get_file(entry["name"])
+                self.hits += 1
+                return file
+            except Exception:
+                pass  # deleted or expired remotely: upload again
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf" if mime_type == "application/pdf" else "") as tmp:
+            tmp.write(data)
+            tmp_path = tmp.name
+        try:
+            file = self.api.upload_file(path=tmp_path, mime_type=mime_type, display_name=display_name)
+        finally:
+            os.unlink(tmp_path)
+        self.uploads += 1
+
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "name": file.name,
+                "display_name": display_name,
+                "size": len(data),
+                "uploaded_at": time.time(),
+                "expires_at": time.time() + self.ttl
+            }
+            self._save(entries)
+        return file
+
+    # -------------------------------------------------------------------------
+    # Cleanup
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _uploaded_at(file) -> Optional[float]:
+        """Upload time of a remote file (File API create_time) as a timestamp, None if unknown"""
+        created = getattr(file, "create_time", None)
+        if isinstance(created, str):
+            try:
+                created = datetime.fromisoformat(created.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+        if not isinstance(created, datetime):
+            return None
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return created.timestamp()
+
+    def cleanup(self, delete_all: bool = False, orphans: bool = False) -> Dict[str, int]:
+        """
+        Drop expired registry entries (and delete their remote files, if still there).
+
+        Args:
+            delete_all: Also delete the live uploads (e.g. at the end of a batch)
+            orphans: Also delete remote files that are not in the registry and
+                     are older than the TTL (uploads leaked before the registry
+                     existed). Younger ones may belong to another host's registry.
+
+        Returns:
+            {'deleted': remote files deleted, 'dropped': registry entries removed}
+        """
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            drop = {key: e for key, e in entries.items() if delete_all or e["expires_at"] <= now}
+            for key in drop:
+                del entries[key]
+            self._save(entries)
+            known = {e["name"] for e in entries.values()}
+
+        deleted = 0
+        for entry in drop.values():
+            try:
+                self.api.delete_file(entry["name"])
+                deleted += 1
+            except Exception:
+                pass  # already expired remotely
+
+        if orphans:
+            for file in self.api.list_files():
+                uploaded_at = self._uploaded_at(file)
+                if file.name not in known and uploaded_at is not None and uploaded_at <= now - self.ttl:
+                    try:
+                        self.api.delete_file(file.name)
+                        deleted += 1
+                    except Exception:
+                        pass
+        return {"deleted": deleted, "dropped": len(drop)}
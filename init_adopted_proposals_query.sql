@@ -0,0 +1,140 @@
+-- Migration: Server-side query API for the Adopted Proposals dashboard
+-- Run this in Supabase SQL Editor AFTER init_adopted_proposals.sql
+--
+-- The dashboard used to fetch the latest 500 rows and filter/sort/group them
+-- in pandas (older rows silently disappeared). This adds:
+--   * regulation_number: numeric part of regulation_id ("R48" -> 48), stored,
+--     so "R9 < R13 < R109" sorting is done by an index
+--   * indexes for the dashboard filters and sort columns
+--   * query_adopted_proposals: filter + sort + paginate, with total count
+--   * adopted_proposals_facets: per-dimension counts (filter options, group headers)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. Numeric regulation column
+ALTER TABLE adopted_proposals
+ADD COLUMN IF NOT EXISTS regulation_number INTEGER
+GENERATED ALWAYS AS ((substring(regulation_id FROM '[Rr](\d+)'))::integer) STORED;
+
+-- 2. Indexes
+CREATE INDEX IF NOT EXISTS adopted_proposals_reg_num_idx
+ON adopted_proposals(regulation_number, regulation_id);
+CREATE INDEX IF NOT EXISTS adopted_proposals_series_idx ON adopted_proposals(series);
+CREATE INDEX IF NOT EXISTS adopted_proposals_entry_date_idx ON adopted_proposals(entry_date);
+CREATE INDEX IF NOT EXISTS adopted_proposals_status_idx ON adopted_proposals(status);
+CREATE INDEX IF NOT EXISTS adopted_proposals_created_at_idx ON adopted_proposals(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS adopted_proposals_description_trgm_idx
+ON adopted_proposals USING gin(description gin_trgm_ops);
+
+-- 3. Query RPC
+-- p_sort: 'created_at' | 'regulation' | 'series' | 'entry_date' | 'status' | 'session'
+-- Returns one row per proposal of the page:
+--   item        -> proposal as JSON with 'sessions' {code, year}
+--   total_count -> matches across all pages
+CREATE OR REPLACE FUNCTION query_adopted_proposals(
+    p_regulation_ids TEXT[] DEFAULT NULL,
+    p_session_ids UUID[] DEFAULT NULL,
+    p_statuses TEXT[] DEFAULT NULL,
+    p_series TEXT[] DEFAULT NULL,
+    p_search TEXT DEFAULT NULL,
+    p_sort TEXT DEFAULT 'created_at',
+    p_descending BOOLEAN DEFAULT TRUE,
+    p_limit INTEGER DEFAULT 100,
+    p_offset INTEGER DEFAULT 0
+) RETURNS TABLE (
+    item jsonb,
+    total_count bigint
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_dir TEXT := CASE WHEN p_descending THEN 'DESC' ELSE 'ASC' END;
+    v_order TEXT;
+    v_pattern TEXT;
+BEGIN
+    IF nullif(btrim(p_search), '') IS NOT NULL THEN
+        v_pattern := '%' || replace(replace(replace(btrim(p_search), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+    END IF;
+
+    -- Whitelisted sort columns only (the value is interpolated into the query)
+    v_order := CASE p_sort
+        WHEN 'regulation' THEN format('p.regulation_number %1$s NULLS LAST, p.regulation_id %1$s', v_dir)
+        WHEN 'series' THEN format('p.series %s NULLS LAST', v_dir)
+        WHEN 'entry_date' THEN format('p.entry_date %s NULLS LAST', v_dir)
+        WHEN 'status' THEN format('p.status %s', v_dir)
+        WHEN 'session' THEN format('s.year %1$s NULLS LAST, s.code %1$s', v_dir)
+        ELSE format('p.created_at %s', v_dir)
+    END || ', p.id DESC';
+
+    RETURN QUERY EXECUTE
+        'SELECT to_jsonb(p) || jsonb_build_object(''sessions'','
+        || '   CASE WHEN s.id IS NULL THEN NULL ELSE jsonb_build_object(''code'', s.code, ''year'', s.year) END),'
+        || ' count(*) OVER ()'
+        || ' FROM adopted_proposals p'
+        || ' LEFT JOIN sessions s ON s.id = p.session_id'
+        || ' WHERE ($1 IS NULL OR p.regulation_id = ANY($1))'
+        || '   AND ($2 IS NULL OR p.session_id = ANY($2))'
+        || '   AND ($3 IS NULL OR p.status = ANY($3))'
+        || '   AND ($4 IS NULL OR p.series = ANY($4))'
+        || '   AND ($5 IS NULL OR p.description ILIKE $5)'
+        || ' ORDER BY ' || v_order
+        || ' LIMIT $6 OFFSET $7'
+    USING p_regulation_ids, p_session_ids, p_statuses, p_series, v_pattern, p_limit, p_offset;
+END;
+$$;
+
+-- 4. Facets RPC
+-- Counts per dimension for the rows matching the filters:
+--   dimension -> 'regulation' | 'session' | 'status' | 'series'
+--   value     -> filter value (regulation_id, session_id, status, series)
+--   label     -> display text
+--   sort_key  -> numeric order (regulation number, session year*1000+code...)
+--   count     -> matching proposals
+CREATE OR REPLACE FUNCTION adopted_proposals_facets(
+    p_regulation_ids TEXT[] DEFAULT NULL,
+    p_session_ids UUID[] DEFAULT NULL,
+    p_statuses TEXT[] DEFAULT NULL,
+    p_series TEXT[] DEFAULT NULL,
+    p_search TEXT DEFAULT NULL
+) RETURNS TABLE (
+    dimension text,
+    value text,
+    label text,
+    sort_key numeric,
+    count bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH f AS (
+        SELECT p.*, s.code AS s_code, s.year AS s_year
+        FROM adopted_proposals p
+        LEFT JOIN sessions s ON s.id = p.session_id
+        WHERE (p_regulation_ids IS NULL OR p.regulation_id = ANY(p_regulation_ids))
+          AND (p_session_ids IS NULL OR p.session_id = ANY(p_session_ids))
+          AND (p_statuses IS NULL OR p.status = ANY(p_statuses))
+          AND (p_series IS NULL OR p.series = ANY(p_series))
+          AND (nullif(btrim(p_search), '') IS NULL
+               OR p.description ILIKE '%' || replace(replace(replace(btrim(p_search), '\', '\\'), '%', '\%'), '_', '\_') || '%')
+    )
+    SELECT 'regulation', regulation_id, regulation_id, coalesce(min(regulation_number), 999999)::numeric, count(*)
+    FROM f WHERE regulation_id IS NOT NULL GROUP BY regulation_id
+    UNION ALL
+    SELECT 'session', session_id::text,
+           'WP.29 ' || coalesce(min(s_code), '?') || ' (' || coalesce(min(s_year)::text, '?') || ')',
+           coalesce(min(s_year), 0)::numeric, count(*)
+    FROM f WHERE session_id IS NOT NULL GROUP BY session_id
+    UNION ALL
+    SELECT 'status', status, status, 0, count(*)
+    FROM f WHERE status IS NOT NULL GROUP BY status
+    UNION ALL
+    SELECT 'series', series, series, 0, count(*)
+    FROM f WHERE series IS NOT NULL GROUP BY series
+    ORDER BY 1, 4, 3;
+$$;
+
+GRANT EXECUTE ON FUNCTION query_adopted_proposals(TEXT[], UUID[], TEXT[], TEXT[], TEXT, TEXT, BOOLEAN, INTEGER, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION query_adopted_proposals(TEXT[], UUID[], TEXT[], TEXT[], TEXT, TEXT, BOOLEAN, INTEGER, INTEGER) TO anon;
+GRANT EXECUTE ON FUNCTION adopted_proposals_facets(TEXT[], UUID[], TEXT[], TEXT[], TEXT) TO authenticated;
+GRANT EXECUTE ON FUNCTION adopted_proposals_facets(TEXT[], UUID[], TEXT[], TEXT[], TEXT) TO anon;
@@ -0,0 +1,123 @@
+-- Migration: Server-side bulk document deletion
+-- Run this in Supabase SQL Editor AFTER init_embedding_status.sql
+--
+-- "Delete Selected" / "Delete All" used to make one storage call and one
+-- DELETE per document and left embeddings and chunks_cache/{id}/chunk_*.json
+-- objects behind. This adds:
+--   * storage_cleanup_queue: chunks_cache objects waiting to be removed
+--     (processed in batches by SupabaseClient.process_storage_cleanup,
+--     service role only)
+--   * delete_documents: deletes embeddings + documents in one transaction,
+--     queues their chunk objects, returns the PDF urls to remove
+
+-- 1. Cleanup queue
+-- Only chunks_cache objects, and not writable by anon/authenticated: rows are
+-- added by queue_chunk_cleanup (called from delete_documents) and processed
+-- with the service role. Rows failing STORAGE_CLEANUP_MAX_ATTEMPTS times stay
+-- for inspection (last_error) and are no longer retried.
+CREATE TABLE IF NOT EXISTS storage_cleanup_queue (
+    id BIGSERIAL PRIMARY KEY,
+    bucket TEXT NOT NULL CHECK (bucket = 'chunks_cache'),
+    path TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (bucket, path)
+);
+
+-- Tables created before the bucket check: drop rows for other buckets
+DELETE FROM storage_cleanup_queue WHERE bucket <> 'chunks_cache';
+ALTER TABLE storage_cleanup_queue DROP CONSTRAINT IF EXISTS storage_cleanup_queue_bucket_check;
+ALTER TABLE storage_cleanup_queue ADD CONSTRAINT storage_cleanup_queue_bucket_check CHECK (bucket = 'chunks_cache');
+
+ALTER TABLE storage_cleanup_queue ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow All Storage Cleanup Queue" ON storage_cleanup_queue;
+
+REVOKE ALL ON storage_cleanup_queue FROM anon, authenticated;
+REVOKE ALL ON SEQUENCE storage_cleanup_queue_id_seq FROM anon, authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON storage_cleanup_queue TO service_role;
+GRANT USAGE, SELECT ON SEQUENCE storage_cleanup_queue_id_seq TO service_role;
+
+-- 2. Queue chunk objects of deleted documents
+-- SECURITY DEFINER so delete_documents (running as the caller) can write the
+-- queue. Only accepts {document_id}/... paths whose document is gone and that
+-- no embedding references any more, so a direct call cannot queue live files.
+CREATE OR REPLACE FUNCTION queue_chunk_cleanup(p_paths TEXT[])
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH queued AS (
+        INSERT INTO storage_cleanup_queue (bucket, path)
+        SELECT DISTINCT 'chunks_cache', p.path
+        FROM unnest(p_paths) AS p(path)
+        WHERE p.path ~ '^[0-9a-fA-F-]{36}/'
+          AND NOT EXISTS (SELECT 1 FROM documents d WHERE d.id::text = split_part(p.path, '/', 1))
+          AND NOT EXISTS (SELECT 1 FROM embeddings e WHERE e.content_path = p.path)
+        ON CONFLICT (bucket, path) DO NOTHING
+        RETURNING 1
+    )
+    SELECT count(*)::integer INTO v_count FROM queued;
+    RETURN v_count;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION queue_chunk_cleanup(TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION queue_chunk_cleanup(TEXT[]) TO authenticated, anon, service_role;
+
+-- 3. Bulk delete RPC
+-- Runs as the caller (no SECURITY DEFINER): the usual delete policies apply.
+-- Returns one row per deleted document:
+--   document_id    -> deleted id
+--   symbol         -> for messages
+--   file_url       -> PDF to remove from the unece-archive bucket (client side)
+--   chunks_queued  -> chunk objects added to storage_cleanup_queue
+CREATE OR REPLACE FUNCTION delete_documents(p_ids UUID[])
+RETURNS TABLE (
+    document_id uuid,
+    symbol text,
+    file_url text,
+    chunks_queued integer
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_sources UUID[];
+    v_paths TEXT[];
+BEGIN
+    WITH deleted_embeddings AS (
+        DELETE FROM embeddings e
+        WHERE e.source_type = 'document' AND e.source_id = ANY(p_ids)
+        RETURNING e.source_id, e.content_path
+    )
+    SELECT array_agg(de.source_id), array_agg(de.content_path)
+    INTO v_sources, v_paths
+    FROM deleted_embeddings de;
+
+    RETURN QUERY
+    WITH deleted_documents AS (
+        DELETE FROM documents d
+        WHERE d.id = ANY(p_ids)
+        RETURNING d.id, d.symbol, d.file_url
+    ),
+    chunk_counts AS (
+        SELECT c.source_id, count(c.content_path)::integer AS n
+        FROM unnest(v_sources, v_paths) AS c(source_id, content_path)
+        GROUP BY c.source_id
+    )
+    SELECT dd.id, dd.symbol, dd.file_url, coalesce(cc.n, 0)
+    FROM deleted_documents dd
+    LEFT JOIN chunk_counts cc ON cc.source_id = dd.id;
+
+    -- After the documents are gone, so queue_chunk_cleanup accepts their paths
+    PERFORM queue_chunk_cleanup(array_remove(v_paths, NULL));
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION delete_documents(UUID[]) TO authenticated;
+GRANT EXECUTE ON FUNCTION delete_documents(UUID[]) TO anon;
@@ -0,0 +1,15 @@
+-- Migration: Content-addressed document PDFs and duplicate detection
+-- Run this in Supabase SQL Editor AFTER init_database.sql
+--
+-- Smart Ingestion hashes every PDF (SHA-256) before any AI call and looks the
+-- hash up here: known content skips metadata extraction, upload and embedding.
+-- New PDFs are stored under documents/sha256/{aa}/{hash}.pdf, so a wrong symbol
+-- can no longer overwrite another document's file.
+-- Existing rows get their hash from backfill_content_hashes.py (files stay where they are).
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_sha256 TEXT;
+
+-- Not UNIQUE: the archive may already hold duplicate uploads (listed by the backfill)
+CREATE INDEX IF NOT EXISTS documents_content_sha256_idx
+ON documents(content_sha256)
+WHERE content_sha256 IS NOT NULL;
@@ -0,0 +1,185 @@
+-- Migration: Maintained corpus statistics for the Home status panel
+-- Run this in Supabase SQL Editor AFTER init_embedding_status.sql and init_embedding_coverage.sql
+--
+-- corpus_stats holds one row per source type (document / interpretation /
+-- regulation) with the number of sources, how many are embedded and the total
+-- chunk count. Statement-level triggers on the three source tables apply the
+-- deltas of every insert/update/delete (chunk_count and embedding_status are
+-- themselves maintained by the embeddings triggers), so reading the totals is
+-- a 3-row lookup instead of counting the sources or scanning the vector table.
+-- refresh_corpus_stats() recounts exactly (admin "Recount" button).
+
+-- 1. Table
+CREATE TABLE IF NOT EXISTS corpus_stats (
+    source_type TEXT PRIMARY KEY CHECK (source_type IN ('document', 'interpretation', 'regulation')),
+    sources BIGINT NOT NULL DEFAULT 0,
+    embedded BIGINT NOT NULL DEFAULT 0,
+    chunks BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP WITH TIME ZONE,  -- last exact recount
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO corpus_stats (source_type)
+VALUES ('document'), ('interpretation'), ('regulation')
+ON CONFLICT (source_type) DO NOTHING;
+
+ALTER TABLE corpus_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Corpus stats are readable" ON corpus_stats;
+CREATE POLICY "Corpus stats are readable"
+ON corpus_stats FOR SELECT
+USING (true);
+
+-- 2. Delta trigger (TG_ARGV[0] = source type of the table)
+-- Transition tables are not allowed on multi-event triggers, hence one trigger per event.
+-- Nor with UPDATE OF column lists: the update trigger compares old/new rows
+-- itself and only touches corpus_stats (a single hot row per source type)
+-- when chunk_count or embedding_status actually changed.
+CREATE OR REPLACE FUNCTION trg_corpus_stats_delta()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    d_sources BIGINT := 0;
+    d_embedded BIGINT := 0;
+    d_chunks BIGINT := 0;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+        INTO d_sources, d_embedded, d_chunks
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -count(*), -count(*) FILTER (WHERE embedding_status = 'embedded'), -coalesce(sum(chunk_count), 0)
+        INTO d_sources, d_embedded, d_chunks
+        FROM old_rows;
+    ELSE
+        -- Only rows whose inputs changed (title edits, summaries, hashes... are skipped)
+        SELECT count(*) FILTER (WHERE n.embedding_status = 'embedded')
+                 - count(*) FILTER (WHERE o.embedding_status = 'embedded'),
+               coalesce(sum(n.chunk_count - o.chunk_count), 0)
+        INTO d_embedded, d_chunks
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        WHERE n.chunk_count IS DISTINCT FROM o.chunk_count
+           OR n.embedding_status IS DISTINCT FROM o.embedding_status;
+    END IF;
+
+    IF d_sources <> 0 OR d_embedded <> 0 OR d_chunks <> 0 THEN
+        UPDATE corpus_stats
+        SET sources = sources + d_sources,
+            embedded = embedded + d_embedded,
+            chunks = chunks + d_chunks,
+            updated_at = NOW()
+        WHERE source_type = TG_ARGV[0];
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_corpus_stats_insert ON documents;
+CREATE TRIGGER documents_corpus_stats_insert
+AFTER INSERT ON documents
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('document');
+
+DROP TRIGGER IF EXISTS documents_corpus_stats_update ON documents;
+CREATE TRIGGER documents_corpus_stats_update
+AFTER UPDATE ON documents
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('document');
+
+DROP TRIGGER IF EXISTS documents_corpus_stats_delete ON documents;
+CREATE TRIGGER documents_corpus_stats_delete
+AFTER DELETE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('document');
+
+DROP TRIGGER IF EXISTS interpretations_corpus_stats_insert ON interpretations;
+CREATE TRIGGER interpretations_corpus_stats_insert
+AFTER INSERT ON interpretations
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('interpretation');
+
+DROP TRIGGER IF EXISTS interpretations_corpus_stats_update ON interpretations;
+CREATE TRIGGER interpretations_corpus_stats_update
+AFTER UPDATE ON interpretations
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('interpretation');
+
+DROP TRIGGER IF EXISTS interpretations_corpus_stats_delete ON interpretations;
+CREATE TRIGGER interpretations_corpus_stats_delete
+AFTER DELETE ON interpretations
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('interpretation');
+
+DROP TRIGGER IF EXISTS regulation_versions_corpus_stats_insert ON regulation_versions;
+CREATE TRIGGER regulation_versions_corpus_stats_insert
+AFTER INSERT ON regulation_versions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('regulation');
+
+DROP TRIGGER IF EXISTS regulation_versions_corpus_stats_update ON regulation_versions;
+CREATE TRIGGER regulation_versions_corpus_stats_update
+AFTER UPDATE ON regulation_versions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('regulation');
+
+DROP TRIGGER IF EXISTS regulation_versions_corpus_stats_delete ON regulation_versions;
+CREATE TRIGGER regulation_versions_corpus_stats_delete
+AFTER DELETE ON regulation_versions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_corpus_stats_delta('regulation');
+
+-- 3. Exact recount (backfill, admin refresh, optional periodic job)
+CREATE OR REPLACE FUNCTION refresh_corpus_stats()
+RETURNS SETOF corpus_stats
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH exact AS (
+        SELECT 'document' AS source_type, count(*) AS sources,
+               count(*) FILTER (WHERE embedding_status = 'embedded') AS embedded,
+               coalesce(sum(chunk_count), 0) AS chunks
+        FROM documents
+        UNION ALL
+        SELECT 'interpretation', count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+        FROM interpretations
+        UNION ALL
+        SELECT 'regulation', count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+        FROM regulation_versions
+    )
+    UPDATE corpus_stats s
+    SET sources = e.sources,
+        embedded = e.embedded,
+        chunks = e.chunks,
+        refreshed_at = NOW(),
+        updated_at = NOW()
+    FROM exact e
+    WHERE s.source_type = e.source_type
+    RETURNING s.*;
+$$;
+
+-- Full scans: service role only (Home's admin-only Recount button and the
+-- nightly job), so signed-in basic users cannot trigger them
+REVOKE EXECUTE ON FUNCTION refresh_corpus_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_corpus_stats() TO service_role;
+
+-- Optional nightly recount with pg_cron:
+-- SELECT cron.schedule('refresh-corpus-stats', '0 3 * * *', 'SELECT refresh_corpus_stats()');
+
+-- 4. get_embedding_totals (EmbeddingService.totals) now reads the maintained rows
+CREATE OR REPLACE FUNCTION get_embedding_totals()
+RETURNS TABLE(source_type text, sources bigint, embedded bigint, chunks bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  SELECT s.source_type, s.sources, s.embedded, s.chunks FROM corpus_stats s;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_embedding_totals() TO authenticated;
+GRANT EXECUTE ON FUNCTION get_embedding_totals() TO anon;
+
+-- 5. Backfill
+SELECT refresh_corpus_stats();
@@ -0,0 +1,125 @@
+-- Migration: Keyset pagination for the document browser
+-- Run this in Supabase SQL Editor AFTER init_document_search.sql
+--
+-- search_documents_ranked used LIMIT/OFFSET: page N had to read and discard
+-- (N-1) * page_size rows, and rows inserted meanwhile shifted between pages.
+-- The page is now addressed by a cursor on the sort key
+-- (rank, created_at, id) - rank is 0 when there is no search text, so plain
+-- browsing is a pure (created_at, id) keyset served by the indexes below.
+
+-- 1. Sort-key indexes (newest first, id as tie-breaker)
+CREATE INDEX IF NOT EXISTS idx_documents_created_at_id
+ON documents(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_documents_session_created_at_id
+ON documents(session_id, created_at DESC, id DESC);
+
+-- 2. Replace the OFFSET version of the search RPC
+DROP FUNCTION IF EXISTS search_documents_ranked(TEXT, UUID, TEXT, TEXT, INTEGER, TEXT, INTEGER, INTEGER);
+
+-- Returns one row per document of the requested page:
+--   doc         -> document row as JSON, including the embedded 'sessions' object
+--   rank        -> relevance (0 when no search text), part of the cursor
+--   total_count -> number of matches across all pages (NULL when p_with_count = false)
+--
+-- Cursor: (p_cursor_rank, p_cursor_created_at, p_cursor_id) of a row of the
+-- current page. p_direction = 'next' returns the rows after it, 'prev' the
+-- rows before it (still ordered newest/best first). No cursor = first page.
+CREATE OR REPLACE FUNCTION search_documents_ranked(
+    p_search_text TEXT DEFAULT NULL,
+    p_session_id UUID DEFAULT NULL,
+    p_doc_type TEXT DEFAULT NULL,
+    p_regulation_ref_id TEXT DEFAULT NULL,
+    p_year INTEGER DEFAULT NULL,
+    p_group_id TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_rank REAL DEFAULT NULL,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL,
+    p_direction TEXT DEFAULT 'next',
+    p_with_count BOOLEAN DEFAULT TRUE
+) RETURNS TABLE (
+    doc jsonb,
+    rank real,
+    total_count bigint
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_text TEXT := nullif(btrim(p_search_text), '');
+    v_query tsquery;
+    v_pattern TEXT;
+    v_total BIGINT;
+    v_where TEXT := 'TRUE';
+    v_rank_expr TEXT := '0::real';
+    v_keyset TEXT := '';
+    v_order TEXT;
+    v_cmp TEXT := CASE WHEN p_direction = 'prev' THEN '>' ELSE '<' END;
+    v_dir TEXT := CASE WHEN p_direction = 'prev' THEN 'ASC' ELSE 'DESC' END;
+BEGIN
+    -- Built as dynamic SQL so each filter/cursor combination gets its own plan:
+    -- browsing then becomes an index scan on (created_at, id) that stops after p_limit rows.
+    -- Parameters: $1 session, $2 doc_type, $3 regulation, $4 year, $5 group,
+    --             $6 tsquery, $7 LIKE pattern, $8 raw text,
+    --             $9 cursor rank, $10 cursor created_at, $11 cursor id, $12 limit
+    IF p_session_id IS NOT NULL THEN v_where := v_where || ' AND d.session_id = $1'; END IF;
+    IF p_doc_type IS NOT NULL THEN v_where := v_where || ' AND d.doc_type = $2'; END IF;
+    IF p_regulation_ref_id IS NOT NULL THEN v_where := v_where || ' AND d.regulation_ref_id = $3'; END IF;
+    IF p_year IS NOT NULL THEN v_where := v_where || ' AND s.year = $4'; END IF;
+    IF p_group_id IS NOT NULL THEN v_where := v_where || ' AND s.group_id = $5'; END IF;
+
+    IF v_text IS NOT NULL THEN
+        -- Stemmed and unstemmed forms, so both titles and codes match
+        v_query := websearch_to_tsquery('english', v_text) || websearch_to_tsquery('simple', v_text);
+        -- Escape LIKE wildcards typed by the user
+        v_pattern := '%' || replace(replace(replace(v_text, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+        v_where := v_where || ' AND (d.search_tsv @@ $6'
+            || ' OR d.symbol ILIKE $7 OR d.title ILIKE $7'
+            || ' OR d.author ILIKE $7 OR d.regulation_mentioned ILIKE $7)';
+        v_rank_expr := '(ts_rank_cd(d.search_tsv, $6) + similarity(d.symbol, $8))::real';
+    END IF;
+
+    -- Total is independent of the cursor; callers can skip it when they already have it
+    IF p_with_count THEN
+        EXECUTE 'SELECT count(*) FROM documents d JOIN sessions s ON s.id = d.session_id WHERE ' || v_where
+        INTO v_total
+        USING p_session_id, p_doc_type, p_regulation_ref_id, p_year, p_group_id,
+              v_query, v_pattern, v_text;
+    END IF;
+
+    IF p_cursor_created_at IS NOT NULL AND p_cursor_id IS NOT NULL THEN
+        IF v_text IS NULL THEN
+            v_keyset := format(' AND (d.created_at, d.id) %s ($10, $11)', v_cmp);
+        ELSE
+            v_keyset := format(' AND (%s, d.created_at, d.id) %s ($9, $10, $11)', v_rank_expr, v_cmp);
+        END IF;
+    END IF;
+
+    -- 'prev' walks backwards from the cursor; the outer query restores newest/best first
+    IF v_text IS NULL THEN
+        v_order := format('d.created_at %s, d.id %s', v_dir, v_dir);
+    ELSE
+        v_order := format('match_rank %s, d.created_at %s, d.id %s', v_dir, v_dir, v_dir);
+    END IF;
+
+    RETURN QUERY EXECUTE
+        'SELECT page.doc, page.match_rank, $13::bigint FROM ('
+        || ' SELECT (to_jsonb(d) - ''search_tsv'')'
+        || '   || jsonb_build_object(''sessions'', jsonb_build_object('
+        || '        ''group_id'', s.group_id, ''code'', s.code, ''year'', s.year)) AS doc,'
+        || '   ' || v_rank_expr || ' AS match_rank, d.created_at, d.id'
+        || ' FROM documents d JOIN sessions s ON s.id = d.session_id'
+        || ' WHERE ' || v_where || v_keyset
+        || ' ORDER BY ' || v_order
+        || ' LIMIT $12'
+        || ') page ORDER BY page.match_rank DESC, page.created_at DESC, page.id DESC'
+    USING p_session_id, p_doc_type, p_regulation_ref_id, p_year, p_group_id,
+          v_query, v_pattern, v_text,
+          coalesce(p_cursor_rank, 0)::real, p_cursor_created_at, p_cursor_id, p_limit,
+          v_total;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_documents_ranked(TEXT, UUID, TEXT, TEXT, INTEGER, TEXT, INTEGER, REAL, TIMESTAMP WITH TIME ZONE, UUID, TEXT, BOOLEAN) TO authenticated;
+GRANT EXECUTE ON FUNCTION search_documents_ranked(TEXT, UUID, TEXT, TEXT, INTEGER, TEXT, INTEGER, REAL, TIMESTAMP WITH TIME ZONE, UUID, TEXT, BOOLEAN) TO anon;
@@ -0,0 +1,118 @@
+-- Migration: Indexed full-text search for documents
+-- Run this in Supabase SQL Editor
+--
+-- Replaces the four-column ILIKE OR used by the Search & Session View
+-- (symbol/title/author/regulation_mentioned) with:
+--   * a weighted tsvector column (symbol A, title B, regulation_mentioned B, author C)
+--   * trigram indexes so substring matches on short codes ("R48", "GRE/2024")
+--     are served by an index instead of a sequential scan
+--   * one RPC returning the ranked page AND the total count, so the page
+--     no longer runs a separate count query per keystroke
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. Weighted search vector (kept in sync by Postgres, no trigger needed)
+-- Titles are stemmed ('english'); symbols, regulations and authors are codes/names ('simple')
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(symbol, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(title, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(regulation_mentioned, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(author, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_documents_search_tsv
+ON documents USING gin(search_tsv);
+
+-- 2. Trigram indexes for ILIKE '%term%' substring matches
+CREATE INDEX IF NOT EXISTS idx_documents_symbol_trgm
+ON documents USING gin(symbol gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_documents_title_trgm
+ON documents USING gin(title gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_documents_author_trgm
+ON documents USING gin(author gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_documents_regulation_mentioned_trgm
+ON documents USING gin(regulation_mentioned gin_trgm_ops);
+
+-- Filter columns used together with the search
+CREATE INDEX IF NOT EXISTS idx_documents_session_id ON documents(session_id);
+CREATE INDEX IF NOT EXISTS idx_documents_doc_type ON documents(doc_type);
+
+-- 3. Ranked search RPC
+-- Returns one row per document of the requested page:
+--   doc         -> document row as JSON, including the embedded 'sessions' object
+--                  (same shape as select("*, sessions!inner(group_id, code, year)"))
+--   rank        -> relevance (0 when no search text)
+--   total_count -> number of matches across all pages
+CREATE OR REPLACE FUNCTION search_documents_ranked(
+    p_search_text TEXT DEFAULT NULL,
+    p_session_id UUID DEFAULT NULL,
+    p_doc_type TEXT DEFAULT NULL,
+    p_regulation_ref_id TEXT DEFAULT NULL,
+    p_year INTEGER DEFAULT NULL,
+    p_group_id TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50,
+    p_offset INTEGER DEFAULT 0
+) RETURNS TABLE (
+    doc jsonb,
+    rank real,
+    total_count bigint
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_text TEXT := nullif(btrim(p_search_text), '');
+    v_query tsquery;
+    v_pattern TEXT;
+BEGIN
+    IF v_text IS NOT NULL THEN
+        -- Stemmed and unstemmed forms, so both titles and codes match
+        v_query := websearch_to_tsquery('english', v_text) || websearch_to_tsquery('simple', v_text);
+        -- Escape LIKE wildcards typed by the user
+        v_pattern := '%' || replace(replace(replace(v_text, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+    END IF;
+
+    RETURN QUERY
+    WITH matches AS (
+        SELECT
+            d.*,
+            s.group_id AS s_group_id,
+            s.code AS s_code,
+            s.year AS s_year,
+            CASE WHEN v_text IS NULL THEN 0::real
+                 ELSE ts_rank_cd(d.search_tsv, v_query) + similarity(d.symbol, v_text)
+            END AS match_rank
+        FROM documents d
+        JOIN sessions s ON s.id = d.session_id
+        WHERE (p_session_id IS NULL OR d.session_id = p_session_id)
+          AND (p_doc_type IS NULL OR d.doc_type = p_doc_type)
+          AND (p_regulation_ref_id IS NULL OR d.regulation_ref_id = p_regulation_ref_id)
+          AND (p_year IS NULL OR s.year = p_year)
+          AND (p_group_id IS NULL OR s.group_id = p_group_id)
+          AND (
+              v_text IS NULL
+              OR d.search_tsv @@ v_query
+              OR d.symbol ILIKE v_pattern
+              OR d.title ILIKE v_pattern
+              OR d.author ILIKE v_pattern
+              OR d.regulation_mentioned ILIKE v_pattern
+          )
+    )
+    SELECT
+        (to_jsonb(m) - 's_group_id' - 's_code' - 's_year' - 'match_rank' - 'search_tsv')
+            || jsonb_build_object('sessions', jsonb_build_object(
+                'group_id', m.s_group_id, 'code', m.s_code, 'year', m.s_year)),
+        m.match_rank,
+        count(*) OVER ()
+    FROM matches m
+    ORDER BY m.match_rank DESC, m.created_at DESC, m.id DESC
+    LIMIT p_limit OFFSET p_offset;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_documents_ranked(TEXT, UUID, TEXT, TEXT, INTEGER, TEXT, INTEGER, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION search_documents_ranked(TEXT, UUID, TEXT, TEXT, INTEGER, TEXT, INTEGER, INTEGER) TO anon;
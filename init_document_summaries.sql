@@ -0,0 +1,90 @@
+-- Migration: Precomputed per-document summaries (map step of session reports)
+-- Run this in Supabase SQL Editor AFTER init_database.sql
+--
+-- Each document gets a compact summary once, written in the background at
+-- ingestion (SummaryService) or by the backfill script summarize_documents.py.
+-- Session/regulation reports then reduce over these stored summaries instead
+-- of seeing only symbol/title lines or pushing whole PDFs through the LLM.
+
+-- 1. Table (one row per document)
+-- A failed attempt (no text in the PDF, safety block, API error) is recorded
+-- with summary NULL, the error and the attempt count, so the backfill stops
+-- retrying it after p_max_attempts instead of picking it first in every batch.
+CREATE TABLE IF NOT EXISTS document_summaries (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    summary TEXT,                       -- NULL while only failed attempts exist
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    source_chars INTEGER,               -- characters of PDF text the summary was made from
+    attempts INTEGER NOT NULL DEFAULT 0, -- failed attempts with attempt_version
+    attempt_version TEXT,               -- prompt version of the failed attempts
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tables created before failures were recorded
+ALTER TABLE document_summaries ALTER COLUMN summary DROP NOT NULL;
+ALTER TABLE document_summaries ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE document_summaries ADD COLUMN IF NOT EXISTS attempt_version TEXT;
+ALTER TABLE document_summaries ADD COLUMN IF NOT EXISTS error TEXT;
+
+ALTER TABLE document_summaries ENABLE ROW LEVEL SECURITY;
+
+-- Readable by everyone; written by signed-in users (worker threads run as the
+-- user's session, SupabaseClient.bind_session) and by the batch CLIs with the
+-- service role, which bypasses RLS
+DROP POLICY IF EXISTS "Allow All Document Summaries" ON document_summaries;
+
+DROP POLICY IF EXISTS "Document summaries are readable" ON document_summaries;
+CREATE POLICY "Document summaries are readable"
+ON document_summaries FOR SELECT
+USING (true);
+
+DROP POLICY IF EXISTS "Authenticated users write document summaries" ON document_summaries;
+CREATE POLICY "Authenticated users write document summaries"
+ON document_summaries FOR ALL
+TO authenticated
+USING (true)
+WITH CHECK (true);
+
+REVOKE INSERT, UPDATE, DELETE ON document_summaries FROM anon;
+GRANT SELECT ON document_summaries TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON document_summaries TO authenticated;
+
+-- 2. Documents still to summarize (oldest first), for the backfill:
+--    no row yet, or no summary / a summary made with an older prompt (stale)
+--    unless it already failed p_max_attempts times with the current prompt
+DROP FUNCTION IF EXISTS get_documents_without_summary(INTEGER);
+
+CREATE OR REPLACE FUNCTION get_documents_without_summary(
+    p_limit INTEGER DEFAULT 50,
+    p_prompt_version TEXT DEFAULT '1',
+    p_max_attempts INTEGER DEFAULT 3
+)
+RETURNS TABLE (
+    id uuid,
+    symbol text,
+    title text,
+    file_url text
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d.id, d.symbol, d.title, d.file_url
+    FROM documents d
+    LEFT JOIN document_summaries s ON s.document_id = d.id
+    WHERE d.file_url IS NOT NULL
+      AND (
+          s.document_id IS NULL
+          OR (
+              (s.summary IS NULL OR s.prompt_version <> p_prompt_version)
+              AND (s.attempt_version IS DISTINCT FROM p_prompt_version OR s.attempts < p_max_attempts)
+          )
+      )
+    ORDER BY d.created_at, d.id
+    LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_documents_without_summary(INTEGER, TEXT, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_documents_without_summary(INTEGER, TEXT, INTEGER) TO anon;
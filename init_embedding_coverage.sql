@@ -0,0 +1,46 @@
+-- Migration: Embedding coverage RPCs used by EmbeddingService.coverage / totals
+-- Run this in Supabase SQL Editor AFTER init_embedding_status.sql
+--
+-- Both read the trigger-maintained chunk_count / embedding_status columns,
+-- so they cost one index lookup per requested source instead of counting
+-- rows in the embeddings table.
+
+-- Chunk counts for a list of sources of one type
+-- p_source_type: 'document' | 'interpretation' | 'regulation'
+CREATE OR REPLACE FUNCTION get_embedding_coverage(p_source_ids uuid[], p_source_type text)
+RETURNS TABLE(source_id uuid, chunk_count integer)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER  -- Runs with elevated privileges, bypasses RLS (status is not sensitive)
+AS $$
+  SELECT d.id, d.chunk_count FROM documents d
+  WHERE p_source_type = 'document' AND d.id = ANY(p_source_ids)
+  UNION ALL
+  SELECT i.id, i.chunk_count FROM interpretations i
+  WHERE p_source_type = 'interpretation' AND i.id = ANY(p_source_ids)
+  UNION ALL
+  SELECT r.id, r.chunk_count FROM regulation_versions r
+  WHERE p_source_type = 'regulation' AND r.id = ANY(p_source_ids);
+$$;
+
+-- Archive-wide totals per source type (Home status panel, AI Assistant debug info)
+CREATE OR REPLACE FUNCTION get_embedding_totals()
+RETURNS TABLE(source_type text, sources bigint, embedded bigint, chunks bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  SELECT 'document', count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+  FROM documents
+  UNION ALL
+  SELECT 'interpretation', count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+  FROM interpretations
+  UNION ALL
+  SELECT 'regulation', count(*), count(*) FILTER (WHERE embedding_status = 'embedded'), coalesce(sum(chunk_count), 0)
+  FROM regulation_versions;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_embedding_coverage(uuid[], text) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_embedding_coverage(uuid[], text) TO anon;
+GRANT EXECUTE ON FUNCTION get_embedding_totals() TO authenticated;
+GRANT EXECUTE ON FUNCTION get_embedding_totals() TO anon;
@@ -0,0 +1,229 @@
+-- Migration: Maintained embedding status on every embeddable source
+-- Run this in Supabase SQL Editor AFTER init_session_counters.sql
+--
+-- documents / interpretations / regulation_versions get:
+--   chunk_count      -> number of rows in embeddings for this source
+--   embedding_status -> 'pending' (no chunks) or 'embedded' (at least one chunk)
+--
+-- Both are updated by statement-level triggers on embeddings, in the same
+-- transaction as the chunk insert/delete, so they can never disagree with the
+-- embeddings table. "Scan Missing" then reads a partial index instead of
+-- diffing every document against every embedding in Python.
+
+-- 1. Columns
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (embedding_status IN ('pending', 'embedded'));
+
+ALTER TABLE interpretations ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE interpretations ADD COLUMN IF NOT EXISTS embedding_status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (embedding_status IN ('pending', 'embedded'));
+
+ALTER TABLE regulation_versions ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE regulation_versions ADD COLUMN IF NOT EXISTS embedding_status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (embedding_status IN ('pending', 'embedded'));
+
+-- 2. Partial indexes: only the (few) rows still waiting for embeddings
+CREATE INDEX IF NOT EXISTS idx_documents_pending_embeddings
+ON documents(created_at DESC, id DESC) WHERE embedding_status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_interpretations_pending_embeddings
+ON interpretations(created_at DESC, id DESC) WHERE embedding_status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_regulation_versions_pending_embeddings
+ON regulation_versions(created_at DESC, id DESC) WHERE embedding_status = 'pending';
+
+-- 3. Apply per-source chunk deltas (p_sign = +1 for inserts, -1 for deletes)
+CREATE OR REPLACE FUNCTION apply_embedding_deltas(p_deltas jsonb)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- p_deltas: [{"source_id": ..., "source_type": ..., "delta": n}, ...]
+    UPDATE documents t
+    SET chunk_count = greatest(t.chunk_count + d.delta, 0),
+        embedding_status = CASE WHEN t.chunk_count + d.delta > 0 THEN 'embedded' ELSE 'pending' END
+    FROM jsonb_to_recordset(p_deltas) AS d(source_id uuid, source_type text, delta integer)
+    WHERE d.source_type = 'document' AND t.id = d.source_id;
+
+    UPDATE interpretations t
+    SET chunk_count = greatest(t.chunk_count + d.delta, 0),
+        embedding_status = CASE WHEN t.chunk_count + d.delta > 0 THEN 'embedded' ELSE 'pending' END
+    FROM jsonb_to_recordset(p_deltas) AS d(source_id uuid, source_type text, delta integer)
+    WHERE d.source_type = 'interpretation' AND t.id = d.source_id;
+
+    UPDATE regulation_versions t
+    SET chunk_count = greatest(t.chunk_count + d.delta, 0),
+        embedding_status = CASE WHEN t.chunk_count + d.delta > 0 THEN 'embedded' ELSE 'pending' END
+    FROM jsonb_to_recordset(p_deltas) AS d(source_id uuid, source_type text, delta integer)
+    WHERE d.source_type = 'regulation' AND t.id = d.source_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trg_embeddings_status_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM apply_embedding_deltas((
+        SELECT jsonb_agg(jsonb_build_object('source_id', source_id, 'source_type', source_type, 'delta', n))
+        FROM (SELECT source_id, source_type, count(*) AS n FROM new_rows GROUP BY 1, 2) c
+    ));
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trg_embeddings_status_delete()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM apply_embedding_deltas((
+        SELECT jsonb_agg(jsonb_build_object('source_id', source_id, 'source_type', source_type, 'delta', -n))
+        FROM (SELECT source_id, source_type, count(*) AS n FROM old_rows GROUP BY 1, 2) c
+    ));
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS embeddings_status_insert ON embeddings;
+CREATE TRIGGER embeddings_status_insert
+AFTER INSERT ON embeddings
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_embeddings_status_insert();
+
+DROP TRIGGER IF EXISTS embeddings_status_delete ON embeddings;
+CREATE TRIGGER embeddings_status_delete
+AFTER DELETE ON embeddings
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_embeddings_status_delete();
+
+-- 4. Session/group embedded counters now follow the document status transitions
+-- (replaces the first/last-chunk lookups of init_session_counters.sql)
+DROP TRIGGER IF EXISTS embeddings_session_counters ON embeddings;
+DROP FUNCTION IF EXISTS trg_embeddings_session_counters();
+DROP TRIGGER IF EXISTS embeddings_session_counters_insert ON embeddings;
+DROP TRIGGER IF EXISTS embeddings_session_counters_delete ON embeddings;
+DROP FUNCTION IF EXISTS trg_embeddings_session_counters_insert();
+DROP FUNCTION IF EXISTS trg_embeddings_session_counters_delete();
+
+CREATE OR REPLACE FUNCTION trg_documents_session_counters()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_old_embedded INTEGER;
+    v_new_embedded INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_session_counters(NEW.session_id, 1,
+            CASE WHEN NEW.embedding_status = 'embedded' THEN 1 ELSE 0 END);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_session_counters(OLD.session_id, -1,
+            CASE WHEN OLD.embedding_status = 'embedded' THEN -1 ELSE 0 END);
+    ELSE
+        v_old_embedded := CASE WHEN OLD.embedding_status = 'embedded' THEN 1 ELSE 0 END;
+        v_new_embedded := CASE WHEN NEW.embedding_status = 'embedded' THEN 1 ELSE 0 END;
+        IF NEW.session_id IS DISTINCT FROM OLD.session_id THEN
+            PERFORM bump_session_counters(OLD.session_id, -1, -v_old_embedded);
+            PERFORM bump_session_counters(NEW.session_id, 1, v_new_embedded);
+        ELSIF v_new_embedded <> v_old_embedded THEN
+            PERFORM bump_session_counters(NEW.session_id, 0, v_new_embedded - v_old_embedded);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_session_counters ON documents;
+CREATE TRIGGER documents_session_counters
+AFTER INSERT OR DELETE OR UPDATE OF session_id, embedding_status ON documents
+FOR EACH ROW EXECUTE FUNCTION trg_documents_session_counters();
+
+CREATE OR REPLACE FUNCTION refresh_session_counters()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    UPDATE sessions s
+    SET doc_count = coalesce(c.docs, 0),
+        embedded_doc_count = coalesce(c.embedded, 0)
+    FROM sessions s2
+    LEFT JOIN (
+        SELECT session_id,
+               count(*) AS docs,
+               count(*) FILTER (WHERE embedding_status = 'embedded') AS embedded
+        FROM documents
+        GROUP BY session_id
+    ) c ON c.session_id = s2.id
+    WHERE s.id = s2.id;
+
+    UPDATE groups g
+    SET doc_count = coalesce(c.docs, 0),
+        embedded_doc_count = coalesce(c.embedded, 0)
+    FROM groups g2
+    LEFT JOIN (
+        SELECT group_id, sum(doc_count) AS docs, sum(embedded_doc_count) AS embedded
+        FROM sessions
+        GROUP BY group_id
+    ) c ON c.group_id = g2.id
+    WHERE g.id = g2.id;
+$$;
+
+-- 5. Backfill from the existing embeddings, then recount the session/group counters
+CREATE OR REPLACE FUNCTION refresh_embedding_status()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH c AS (
+        SELECT source_id, count(*) AS n FROM embeddings WHERE source_type = 'document' GROUP BY source_id
+    )
+    UPDATE documents t
+    SET chunk_count = coalesce(c.n, 0),
+        embedding_status = CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END
+    FROM documents t2 LEFT JOIN c ON c.source_id = t2.id
+    WHERE t.id = t2.id
+      AND (t.chunk_count, t.embedding_status) IS DISTINCT FROM
+          (coalesce(c.n, 0), CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END);
+
+    WITH c AS (
+        SELECT source_id, count(*) AS n FROM embeddings WHERE source_type = 'interpretation' GROUP BY source_id
+    )
+    UPDATE interpretations t
+    SET chunk_count = coalesce(c.n, 0),
+        embedding_status = CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END
+    FROM interpretations t2 LEFT JOIN c ON c.source_id = t2.id
+    WHERE t.id = t2.id
+      AND (t.chunk_count, t.embedding_status) IS DISTINCT FROM
+          (coalesce(c.n, 0), CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END);
+
+    WITH c AS (
+        SELECT source_id, count(*) AS n FROM embeddings WHERE source_type = 'regulation' GROUP BY source_id
+    )
+    UPDATE regulation_versions t
+    SET chunk_count = coalesce(c.n, 0),
+        embedding_status = CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END
+    FROM regulation_versions t2 LEFT JOIN c ON c.source_id = t2.id
+    WHERE t.id = t2.id
+      AND (t.chunk_count, t.embedding_status) IS DISTINCT FROM
+          (coalesce(c.n, 0), CASE WHEN c.n > 0 THEN 'embedded' ELSE 'pending' END);
+
+    SELECT refresh_session_counters();
+$$;
+
+SELECT refresh_embedding_status();
+
+-- 6. Old unpaged RPC now reads the status column (kept for existing callers)
+CREATE OR REPLACE FUNCTION get_documents_without_embeddings()
+RETURNS setof documents
+LANGUAGE sql
+AS $$
+  SELECT *
+  FROM documents
+  WHERE embedding_status = 'pending';
+$$;
@@ -0,0 +1,81 @@
+-- Migration: Server-side search and paging for the Interpretations Library
+-- Run this in Supabase SQL Editor
+--
+-- The library page used to download every interpretation (including the full
+-- content_text transcription) and filter it in pandas. This adds:
+--   * a weighted tsvector (title/regulation A, comments B, content_text C) + GIN index
+--   * indexes for the issuer/status filters and the issue_date ordering
+--   * search_interpretations: filtered, ranked, paged, WITHOUT content_text,
+--     plus the total count in the same call
+-- content_text is fetched separately when a card is opened.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. Search vector
+ALTER TABLE interpretations
+ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(regulation_mentioned, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(comments, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content_text, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_interpretations_search_tsv
+ON interpretations USING gin(search_tsv);
+
+-- 2. Filter / ordering indexes
+CREATE INDEX IF NOT EXISTS idx_interpretations_issuer_id ON interpretations(issuer_id);
+CREATE INDEX IF NOT EXISTS idx_interpretations_status ON interpretations(status);
+CREATE INDEX IF NOT EXISTS idx_interpretations_issue_date_id
+ON interpretations(issue_date DESC NULLS LAST, id DESC);
+
+-- Regulation filter is a substring match ("R48" in "R48, R10")
+CREATE INDEX IF NOT EXISTS idx_interpretations_regulation_mentioned_trgm
+ON interpretations USING gin(regulation_mentioned gin_trgm_ops);
+
+-- 3. Paged search RPC
+-- Runs as the caller (no SECURITY DEFINER): RLS still decides which private rows are visible.
+-- Returns one row per interpretation of the page:
+--   item        -> interpretation as JSON without content_text, with 'issuers' {name, code}
+--   total_count -> matches across all pages
+CREATE OR REPLACE FUNCTION search_interpretations(
+    p_search_text TEXT DEFAULT NULL,
+    p_issuer_ids UUID[] DEFAULT NULL,
+    p_statuses TEXT[] DEFAULT NULL,
+    p_regulation TEXT DEFAULT NULL,
+    p_include_private BOOLEAN DEFAULT FALSE,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+) RETURNS TABLE (
+    item jsonb,
+    total_count bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT CASE WHEN nullif(btrim(p_search_text), '') IS NULL THEN NULL
+                    ELSE websearch_to_tsquery('english', p_search_text) END AS tsq,
+               '%' || replace(replace(replace(nullif(btrim(p_regulation), ''), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS reg_pattern
+    )
+    SELECT
+        (to_jsonb(i) - 'content_text' - 'search_tsv')
+            || jsonb_build_object('issuers', jsonb_build_object('name', iss.name, 'code', iss.code)),
+        count(*) OVER ()
+    FROM interpretations i
+    CROSS JOIN q
+    LEFT JOIN issuers iss ON iss.id = i.issuer_id
+    WHERE (p_include_private OR i.is_public)
+      AND (p_issuer_ids IS NULL OR i.issuer_id = ANY(p_issuer_ids))
+      AND (p_statuses IS NULL OR i.status::text = ANY(p_statuses))
+      AND (q.reg_pattern IS NULL OR i.regulation_mentioned ILIKE q.reg_pattern)
+      AND (q.tsq IS NULL OR i.search_tsv @@ q.tsq)
+    ORDER BY
+        CASE WHEN q.tsq IS NULL THEN 0 ELSE ts_rank_cd(i.search_tsv, q.tsq) END DESC,
+        i.issue_date DESC NULLS LAST,
+        i.id DESC
+    LIMIT p_limit OFFSET p_offset;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_interpretations(TEXT, UUID[], TEXT[], TEXT, BOOLEAN, INTEGER, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION search_interpretations(TEXT, UUID[], TEXT[], TEXT, BOOLEAN, INTEGER, INTEGER) TO anon;
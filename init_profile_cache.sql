@@ -0,0 +1,13 @@
+-- Migration: Invalidate cached user profiles across processes
+-- Run this in Supabase SQL Editor AFTER init_reference_cache.sql
+--
+-- SupabaseClient.get_user_profile caches role/email per user id (auth_utils
+-- resolves the user on every fresh session and page load). Role changes made
+-- through User Management invalidate the local cache directly; this trigger
+-- bumps the reference cache version so other server processes (and changes
+-- made in the SQL Editor) are picked up within REFERENCE_CACHE_VERSION_POLL.
+
+DROP TRIGGER IF EXISTS profiles_reference_cache_version ON public.profiles;
+CREATE TRIGGER profiles_reference_cache_version
+AFTER INSERT OR UPDATE OR DELETE ON public.profiles
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
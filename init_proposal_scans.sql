@@ -0,0 +1,95 @@
+-- Migration: Resumable batch scanning of WP.29 reports for adopted proposals
+-- Run this in Supabase SQL Editor AFTER init_adopted_proposals.sql
+--
+-- The batch scanner (scan_proposals.py / "Batch Scan" on the Adopted Proposals
+-- page) records one row per scanned document. Extracted proposals are staged
+-- here for bulk review and only copied to adopted_proposals when approved.
+-- Because progress lives in this table, a long backfill can be stopped and
+-- resumed: documents already staged/approved/rejected are never rescanned.
+
+-- 1. Scan state per document
+CREATE TABLE IF NOT EXISTS proposal_scans (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    session_id UUID REFERENCES sessions(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'staged', 'empty', 'failed', 'approved', 'rejected')),
+    proposals JSONB,                    -- staged extraction results
+    proposal_count INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    seconds REAL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS proposal_scans_status_idx ON proposal_scans(status);
+
+ALTER TABLE proposal_scans ENABLE ROW LEVEL SECURITY;
+
+-- Readable by everyone; written by signed-in users (worker threads run as the
+-- user's session, SupabaseClient.bind_session) and by the batch CLIs with the
+-- service role, which bypasses RLS
+DROP POLICY IF EXISTS "Allow All Proposal Scans" ON proposal_scans;
+
+DROP POLICY IF EXISTS "Proposal scans are readable" ON proposal_scans;
+CREATE POLICY "Proposal scans are readable"
+ON proposal_scans FOR SELECT
+USING (true);
+
+DROP POLICY IF EXISTS "Authenticated users write proposal scans" ON proposal_scans;
+CREATE POLICY "Authenticated users write proposal scans"
+ON proposal_scans FOR ALL
+TO authenticated
+USING (true)
+WITH CHECK (true);
+
+REVOKE INSERT, UPDATE, DELETE ON proposal_scans FROM anon;
+GRANT SELECT ON proposal_scans TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON proposal_scans TO authenticated;
+
+-- 2. Documents still to scan (newest sessions first)
+-- WP.29 Reports / Adopted Proposals with a PDF, no saved proposals and no
+-- finished scan; failed scans are retried until p_max_attempts. A 'running'
+-- scan is only picked again once it started more than p_running_timeout
+-- minutes ago (its process died), so two hosts do not scan it at once.
+DROP FUNCTION IF EXISTS get_unscanned_proposal_documents(INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION get_unscanned_proposal_documents(
+    p_limit INTEGER DEFAULT 1000,
+    p_max_attempts INTEGER DEFAULT 3,
+    p_running_timeout INTEGER DEFAULT 30
+)
+RETURNS TABLE (
+    id uuid,
+    session_id uuid,
+    symbol text,
+    title text,
+    doc_type text,
+    session_code text,
+    session_year integer
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d.id, d.session_id, d.symbol, d.title, d.doc_type, s.code, s.year
+    FROM documents d
+    JOIN sessions s ON s.id = d.session_id
+    WHERE s.group_id IN ('WP29', 'WP.29')
+      AND d.doc_type IN ('Report', 'Adopted Proposals')
+      AND d.file_url IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM adopted_proposals ap WHERE ap.source_doc_id = d.id)
+      AND NOT EXISTS (
+          SELECT 1 FROM proposal_scans ps
+          WHERE ps.document_id = d.id
+            AND (ps.status IN ('staged', 'empty', 'approved', 'rejected')
+                 OR (ps.status = 'failed' AND ps.attempts >= p_max_attempts)
+                 OR (ps.status = 'running'
+                     AND coalesce(ps.started_at, ps.updated_at) > NOW() - make_interval(mins => p_running_timeout)))
+      )
+    ORDER BY s.year DESC, d.created_at DESC
+    LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_unscanned_proposal_documents(INTEGER, INTEGER, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_unscanned_proposal_documents(INTEGER, INTEGER, INTEGER) TO anon;
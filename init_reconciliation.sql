@@ -0,0 +1,200 @@
+-- Migration: Storage / database reconciliation
+-- Run this in Supabase SQL Editor AFTER init_report_exports.sql
+--
+-- reconcile_storage.py (reconciler.py) compares the storage buckets with the
+-- rows that reference them as sorted streams, one page at a time, so memory
+-- stays constant however many objects there are. Every stream here is ordered
+-- with COLLATE "C" (byte order = Python string order) and paged by keyset
+-- (p_after = last key of the previous page), backed by an index:
+--   * list_storage_objects     -> objects of unece-archive / chunks_cache
+--   * list_archive_references  -> archive paths used by documents,
+--                                 interpretations, regulation_versions, report_exports
+--   * list_chunk_references    -> embeddings.content_path
+--   * list_embedding_sources   -> distinct embeddings.source_id per source_type
+
+-- 1. Archive path of a file_url (same rule as SupabaseClient._storage_path)
+-- archive_bucket() must return Config.STORAGE_BUCKET (STORAGE_BUCKET in .env);
+-- if the bucket is renamed, change it here and rebuild the *_archive_path_idx
+-- indexes (DROP INDEX, then run this file again). The reconciler passes its
+-- bucket to list_archive_references, which refuses a mismatch instead of
+-- reporting every archive file as orphan.
+CREATE OR REPLACE FUNCTION archive_bucket()
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT 'unece-archive'::text;
+$$;
+
+CREATE OR REPLACE FUNCTION archive_object_path(p_url TEXT, p_bucket TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT split_part(
+        CASE WHEN position('/' || p_bucket || '/' IN p_url) > 0
+             THEN substr(p_url, position('/' || p_bucket || '/' IN p_url) + length(p_bucket) + 2)
+             ELSE p_url
+        END,
+        '?', 1);
+$$;
+
+-- One-argument form for the expression indexes (immutable, archive bucket)
+CREATE OR REPLACE FUNCTION archive_object_path(p_url TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT public.archive_object_path(p_url, public.archive_bucket());
+$$;
+
+CREATE INDEX IF NOT EXISTS documents_archive_path_idx
+ON documents ((archive_object_path(file_url)) COLLATE "C")
+WHERE file_url IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS interpretations_archive_path_idx
+ON interpretations ((archive_object_path(file_url)) COLLATE "C")
+WHERE file_url IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS regulation_versions_archive_path_idx
+ON regulation_versions ((archive_object_path(file_url)) COLLATE "C")
+WHERE file_url IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_content_path_c
+ON embeddings (content_path COLLATE "C")
+WHERE content_path IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_type_source
+ON embeddings (source_type, source_id);
+
+-- 2. Storage objects of a bucket, by name
+-- SECURITY DEFINER: storage.objects is not readable by anon/authenticated.
+-- Limited to the two app buckets and returns names only. Executable by the
+-- service role only: the archive bucket is public, so listing its names
+-- would expose files whose rows RLS hides. Report-only runs without the
+-- service key list the buckets through the storage API instead.
+CREATE OR REPLACE FUNCTION list_storage_objects(
+    p_bucket TEXT,
+    p_after TEXT DEFAULT '',
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+    name text,
+    size bigint,
+    created_at timestamptz
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+    SELECT o.name, (o.metadata->>'size')::bigint, o.created_at
+    FROM storage.objects o
+    WHERE o.bucket_id = p_bucket
+      AND p_bucket IN (public.archive_bucket(), 'chunks_cache')
+      AND o.name COLLATE "C" > coalesce(p_after, '') COLLATE "C"
+    ORDER BY o.name COLLATE "C"
+    LIMIT p_limit;
+$$;
+
+-- 3. Archive paths referenced by one table ('documents', 'interpretations',
+-- 'regulation_versions' or 'report_exports'); duplicates are possible
+-- (content-addressed PDFs shared by several documents). p_bucket is the
+-- caller's archive bucket and must match archive_bucket().
+DROP FUNCTION IF EXISTS list_archive_references(TEXT, TEXT, INTEGER);
+
+CREATE OR REPLACE FUNCTION list_archive_references(
+    p_source TEXT,
+    p_bucket TEXT,
+    p_after TEXT DEFAULT '',
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (path text)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    IF p_bucket IS DISTINCT FROM archive_bucket() THEN
+        RAISE EXCEPTION 'archive_object_path() strips bucket %, not % (update archive_bucket() in init_reconciliation.sql)',
+            archive_bucket(), p_bucket;
+    END IF;
+    p_after := coalesce(p_after, '');
+    IF p_source = 'documents' THEN
+        RETURN QUERY
+        SELECT archive_object_path(t.file_url) FROM documents t
+        WHERE t.file_url IS NOT NULL
+          AND archive_object_path(t.file_url) COLLATE "C" > p_after COLLATE "C"
+        ORDER BY archive_object_path(t.file_url) COLLATE "C"
+        LIMIT p_limit;
+    ELSIF p_source = 'interpretations' THEN
+        RETURN QUERY
+        SELECT archive_object_path(t.file_url) FROM interpretations t
+        WHERE t.file_url IS NOT NULL
+          AND archive_object_path(t.file_url) COLLATE "C" > p_after COLLATE "C"
+        ORDER BY archive_object_path(t.file_url) COLLATE "C"
+        LIMIT p_limit;
+    ELSIF p_source = 'regulation_versions' THEN
+        RETURN QUERY
+        SELECT archive_object_path(t.file_url) FROM regulation_versions t
+        WHERE t.file_url IS NOT NULL
+          AND archive_object_path(t.file_url) COLLATE "C" > p_after COLLATE "C"
+        ORDER BY archive_object_path(t.file_url) COLLATE "C"
+        LIMIT p_limit;
+    ELSIF p_source = 'report_exports' THEN
+        -- One row per session: small enough to sort without an index
+        RETURN QUERY
+        SELECT r.p FROM (
+            SELECT markdown_path AS p FROM report_exports WHERE markdown_path IS NOT NULL
+            UNION
+            SELECT docx_path FROM report_exports WHERE docx_path IS NOT NULL
+        ) r
+        WHERE r.p COLLATE "C" > p_after COLLATE "C"
+        ORDER BY r.p COLLATE "C"
+        LIMIT p_limit;
+    ELSE
+        RAISE EXCEPTION 'Unknown reference source: %', p_source;
+    END IF;
+END;
+$$;
+
+-- 4. chunks_cache paths referenced by embeddings
+CREATE OR REPLACE FUNCTION list_chunk_references(
+    p_after TEXT DEFAULT '',
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (path text)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT e.content_path FROM embeddings e
+    WHERE e.content_path IS NOT NULL
+      AND e.content_path COLLATE "C" > coalesce(p_after, '') COLLATE "C"
+    ORDER BY e.content_path COLLATE "C"
+    LIMIT p_limit;
+$$;
+
+-- 5. Distinct sources of the embeddings of one source_type, by id
+CREATE OR REPLACE FUNCTION list_embedding_sources(
+    p_source_type TEXT,
+    p_after UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (source_id uuid)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT e.source_id FROM embeddings e
+    WHERE e.source_type = p_source_type
+      AND (p_after IS NULL OR e.source_id > p_after)
+    ORDER BY e.source_id
+    LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION archive_bucket() TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION archive_object_path(TEXT, TEXT) TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION archive_object_path(TEXT) TO authenticated, anon;
+REVOKE EXECUTE ON FUNCTION list_storage_objects(TEXT, TEXT, INTEGER) FROM PUBLIC, authenticated, anon;
+GRANT EXECUTE ON FUNCTION list_storage_objects(TEXT, TEXT, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION list_archive_references(TEXT, TEXT, TEXT, INTEGER) TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION list_chunk_references(TEXT, INTEGER) TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION list_embedding_sources(TEXT, UUID, INTEGER) TO authenticated, anon;
@@ -0,0 +1,73 @@
+-- Migration: Version counter for the reference-data cache
+-- Run this in Supabase SQL Editor
+--
+-- SupabaseClient caches slow-changing tables (groups, sessions, issuers,
+-- regulations) in process memory. Every write to those tables bumps the
+-- version below (statement-level triggers, so bulk writes bump once), and
+-- each server process polls it to drop its cache when another process,
+-- a page using the raw client or the SQL Editor changed the data.
+-- Updates of the trigger-maintained counters (doc_count, embedded_doc_count,
+-- chunk_count, embedding_status) do not bump it: they change on every ingest
+-- and cached counts are allowed to lag by REFERENCE_CACHE_TTL.
+
+CREATE TABLE IF NOT EXISTS reference_cache_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),  -- single row
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO reference_cache_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE reference_cache_version ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Reference cache version is readable" ON reference_cache_version;
+CREATE POLICY "Reference cache version is readable"
+ON reference_cache_version FOR SELECT
+USING (true);
+
+-- Bump function (SECURITY DEFINER: writers do not need UPDATE on the table)
+CREATE OR REPLACE FUNCTION bump_reference_cache_version()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    UPDATE reference_cache_version
+    SET version = version + 1,
+        updated_at = NOW()
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$;
+
+-- Inserts/deletes always bump; updates only when a data column is set
+-- (UPDATE OF), so counter updates from init_session_counters.sql and
+-- init_embedding_status.sql do not invalidate every cache on each ingest.
+DROP TRIGGER IF EXISTS groups_reference_cache_version ON groups;
+CREATE TRIGGER groups_reference_cache_version
+AFTER INSERT OR DELETE OR UPDATE OF id, full_name, type, parent_group_id ON groups
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
+
+DROP TRIGGER IF EXISTS sessions_reference_cache_version ON sessions;
+CREATE TRIGGER sessions_reference_cache_version
+AFTER INSERT OR DELETE OR UPDATE OF id, group_id, code, year, dates ON sessions
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
+
+DROP TRIGGER IF EXISTS issuers_reference_cache_version ON issuers;
+CREATE TRIGGER issuers_reference_cache_version
+AFTER INSERT OR UPDATE OR DELETE ON issuers
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
+
+DROP TRIGGER IF EXISTS regulations_reference_cache_version ON regulations;
+CREATE TRIGGER regulations_reference_cache_version
+AFTER INSERT OR UPDATE OR DELETE ON regulations
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
+
+DROP TRIGGER IF EXISTS regulation_versions_reference_cache_version ON regulation_versions;
+CREATE TRIGGER regulation_versions_reference_cache_version
+AFTER INSERT OR DELETE
+    OR UPDATE OF id, regulation_id, series, revision, status, entry_date, file_url
+ON regulation_versions
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_cache_version();
@@ -0,0 +1,50 @@
+-- Migration: Background report exports for whole groups or years
+-- Run this in Supabase SQL Editor AFTER init_session_reports.sql
+--
+-- export_reports.py (ReportService.export_reports) generates the session
+-- reports of a group/year, uploads the Markdown and Word files to the archive
+-- bucket under reports/{group}/{year}/ and records one row per session here.
+-- A rerun skips the 'done' sessions (resume); the Report Generator lists and
+-- downloads the exported files.
+
+CREATE TABLE IF NOT EXISTS report_exports (
+    session_id UUID PRIMARY KEY REFERENCES sessions(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'done', 'partial', 'failed')),
+    markdown_path TEXT,                 -- paths in the archive bucket
+    docx_path TEXT,
+    sections INTEGER,
+    cached_sections INTEGER,
+    failed_sections INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    seconds REAL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS report_exports_status_idx ON report_exports(status);
+
+ALTER TABLE report_exports ENABLE ROW LEVEL SECURITY;
+
+-- Readable by everyone; written by signed-in users (worker threads run as the
+-- user's session, SupabaseClient.bind_session) and by the batch CLIs with the
+-- service role, which bypasses RLS
+DROP POLICY IF EXISTS "Allow All Report Exports" ON report_exports;
+
+DROP POLICY IF EXISTS "Report exports are readable" ON report_exports;
+CREATE POLICY "Report exports are readable"
+ON report_exports FOR SELECT
+USING (true);
+
+DROP POLICY IF EXISTS "Authenticated users write report exports" ON report_exports;
+CREATE POLICY "Authenticated users write report exports"
+ON report_exports FOR ALL
+TO authenticated
+USING (true)
+WITH CHECK (true);
+
+REVOKE INSERT, UPDATE, DELETE ON report_exports FROM anon;
+GRANT SELECT ON report_exports TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON report_exports TO authenticated;
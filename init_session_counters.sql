@@ -0,0 +1,223 @@
+-- Migration: Denormalized document counters on sessions and groups
+-- Run this in Supabase SQL Editor
+--
+-- sessions.doc_count / groups.doc_count                   -> number of documents
+-- sessions.embedded_doc_count / groups.embedded_doc_count -> documents with at least one embedding
+--
+-- Maintained by triggers on documents, embeddings and sessions, so My Meetings,
+-- the Smart Ingestion session picker and the Home status panel read them with a
+-- single select instead of one count query per session.
+-- Group counters cover the group's own sessions (not its child groups).
+
+-- 1. Columns
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS doc_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS embedded_doc_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS doc_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS embedded_doc_count INTEGER NOT NULL DEFAULT 0;
+
+-- Embedding lookups by document (used by the triggers below)
+CREATE INDEX IF NOT EXISTS idx_embeddings_source_id ON embeddings(source_id);
+
+-- 2. Helper: apply a delta to a session and its group
+CREATE OR REPLACE FUNCTION bump_session_counters(p_session_id UUID, p_docs INTEGER, p_embedded INTEGER)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_group_id TEXT;
+BEGIN
+    UPDATE sessions
+    SET doc_count = doc_count + p_docs,
+        embedded_doc_count = embedded_doc_count + p_embedded
+    WHERE id = p_session_id
+    RETURNING group_id INTO v_group_id;
+
+    -- Session already gone (cascade from a session delete): its own trigger adjusts the group
+    IF v_group_id IS NOT NULL THEN
+        UPDATE groups
+        SET doc_count = doc_count + p_docs,
+            embedded_doc_count = embedded_doc_count + p_embedded
+        WHERE id = v_group_id;
+    END IF;
+END;
+$$;
+
+-- 3. Documents: insert / delete / move to another session
+CREATE OR REPLACE FUNCTION trg_documents_session_counters()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_embedded INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_session_counters(NEW.session_id, 1, 0);
+    ELSIF TG_OP = 'DELETE' THEN
+        v_embedded := CASE WHEN EXISTS (
+            SELECT 1 FROM embeddings e WHERE e.source_id = OLD.id AND e.source_type = 'document'
+        ) THEN 1 ELSE 0 END;
+        PERFORM bump_session_counters(OLD.session_id, -1, -v_embedded);
+    ELSIF NEW.session_id IS DISTINCT FROM OLD.session_id THEN
+        v_embedded := CASE WHEN EXISTS (
+            SELECT 1 FROM embeddings e WHERE e.source_id = NEW.id AND e.source_type = 'document'
+        ) THEN 1 ELSE 0 END;
+        PERFORM bump_session_counters(OLD.session_id, -1, -v_embedded);
+        PERFORM bump_session_counters(NEW.session_id, 1, v_embedded);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_session_counters ON documents;
+CREATE TRIGGER documents_session_counters
+AFTER INSERT OR DELETE OR UPDATE OF session_id ON documents
+FOR EACH ROW EXECUTE FUNCTION trg_documents_session_counters();
+
+-- 4. Embeddings: first chunk of a document / last chunk removed
+-- Statement-level with transition tables: the checks run after the whole
+-- statement, so a multi-row insert/delete (all chunks of a document at once)
+-- must be compared against the statement's rows, not one row at a time.
+CREATE OR REPLACE FUNCTION trg_embeddings_session_counters_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    -- Documents whose embeddings all come from this statement: newly embedded
+    FOR r IN
+        SELECT d.session_id, count(*)::integer AS n
+        FROM (
+            SELECT nr.source_id
+            FROM new_rows nr
+            WHERE nr.source_type = 'document'
+            GROUP BY nr.source_id
+            HAVING count(*) = (
+                SELECT count(*) FROM embeddings e
+                WHERE e.source_id = nr.source_id AND e.source_type = 'document'
+            )
+        ) firsts
+        JOIN documents d ON d.id = firsts.source_id
+        GROUP BY d.session_id
+    LOOP
+        PERFORM bump_session_counters(r.session_id, 0, r.n);
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trg_embeddings_session_counters_delete()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    -- Documents left without embeddings by this statement. Documents already
+    -- deleted are skipped by the join: their own trigger accounted for them.
+    FOR r IN
+        SELECT d.session_id, count(*)::integer AS n
+        FROM (
+            SELECT DISTINCT o.source_id
+            FROM old_rows o
+            WHERE o.source_type = 'document'
+        ) touched
+        JOIN documents d ON d.id = touched.source_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM embeddings e
+            WHERE e.source_id = touched.source_id AND e.source_type = 'document'
+        )
+        GROUP BY d.session_id
+    LOOP
+        PERFORM bump_session_counters(r.session_id, 0, -r.n);
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS embeddings_session_counters ON embeddings;
+DROP FUNCTION IF EXISTS trg_embeddings_session_counters();
+
+DROP TRIGGER IF EXISTS embeddings_session_counters_insert ON embeddings;
+CREATE TRIGGER embeddings_session_counters_insert
+AFTER INSERT ON embeddings
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_embeddings_session_counters_insert();
+
+DROP TRIGGER IF EXISTS embeddings_session_counters_delete ON embeddings;
+CREATE TRIGGER embeddings_session_counters_delete
+AFTER DELETE ON embeddings
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_embeddings_session_counters_delete();
+
+-- 5. Sessions: moved to another group / deleted
+CREATE OR REPLACE FUNCTION trg_sessions_group_counters()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        -- OLD holds the counts from before the cascaded document deletes
+        UPDATE groups
+        SET doc_count = doc_count - OLD.doc_count,
+            embedded_doc_count = embedded_doc_count - OLD.embedded_doc_count
+        WHERE id = OLD.group_id;
+    ELSIF NEW.group_id IS DISTINCT FROM OLD.group_id THEN
+        UPDATE groups
+        SET doc_count = doc_count - OLD.doc_count,
+            embedded_doc_count = embedded_doc_count - OLD.embedded_doc_count
+        WHERE id = OLD.group_id;
+        UPDATE groups
+        SET doc_count = doc_count + NEW.doc_count,
+            embedded_doc_count = embedded_doc_count + NEW.embedded_doc_count
+        WHERE id = NEW.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sessions_group_counters ON sessions;
+CREATE TRIGGER sessions_group_counters
+AFTER DELETE OR UPDATE OF group_id ON sessions
+FOR EACH ROW EXECUTE FUNCTION trg_sessions_group_counters();
+
+-- 6. Full recount (backfill now, and a repair tool if counters ever drift)
+CREATE OR REPLACE FUNCTION refresh_session_counters()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    UPDATE sessions s
+    SET doc_count = coalesce(c.docs, 0),
+        embedded_doc_count = coalesce(c.embedded, 0)
+    FROM sessions s2
+    LEFT JOIN (
+        SELECT d.session_id,
+               count(*) AS docs,
+               count(*) FILTER (WHERE EXISTS (
+                   SELECT 1 FROM embeddings e WHERE e.source_id = d.id AND e.source_type = 'document'
+               )) AS embedded
+        FROM documents d
+        GROUP BY d.session_id
+    ) c ON c.session_id = s2.id
+    WHERE s.id = s2.id;
+
+    UPDATE groups g
+    SET doc_count = coalesce(c.docs, 0),
+        embedded_doc_count = coalesce(c.embedded, 0)
+    FROM groups g2
+    LEFT JOIN (
+        SELECT group_id, sum(doc_count) AS docs, sum(embedded_doc_count) AS embedded
+        FROM sessions
+        GROUP BY group_id
+    ) c ON c.group_id = g2.id
+    WHERE g.id = g2.id;
+$$;
+
+SELECT refresh_session_counters();
@@ -0,0 +1,42 @@
+-- Migration: Persistent cache of generated report sections
+-- Run this in Supabase SQL Editor AFTER init_database.sql
+--
+-- The Report Generator stores each generated regulation section here, keyed by
+-- (session, regulation, fingerprint of the member documents, model, prompt
+-- version). Regenerating a session report only calls Gemini for the sections
+-- whose documents changed; the Markdown/Word export is assembled from these rows.
+
+-- 1. Table
+CREATE TABLE IF NOT EXISTS session_reports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    session_id UUID NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    regulation TEXT NOT NULL,           -- regulation id or 'General Topics'
+    input_hash TEXT NOT NULL,           -- SHA-256 of the member documents (GeminiClient.report_fingerprint)
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    content TEXT NOT NULL,              -- generated markdown section
+    document_count INTEGER,
+    generation_seconds REAL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (session_id, regulation, input_hash, model, prompt_version)
+);
+
+CREATE INDEX IF NOT EXISTS session_reports_session_idx ON session_reports(session_id);
+
+-- 2. RLS
+ALTER TABLE session_reports ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Session reports are readable" ON session_reports;
+CREATE POLICY "Session reports are readable"
+ON session_reports FOR SELECT
+USING (true);
+
+DROP POLICY IF EXISTS "Authenticated users write session reports" ON session_reports;
+CREATE POLICY "Authenticated users write session reports"
+ON session_reports FOR ALL
+TO authenticated
+USING (true)
+WITH CHECK (true);
+
+GRANT SELECT ON session_reports TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON session_reports TO authenticated;
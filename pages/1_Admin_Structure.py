@@ -4,7 +4,6 @@ Group and Session Management
 """
 import streamlit as st
 from supabase_client import SupabaseClient
-import pandas as pd
 
 st.set_page_config(page_title="Admin & Structure", page_icon="🏛️", layout="wide")
 
@@ -182,6 +181,7 @@ with tab2:
                 
                 if sessions:
                     # Create dataframe for display
+                    import pandas as pd  # loaded on first use
                     df = pd.DataFrame(sessions)
                     df = df[['code', 'year', 'dates', 'id']].sort_values('year', ascending=False)
                     df.columns = ['Session Code', 'Year', 'Dates', 'ID']
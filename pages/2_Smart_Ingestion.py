@@ -7,9 +7,10 @@ from supabase_client import SupabaseClient
 from pdf_processor import PDFProcessor
 from gemini_client import GeminiClient
 from embedding_service import EmbeddingService
+from summary_service import SummaryService
 from config import Config
-import pandas as pd
 from datetime import datetime
+import hashlib
 
 st.set_page_config(page_title="Smart Ingestion", page_icon="📤", layout="wide")
 
@@ -118,11 +119,40 @@ with tab1:
     # PROCESS BUTTON
     if uploaded_files and st.button(f"⚡ Extract Metadata for {len(uploaded_files)} Files"):
         st.session_state.bulk_results = [] # Reset
+        st.session_state.bulk_duplicates = []
         progress_bar = st.progress(0)
         status_box = st.empty()
         
+        # Hash every file first: known content skips extraction, upload and embedding
+        file_hashes = []
+        for file in uploaded_files:
+            file.seek(0)
+            file_hashes.append(hashlib.sha256(file.read()).hexdigest())
+            file.seek(0)
+        known_hashes = SupabaseClient.find_documents_by_hash(file_hashes)
+        batch_hashes = {}
+        
         for idx, file in enumerate(uploaded_files):
             status_box.info(f"Processing {idx+1}/{len(uploaded_files)}: {file.name}")
+            content_sha256 = file_hashes[idx]
+            
+            if content_sha256 in known_hashes:
+                existing = known_hashes[content_sha256]
+                sess = existing.get('sessions') or {}
+                st.session_state.bulk_duplicates.append(
+                    f"**{file.name}** is already in the archive as **{existing['symbol']}** "
+                    f"({sess.get('group_id', '')} session {sess.get('code', '?')}, {sess.get('year', '')})"
+                )
+                progress_bar.progress((idx + 1) / len(uploaded_files))
+                continue
+            if content_sha256 in batch_hashes:
+                st.session_state.bulk_duplicates.append(
+                    f"**{file.name}** has the same content as **{batch_hashes[content_sha256]}** in this upload"
+                )
+                progress_bar.progress((idx + 1) / len(uploaded_files))
+                continue
+            batch_hashes[content_sha256] = file.name
+            
             try:
                 # Read bytes
                 file.seek(0)
@@ -178,6 +208,7 @@ with tab1:
                 st.session_state.bulk_results.append({
                     "file_name": file.name,
                     "file_bytes": bytes(file_bytes),  # For upload
+                    "content_sha256": content_sha256,
                     "pre_chunks": chunks,  # For embedding (already extracted)
                     "symbol": meta.get('symbol') or '',
                     "title": meta.get('title') or '',
@@ -196,6 +227,12 @@ with tab1:
                 
         status_box.success("Extraction Complete! Review results below.")
         
+    if st.session_state.get('bulk_duplicates'):
+        st.info(
+            f"⏭️ Skipped {len(st.session_state.bulk_duplicates)} duplicate file(s) (no AI extraction, upload or embedding):\n\n"
+            + "\n".join(f"- {line}" for line in st.session_state.bulk_duplicates)
+        )
+        
     # 3. Review & Save
     if st.session_state.bulk_results:
         st.markdown("#### 3. Review & Save")
@@ -245,18 +282,21 @@ with tab1:
                     progress_save = st.progress(0)
                     
                     to_save = [r for r in st.session_state.bulk_results if r['selected']]
+                    summary_items = []
+                    
+                    # Saved meanwhile (other user / earlier click)? Skip instead of duplicating
+                    saved_meanwhile = SupabaseClient.find_documents_by_hash([r['content_sha256'] for r in to_save])
+                    for item in [r for r in to_save if r['content_sha256'] in saved_meanwhile]:
+                        st.warning(f"⏭️ {item['file_name']} was already saved as {saved_meanwhile[item['content_sha256']]['symbol']}")
+                    to_save = [r for r in to_save if r['content_sha256'] not in saved_meanwhile]
                     
                     for idx, item in enumerate(to_save):
                         try:
                             # Get bytes for upload
                             bytes_data = item['file_bytes']
                             
-                            # Step 1: Sanitize filename and upload
-                            import re
-                            # Ensure symbol is string, fallback to 'Unknown' if empty
-                            clean_symbol = str(item['symbol'] or 'Unknown')
-                            safe_symbol = re.sub(r'[/\\:*?"<>|]', '-', clean_symbol)
-                            path = f"documents/{safe_symbol}.pdf"
+                            # Step 1: Content-addressed path (the symbol can be wrong, the hash cannot)
+                            path = SupabaseClient.content_storage_path(item['content_sha256'])
                             
                             # Step 2: Upload to Supabase Storage
                             try:
@@ -273,12 +313,20 @@ with tab1:
                                     author=item['author'],
                                     doc_type=item['doc_type'],
                                     file_url=url,
-                                    submission_date=item['date'].strftime("%Y-%m-%d")
+                                    submission_date=item['date'].strftime("%Y-%m-%d"),
+                                    content_sha256=item['content_sha256']
                                 )
                                 doc_id = doc_response['id']  # Extract ID from response
                             except Exception as db_err:
                                 raise Exception(f"DB create failed: {db_err}")
                             
+                            summary_items.append({
+                                'id': doc_id,
+                                'symbol': item['symbol'],
+                                'title': item['title'],
+                                'pdf_bytes': bytes_data
+                            })
+                            
                             # Step 4: Store pre-generated embeddings with NEW storage system
                             if item['embed'] and len(item.get('pre_chunks', [])) > 0:
                                 try:
@@ -345,6 +393,11 @@ with tab1:
                             st.error(f"Failed to save {item['file_name']}: {e}")
                             
                     st.success(f"Successfully saved {success_count} documents!")
+                    
+                    # Step 5: Per-document summaries for the reports, written in the background
+                    if summary_items:
+                        SummaryService.summarize_in_background(summary_items)
+                        st.caption(f"📝 Summarizing {len(summary_items)} document(s) in the background for session reports")
                     # Clear
                     st.session_state.bulk_results = []
                     # st.rerun()
@@ -1,7 +1,6 @@
 import streamlit as st
 from supabase_client import SupabaseClient
 from config import Config
-import pandas as pd
 from datetime import datetime
 import time
 from embedding_service import EmbeddingService
@@ -14,114 +13,94 @@ require_auth()
 st.title("📖 Interpretations Library")
 st.markdown("Browse and search official interpretations from Ministries, TAAM, and Internal sources.")
 
+PAGE_SIZE = 20
+
+# Pre-fetch ALL issuers (cached) for the filter and the edit dropdown
+try:
+    all_issuers_data = SupabaseClient.get_all_issuers()
+    # Create map {id: name} and list of names
+    issuer_options = {i['id']: f"{i['name']} ({i['code']})" for i in all_issuers_data}
+except:
+    all_issuers_data = []
+    issuer_options = {}
+
 # --- Side Bar Filters ---
 with st.sidebar:
     st.header("Filters")
     
-    # Text Search
+    # Text Search (full-text over title, regulation, comments and content)
     search_term = st.text_input("🔍 Search", placeholder="Title, Reg, or Content...")
     
-    # Fetch Data first to populate filters
-    # Note: Optimization would be to fetch unique values separately or cache the full data
-    try:
-        # We assume RLS handles what we can see. 
-        # For authenticated 'advanced' users, they should see private too.
-        # But we don't have auth state yet in session properly, assuming public/anon allowed by fix script.
-        # Ideally we'd toggle include_private based on actual user role.
-        # For now, fetch ALL available to current session.
-        all_interps = SupabaseClient.get_interpretations(include_private=True)
-    except Exception as e:
-        st.error(f"Error loading interpretations: {e}")
-        all_interps = []
-
-    if not all_interps:
-        st.warning("No interpretations found.")
-        st.stop()
-        
-    df = pd.DataFrame(all_interps)
-    
-    # Normalize Issuer Data (flattens json)
-    if not df.empty and 'issuers' in df.columns:
-        df['issuer_name'] = df['issuers'].apply(lambda x: x.get('name') if x else 'Unknown')
-        df['issuer_code'] = df['issuers'].apply(lambda x: x.get('code') if x else 'Unknown')
-    else:
-        df['issuer_name'] = 'Unknown'
-        df['issuer_code'] = 'UNK'
-
     # Filter: Issuer
-    all_issuers = sorted(df['issuer_name'].unique().tolist())
-    selected_issuers = st.multiselect("Issuer", all_issuers, default=[])
+    selected_issuer_ids = st.multiselect(
+        "Issuer", list(issuer_options.keys()), default=[],
+        format_func=lambda x: issuer_options[x]
+    )
     
     # Filter: Status
-    all_statuses = sorted(df['status'].unique().tolist())
-    selected_statuses = st.multiselect("Status", all_statuses, default=[])
+    selected_statuses = st.multiselect("Status", ['draft', 'final', 'superseded'], default=[])
 
-    # Filter: Regulation
-    # Extract regs, they might be free text. Simple text filter or unique values if structured.
-    # User input reg_ref is text.
+    # Filter: Regulation (free text, e.g. "R48")
+    regulation_filter = st.text_input("Regulation", placeholder="e.g. R48")
     
     # Toggle: Show Public/Private
     # show_private = st.checkbox("Show Private", value=True) # RLS handles this actually
 
-# --- Filtering Logic ---
-filtered_df = df.copy()
+# --- Server-side Filtering & Paging ---
+filters = {
+    'issuer_ids': selected_issuer_ids,
+    'statuses': selected_statuses,
+    'regulation': regulation_filter.strip()
+}
+
+# Back to the first page when filters change
+filters_key = repr((sorted(filters.items()), search_term))
+if st.session_state.get('interp_filters_key') != filters_key:
+    st.session_state.interp_filters_key = filters_key
+    st.session_state.interp_page = 1
 
-if search_term:
-    # Case insensitive search across multiple fields
-    term = search_term.lower()
-    mask = (
-        filtered_df['title'].str.lower().str.contains(term, na=False) |
-        filtered_df['regulation_mentioned'].str.lower().str.contains(term, na=False) |
-        filtered_df['comments'].str.lower().str.contains(term, na=False) |
-        filtered_df['content_text'].str.lower().str.contains(term, na=False)
+try:
+    # We assume RLS handles what we can see. 
+    # For authenticated 'advanced' users, they should see private too.
+    interpretations, total_items = SupabaseClient.search_interpretations(
+        filters,
+        search_term,
+        limit=PAGE_SIZE,
+        offset=(st.session_state.interp_page - 1) * PAGE_SIZE,
+        include_private=True
     )
-    filtered_df = filtered_df[mask]
+except Exception as e:
+    st.error(f"Error loading interpretations: {e}")
+    interpretations, total_items = [], 0
 
-if selected_issuers:
-    filtered_df = filtered_df[filtered_df['issuer_name'].isin(selected_issuers)]
+# Page emptied (e.g. last item deleted): go back to the first page
+if not interpretations and st.session_state.interp_page > 1:
+    st.session_state.interp_page = 1
+    st.rerun()
 
-if selected_statuses:
-    filtered_df = filtered_df[filtered_df['status'].isin(selected_statuses)]
+if not interpretations and total_items == 0 and not search_term and not any(filters.values()):
+    st.warning("No interpretations found.")
+    st.stop()
+
+# Normalize Issuer Data (flattens json)
+for interp in interpretations:
+    issuer = interp.get('issuers') or {}
+    interp['issuer_name'] = issuer.get('name') or 'Unknown'
+    interp['issuer_code'] = issuer.get('code') or 'UNK'
 
 # --- Display Results ---
-# --- Display Results ---
-st.markdown(f"**Found {len(filtered_df)} documents**")
+st.markdown(f"**Found {total_items} documents**")
 
 # Check Embedding Status
 embedded_counts = {}
-if not filtered_df.empty:
+if interpretations:
     try:
-        # Get IDs of displayed interpretations
-        interp_ids = filtered_df['id'].tolist()
-        
-        # Batch query to check which ones have embeddings
-        client = SupabaseClient.get_client()
-        
-        # Split into chunks if too many
-        chunk_size = 20
-        for i in range(0, len(interp_ids), chunk_size):
-            batch = interp_ids[i:i + chunk_size]
-            res = client.table("embeddings").select("source_id").in_("source_id", batch).eq("source_type", "interpretation").execute()
-            
-            # Count chunks per document
-            for item in res.data:
-                sid = item['source_id']
-                embedded_counts[sid] = embedded_counts.get(sid, 0) + 1
-            
+        # Chunk counts of displayed interpretations (one query, short-TTL cached)
+        embedded_counts = EmbeddingService.coverage([i['id'] for i in interpretations], "interpretation")
     except Exception as e:
         st.error(f"Error checking status: {e}")
 
-# Pre-fetch ALL issuers for the edit dropdown
-try:
-    all_issuers_data = SupabaseClient.get_all_issuers()
-# ... (rest of code)
-
-    # Create map {id: name} and list of names
-    issuer_options = {i['id']: f"{i['name']} ({i['code']})" for i in all_issuers_data}
-except:
-    issuer_options = {}
-
-for index, row in filtered_df.iterrows():
+for row in interpretations:
     with st.container():
         
         # Unique key for this item's edit mode
@@ -184,6 +163,15 @@ for index, row in filtered_df.iterrows():
             
             if row.get('comments'):
                 st.info(row['comments'])
+            
+            # Transcription is not part of the list query: load it only when asked
+            if st.toggle("📝 Show content", key=f"show_content_{row['id']}"):
+                content = SupabaseClient.get_interpretation_content(row['id'])
+                if content:
+                    st.text_area("Content", value=content, height=300, disabled=True,
+                                 key=f"content_{row['id']}", label_visibility="collapsed")
+                else:
+                    st.caption("No transcription available.")
 
         # --- EDIT MODE ---
         else:
@@ -283,3 +271,20 @@ for index, row in filtered_df.iterrows():
                 st.rerun()
 
         st.markdown("---")
+
+# --- Pagination ---
+total_pages = max(1, (total_items + PAGE_SIZE - 1) // PAGE_SIZE)
+if total_pages > 1:
+    pg_col1, pg_col2, pg_col3 = st.columns([1, 2, 1])
+    with pg_col1:
+        if st.session_state.interp_page > 1:
+            if st.button("⬅️ Previous Page"):
+                st.session_state.interp_page -= 1
+                st.rerun()
+    with pg_col2:
+        st.markdown(f"<div style='text-align: center'>Page <b>{st.session_state.interp_page}</b> of <b>{total_pages}</b></div>", unsafe_allow_html=True)
+    with pg_col3:
+        if st.session_state.interp_page < total_pages:
+            if st.button("Next Page ➡️"):
+                st.session_state.interp_page += 1
+                st.rerun()
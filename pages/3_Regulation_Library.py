@@ -5,7 +5,6 @@ Upload and explore regulation versions
 import streamlit as st
 from supabase_client import SupabaseClient
 from embedding_service import EmbeddingService
-import pandas as pd
 from datetime import datetime
 
 st.set_page_config(page_title="Regulation Library", page_icon="📕", layout="wide")
@@ -33,7 +32,8 @@ with tabs[0]:
     st.markdown("### Regulation Explorer")
     
     try:
-        regulations = SupabaseClient.get_all_regulations()
+        # One nested request for regulations + versions (cached)
+        regulations = SupabaseClient.get_regulations_with_versions()
         
         if not regulations:
             st.info("No regulations found. Upload your first regulation in the 'Upload New' tab.")
@@ -43,14 +43,13 @@ with tabs[0]:
                 with st.expander(f"**{reg['id']}** - {reg['title']}", expanded=False):
                     st.markdown(f"**Topic:** {reg.get('topic', 'N/A')}")
                     
-                    # Get versions
-                    versions = SupabaseClient.get_regulation_versions(reg['id'])
+                    versions = reg.get('regulation_versions') or []
                     
                     if versions:
                         # Sort by entry date
                         versions_sorted = sorted(
                             versions,
-                            key=lambda x: x.get('entry_date', '1900-01-01'),
+                            key=lambda x: x.get('entry_date') or '1900-01-01',
                             reverse=True
                         )
                         
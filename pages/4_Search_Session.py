@@ -6,7 +6,6 @@ import streamlit as st
 from supabase_client import SupabaseClient
 from embedding_service import EmbeddingService
 from config import Config
-import pandas as pd
 import time
 
 def get_type_badge(doc_type):
@@ -27,6 +26,18 @@ def get_type_badge(doc_type):
     
     return f'<span style="background-color: {bg}; color: {color}; padding: 3px 8px; border-radius: 10px; font-size: 0.85em; font-weight: 600; white-space: nowrap;">{doc_type}</span>'
 
+def delete_documents(docs, label):
+    """Bulk delete (DB + embeddings in one RPC, batched storage removal) and report the outcome"""
+    result = SupabaseClient.delete_documents([d['id'] for d in docs])
+    EmbeddingService.invalidate_coverage(result['deleted'])
+    deleted_count = len(result['deleted'])
+    if result['failed_files']:
+        st.warning(f"⚠️ Deleted {deleted_count} documents but some files couldn't be removed from storage: "
+                   + "; ".join(result['failed_files']))
+    else:
+        st.success(f"✅ Deleted {deleted_count} {label}")
+    return result
+
 st.set_page_config(page_title="Search & Session View", page_icon="🔍", layout="wide")
 
 from auth_utils import require_auth
@@ -63,17 +74,21 @@ with st.sidebar:
     st.markdown("---")
     with st.expander("⚙️ Manage Embeddings"):
         st.markdown("Check for documents lacking AI index.")
+        MISSING_PAGE_SIZE = 50
         if st.button("🔄 Scan Missing"):
             with st.spinner("Scanning..."):
-                missing = SupabaseClient.get_documents_without_embeddings()
-                st.session_state['missing_docs'] = missing
+                # Indexed query on embedding_status, one page at a time
+                st.session_state['missing_count'] = SupabaseClient.count_documents_without_embeddings()
+                st.session_state['missing_docs'] = SupabaseClient.get_documents_without_embeddings(limit=MISSING_PAGE_SIZE)
         
         if 'missing_docs' in st.session_state:
             missing = st.session_state['missing_docs']
-            if not missing:
+            if not missing and st.session_state.get('missing_count'):
+                st.info(f"{st.session_state['missing_count']} docs could not be embedded. Scan again to retry.")
+            elif not missing:
                 st.success("All indexed!")
             else:
-                st.warning(f"Found {len(missing)} missing.")
+                st.warning(f"Found {st.session_state.get('missing_count', len(missing))} missing.")
                 if st.button(f"🚀 Embed {len(missing)} Docs"):
                     progress = st.progress(0)
                     status = st.empty()
@@ -102,12 +117,16 @@ with st.sidebar:
                             print(f"Failed {doc.get('symbol')}: {e}")
                         progress.progress((i+1)/len(missing))
                     st.success(f"Embedded {success_gen} docs!")
-                    st.session_state.pop('missing_docs')
+                    # Next page: continue after this one so failed docs are not retried in a loop
+                    st.session_state['missing_count'] = SupabaseClient.count_documents_without_embeddings()
+                    st.session_state['missing_docs'] = SupabaseClient.get_documents_without_embeddings(
+                        limit=MISSING_PAGE_SIZE, after=missing[-1]
+                    )
                     st.rerun()
 
 
     try:
-        groups = SupabaseClient.get_all_groups()
+        # Groups already loaded above (cached in SupabaseClient)
         group_options = ["All"] + [g['id'] for g in groups]
         
         # Check for navigation filter
@@ -146,10 +165,9 @@ with st.sidebar:
              # Sessions already loaded above
              available_years = sorted(list(set(s['year'] for s in sessions)), reverse=True)
         else:
-             # Need to fetch all sessions to get years
-             # Ideally SupabaseClient should have a get_unique_years method, but for now:
-             all_sessions_resp = SupabaseClient.get_client().table("sessions").select("year").execute()
-             available_years = sorted(list(set(s['year'] for s in all_sessions_resp.data)), reverse=True)
+             # Need all sessions to get years (cached in SupabaseClient)
+             all_sessions = SupabaseClient.get_all_sessions_with_counts()
+             available_years = sorted(list(set(s['year'] for s in all_sessions)), reverse=True)
              
         year_options = ["All"] + available_years
         selected_year = st.selectbox("Year", year_options, key="filter_year_main")
@@ -185,14 +203,12 @@ def get_viewable_url(file_url):
 
 
 try:
-    # Pagination State
+    # Pagination State (keyset: the page is addressed by a cursor, not an offset)
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 1
-    
-    # Reset page when filters change (using a hash of filters to detect change would be ideal, 
-    # but for now we rely on explicit 'on_change' or just simple reset if needed. 
-    # A simple approach: if we detect a search/filter interaction, we reset.
-    # We'll handle this by buttons/inputs updating state.)
+    if 'page_cursor' not in st.session_state:
+        st.session_state.page_cursor = None
+        st.session_state.page_direction = "next"
     
     ITEMS_PER_PAGE = 50
     
@@ -211,25 +227,36 @@ try:
     if selected_group != "All" and not selected_session:
         filters['group_id'] = selected_group
     
+    # Reset to the first page when filters or search text change
+    filters_key = repr((sorted(filters.items()), search_text))
+    if st.session_state.get('page_filters_key') != filters_key:
+        st.session_state.page_filters_key = filters_key
+        st.session_state.current_page = 1
+        st.session_state.page_cursor = None
+        st.session_state.page_direction = "next"
+    
     # Fetch Counts and Data
+    page = {}
     try:
-        # Get Total Count
-        total_items = SupabaseClient.get_documents_count(filters, search_text)
-        total_pages = max(1, (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
-        
-        # Ensure page is valid
-        if st.session_state.current_page > total_pages:
-            st.session_state.current_page = 1
-            
-        offset = (st.session_state.current_page - 1) * ITEMS_PER_PAGE
-        
-        # Fetch Page Data
-        documents = SupabaseClient.search_documents(
+        # Fetch Page Data and Total Count (single indexed search call)
+        page = SupabaseClient.search_documents_ranked(
             filters, 
             search_text, 
             limit=ITEMS_PER_PAGE, 
-            offset=offset
+            cursor=st.session_state.page_cursor,
+            direction=st.session_state.page_direction
         )
+        
+        # Cursor page emptied (e.g. documents deleted): restart from the first page
+        if not page['documents'] and st.session_state.page_cursor:
+            st.session_state.current_page = 1
+            st.session_state.page_cursor = None
+            st.session_state.page_direction = "next"
+            page = SupabaseClient.search_documents_ranked(filters, search_text, limit=ITEMS_PER_PAGE)
+        
+        documents = page['documents']
+        total_items = page['total_count']
+        total_pages = max(1, (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
     except Exception as e:
         st.error(f"Error fetching data: {e}")
         documents = []
@@ -254,64 +281,13 @@ try:
         # EMBEDDING STATUS CHECK
         # ====================================================================
         
-        # ====================================================================
-        # EMBEDDING STATUS CHECK
-        # ====================================================================
-        
-        # Get counts of embeddings for each document
-        embedding_counts = {}
-        debug_emb_errors = []
+        # Get counts of embeddings for the documents we currently have loaded
         try:
-            # Use Admin Client to bypass RLS for status checks
-            # This ensures we see the true count even if the user doesn't own the records
-            try:
-                client = SupabaseClient.get_admin_client()
-            except Exception:
-                # Fallback to normal client if Service Key not configured (local dev without .env?)
-                client = SupabaseClient.get_client()
-            
-            # Optimization: Only check status for the documents we currently have loaded
-            current_doc_ids = [d['id'] for d in documents] if documents else []
-            
-            if current_doc_ids:
-                # Try optimized RPC first (single query for all docs)
-                try:
-                    rpc_response = client.rpc("get_embedding_counts", {
-                        "doc_ids": current_doc_ids
-                    }).execute()
-                    
-                    # Parse RPC results
-                    for row in rpc_response.data:
-                        embedding_counts[str(row['source_id'])] = row['count']
-                        
-                except Exception as rpc_err:
-                    # Fallback to individual queries if RPC not available
-                    # (Run optimize_embedding_counts.sql in Supabase to enable RPC)
-                    for doc_id in current_doc_ids:
-                        try:
-                            emb_response = client.table("embeddings") \
-                                .select("source_id", count="exact") \
-                                .eq("source_id", doc_id) \
-                                .limit(1) \
-                                .execute()
-                            
-                            if emb_response.count and emb_response.count > 0:
-                                embedding_counts[str(doc_id)] = emb_response.count
-                        except Exception as doc_err:
-                            debug_emb_errors.append(f"Doc {doc_id}: {str(doc_err)}")
-                    
-                except Exception as e:
-                    # Fallback or error logging
-                    print(f"Error fetching embedding counts: {e}")
-                    debug_emb_errors.append(f"General: {str(e)}")
-                
+            embedding_counts = EmbeddingService.coverage([d['id'] for d in documents], "document")
         except Exception as e:
             st.error(f"Error fetching embedding status: {e}")
             embedding_counts = {}
 
-        if debug_emb_errors:
-            st.warning(f"⚠️ Some embedding status checks failed ({len(debug_emb_errors)} errors)")
-
         # LEGEND
         st.markdown("### 📊 Status Legend")
         st.caption("🟢 Ready (Chunks) | ⚡ Process")
@@ -370,25 +346,7 @@ try:
                 with col1:
                     if st.button("🗑️ YES, DELETE SELECTED", type="primary", use_container_width=True, key="confirm_del_sel_rep"):
                         try:
-                            client = SupabaseClient.get_client()
-                            deleted_count = 0
-                            failed_files = []
-                            
-                            for doc in selected_docs:
-                                if doc.get('file_url'):
-                                    try:
-                                        file_path = doc['file_url'].split('/unece-archive/')[-1]
-                                        client.storage.from_(Config.STORAGE_BUCKET).remove([file_path])
-                                    except Exception as e:
-                                        failed_files.append(f"{doc['symbol']}: {str(e)}")
-                                
-                                client.table("documents").delete().eq("id", doc['id']).execute()
-                                deleted_count += 1
-                            
-                            if failed_files:
-                                st.warning(f"⚠️ Deleted {deleted_count} documents but {len(failed_files)} files couldn't be removed")
-                            else:
-                                st.success(f"✅ Deleted {deleted_count} selected reports/agendas")
+                            delete_documents(selected_docs, "selected reports/agendas")
                             
                             # Clear checkbox states for deleted docs
                             for doc_id in deletion_ids:
@@ -414,25 +372,7 @@ try:
                 with col1:
                     if st.button("🗑️ YES, DELETE ALL", type="primary", use_container_width=True, key="confirm_del_all_rep"):
                         try:
-                            client = SupabaseClient.get_client()
-                            deleted_count = 0
-                            failed_files = []
-                            
-                            for doc in reports_agendas:
-                                if doc.get('file_url'):
-                                    try:
-                                        file_path = doc['file_url'].split('/unece-archive/')[-1]
-                                        client.storage.from_(Config.STORAGE_BUCKET).remove([file_path])
-                                    except Exception as e:
-                                        failed_files.append(f"{doc['symbol']}: {str(e)}")
-                                
-                                client.table("documents").delete().eq("id", doc['id']).execute()
-                                deleted_count += 1
-                            
-                            if failed_files:
-                                st.warning(f"⚠️ Deleted {deleted_count} documents but {len(failed_files)} files couldn't be removed")
-                            else:
-                                st.success(f"✅ Deleted {deleted_count} reports/agendas")
+                            delete_documents(reports_agendas, "reports/agendas")
                             
                             del st.session_state.confirm_delete_all_reports
                             st.rerun()
@@ -583,27 +523,7 @@ try:
                 with col1:
                     if st.button("🗑️ YES, DELETE SELECTED", type="primary", use_container_width=True, key="confirm_delete_sel"):
                         try:
-                            client = SupabaseClient.get_client()
-                            deleted_count = 0
-                            failed_files = []
-                            
-                            for doc in selected_docs:
-                                # Delete PDF file from storage first if exists
-                                if doc.get('file_url'):
-                                    try:
-                                        file_path = doc['file_url'].split('/unece-archive/')[-1]
-                                        client.storage.from_(Config.STORAGE_BUCKET).remove([file_path])
-                                    except Exception as e:
-                                        failed_files.append(f"{doc['symbol']}: {str(e)}")
-                                
-                                # Delete from database
-                                client.table("documents").delete().eq("id", doc['id']).execute()
-                                deleted_count += 1
-                            
-                            if failed_files:
-                                st.warning(f"⚠️ Deleted {deleted_count} documents but {len(failed_files)} files couldn't be removed from storage")
-                            else:
-                                st.success(f"✅ Deleted {deleted_count} selected documents and files")
+                            delete_documents(selected_docs, "selected documents and files")
                             
                             # Clear checkbox states for deleted docs
                             for doc_id in deletion_ids:
@@ -629,29 +549,7 @@ try:
                 with col1:
                     if st.button("🗑️ YES, DELETE ALL", type="primary", use_container_width=True):
                         try:
-                            client = SupabaseClient.get_client()
-                            deleted_count = 0
-                            failed_files = []
-                            
-                            for doc in working_docs:
-                                # Delete PDF file from storage first if exists
-                                if doc.get('file_url'):
-                                    try:
-                                        # Extract file path from URL
-                                        # URL format: https://.../storage/v1/object/public/unece-archive/path/to/file.pdf
-                                        file_path = doc['file_url'].split('/unece-archive/')[-1]
-                                        client.storage.from_(Config.STORAGE_BUCKET).remove([file_path])
-                                    except Exception as e:
-                                        failed_files.append(f"{doc['symbol']}: {str(e)}")
-                                
-                                # Delete from database
-                                client.table("documents").delete().eq("id", doc['id']).execute()
-                                deleted_count += 1
-                            
-                            if failed_files:
-                                st.warning(f"⚠️ Deleted {deleted_count} documents but {len(failed_files)} files couldn't be removed from storage")
-                            else:
-                                st.success(f"✅ Deleted {deleted_count} documents and files")
+                            delete_documents(working_docs, "documents and files")
                             
                             del st.session_state.confirm_delete_all
                             st.rerun()
@@ -737,22 +635,11 @@ try:
                     with col1:
                         if st.button("🗑️ Yes, Delete", type="primary", use_container_width=True, key="confirm_delete"):
                             try:
-                                client = SupabaseClient.get_client()
-                                
-                                # Delete PDF file from storage first if exists
-                                file_deleted = False
-                                file_error = None
-                                if doc.get('file_url'):
-                                    try:
-                                        # Extract file path from URL
-                                        file_path = doc['file_url'].split(f'/{Config.STORAGE_BUCKET}/')[-1]
-                                        result = client.storage.from_(Config.STORAGE_BUCKET).remove([file_path])
-                                        file_deleted = True
-                                    except Exception as file_err:
-                                        file_error = str(file_err)
-                                
-                                # Delete from database
-                                client.table("documents").delete().eq("id", doc['id']).execute()
+                                # Database + embeddings + PDF + chunk objects
+                                result = SupabaseClient.delete_documents([doc['id']])
+                                EmbeddingService.invalidate_coverage(result['deleted'])
+                                file_deleted = result['files_removed'] > 0
+                                file_error = "; ".join(result['failed_files']) or None
                                 
                                 # Show results
                                 if file_deleted:
@@ -867,18 +754,28 @@ try:
             pg_col1, pg_col2, pg_col3 = st.columns([1, 2, 1])
             
             with pg_col1:
-                if st.session_state.current_page > 1:
+                if page.get('has_prev'):
                     if st.button("⬅️ Previous Page"):
                         st.session_state.current_page -= 1
+                        if st.session_state.current_page <= 1:
+                            # Page 1 is the cursor-less page
+                            st.session_state.current_page = 1
+                            st.session_state.page_cursor = None
+                            st.session_state.page_direction = "next"
+                        else:
+                            st.session_state.page_cursor = page['prev_cursor']
+                            st.session_state.page_direction = "prev"
                         st.rerun()
             
             with pg_col2:
                 st.markdown(f"<div style='text-align: center'>Page <b>{st.session_state.current_page}</b> of <b>{total_pages}</b></div>", unsafe_allow_html=True)
                 
             with pg_col3:
-                if st.session_state.current_page < total_pages:
+                if page.get('has_next'):
                     if st.button("Next Page ➡️"):
                         st.session_state.current_page += 1
+                        st.session_state.page_cursor = page['next_cursor']
+                        st.session_state.page_direction = "next"
                         st.rerun()
 
 except Exception as e:
@@ -66,48 +66,24 @@ if user_query:
         with st.spinner("Searching documents..."):
             try:
                 # Search for relevant chunks with re-ranking (Increased limit for mixed results)
-                relevant_chunks = EmbeddingService.search_with_reranking(user_query, limit=15)
+                # Citations (symbol, title, signed URL) are resolved inside the pipeline
+                search_trace = {}
+                relevant_chunks = EmbeddingService.search_with_reranking(
+                    user_query, limit=15, enrich=True, trace=search_trace
+                )
                 
-                # Debug: Show optimized query to user
+                # Debug: Show optimized query and stage timings to user
                 from gemini_client import GeminiClient
-                optimized_q = GeminiClient.optimize_query(user_query)
+                optimized_q = search_trace.get('search_query', user_query)
                 st.caption(f"🔍 *Search keywords: {optimized_q[:100]}{'...' if len(optimized_q) > 100 else ''}*")
+                timings = search_trace.get('timings', {})
+                if timings:
+                    st.caption("⏱️ " + " | ".join(f"{stage}: {secs:.2f}s" for stage, secs in timings.items()))
                 
+                enriched_chunks = relevant_chunks
                 if not relevant_chunks:
                     response = "I couldn't find any relevant documents to answer your question. Please try rephrasing or check if documents have been uploaded."
                 else:
-                    # Fetch full document info for citations
-                    enriched_chunks = []
-                    for chunk in relevant_chunks:
-                        # Get document info
-                        file_url = None
-                        if chunk['source_type'] == 'document':
-                            doc = SupabaseClient.get_client().table("documents").select("symbol, title, file_url").eq("id", chunk['source_id']).execute()
-                            if doc.data:
-                                chunk['symbol'] = doc.data[0]['symbol']
-                                chunk['doc_title'] = doc.data[0]['title']
-                                file_url = doc.data[0].get('file_url')
-                        elif chunk['source_type'] == 'interpretation':
-                            interp = SupabaseClient.get_client().table("interpretations").select("title, file_url, issue_date").eq("id", chunk['source_id']).execute()
-                            if interp.data:
-                                date = interp.data[0].get('issue_date', 'Unknown Date')
-                                chunk['symbol'] = f"Interpretation ({date})"
-                                chunk['doc_title'] = interp.data[0]['title']
-                                file_url = interp.data[0].get('file_url')
-                        else:
-                            # Regulation
-                            reg = SupabaseClient.get_client().table("regulation_versions").select("regulation_id, series, revision, file_url").eq("id", chunk['source_id']).execute()
-                            if reg.data:
-                                chunk['symbol'] = f"{reg.data[0]['regulation_id']} {reg.data[0]['series']}"
-                                chunk['doc_title'] = f"Regulation {reg.data[0]['regulation_id']}"
-                                file_url = reg.data[0].get('file_url')
-                        
-                        # Generate signed URL if file exists
-                        if file_url:
-                            chunk['signed_url'] = SupabaseClient.get_signed_url(file_url)
-                        
-                        enriched_chunks.append(chunk)
-                    
                     # Generate answer using Gemini
                     response = GeminiClient.chat_with_context(user_query, enriched_chunks)
                 
@@ -186,8 +162,9 @@ with st.sidebar:
     with st.expander("🛠️ Debug Info"):
         try:
             client = SupabaseClient.get_client()
-            total_count = client.table("embeddings").select("id", count="exact").execute().count
-            interp_count = client.table("embeddings").select("id", count="exact").eq("source_type", "interpretation").execute().count
+            totals = EmbeddingService.totals()
+            total_count = sum(t['chunks'] for t in totals.values())
+            interp_count = totals.get('interpretation', {}).get('chunks', 0)
             st.write(f"Total Embeddings: {total_count}")
             st.write(f"Interpretations: {interp_count}")
             
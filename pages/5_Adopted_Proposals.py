@@ -1,10 +1,9 @@
 import streamlit as st
-import pandas as pd
 from supabase_client import SupabaseClient
 from extract_proposals import ProposalExtractor
+from proposal_scanner import ProposalScanner
 from config import Config
 import time
-import re
 
 st.set_page_config(page_title="Adopted Proposals", page_icon="📜", layout="wide")
 
@@ -25,14 +24,6 @@ if 'redirect_to' in st.session_state and st.session_state['redirect_to']:
 # 2. Tab Replacement
 page = st.radio("Navigation", ["🚀 Scan & Ingest", "📊 Dashboard"], key="page_nav", horizontal=True, label_visibility="collapsed")
 
-# Helper for Regulation Sorting
-def reg_sort_key(reg_id):
-    """Sort regulations numerically: R9 < R13 < R109"""
-    match = re.search(r'R(\d+)', str(reg_id), re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-    return 999999
-
 # ==============================================================================
 # VIEW 1: SCAN & INGEST
 # ==============================================================================
@@ -98,6 +89,7 @@ if page == "🚀 Scan & Ingest":
                                     st.session_state['staging_proposals'] = extracted_data
                                     st.session_state['staging_doc_id'] = sel_doc_id
                                     st.session_state['staging_session_id'] = sel_session_id
+                                    st.session_state.pop('staging_from_scan', None)
                                     st.success(f"Extracted {len(extracted_data)} proposals!")
                                 else:
                                     st.warning("No proposals found or extraction failed.")
@@ -107,6 +99,123 @@ if page == "🚀 Scan & Ingest":
     except Exception as e:
         st.error(f"Error loading sessions: {e}")
 
+    # BATCH SCAN (all WP.29 sessions, resumable)
+    st.markdown("---")
+    with st.expander("🗂️ Batch Scan: all WP.29 reports not scanned yet", expanded=ProposalScanner.is_running()):
+        try:
+            pending_docs = SupabaseClient.get_unscanned_proposal_documents(
+                1000, Config.PROPOSAL_SCAN_MAX_ATTEMPTS, Config.PROPOSAL_SCAN_RUNNING_TIMEOUT
+            )
+            scans = SupabaseClient.get_proposal_scans(['running', 'staged', 'failed'])
+        except Exception:
+            st.info("Run `init_proposal_scans.sql` to enable batch scanning.")
+            pending_docs, scans = None, []
+        
+        if pending_docs is not None:
+            staged = [s for s in scans if s['status'] == 'staged']
+            failed = [s for s in scans if s['status'] == 'failed']
+            
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("To scan", len(pending_docs))
+            m2.metric("Running", sum(1 for s in scans if s['status'] == 'running'))
+            m3.metric("Staged for review", len(staged))
+            m4.metric("Failed", len(failed))
+            st.caption(
+                f"Scans {Config.PROPOSAL_SCAN_CONCURRENCY} documents at a time, at most "
+                f"{Config.PROPOSAL_SCAN_RPM} Gemini requests/minute. Progress is saved per document: "
+                "stopping and starting again resumes where it left off "
+                "(or run `python scan_proposals.py` for long backfills)."
+            )
+            
+            # RLS only lets signed-in users write proposal_scans (cookie-restored sessions run as anon)
+            can_write = SupabaseClient.has_user_session()
+            if not can_write:
+                st.warning("Sign in again with your password to start, approve or reject batch scans "
+                           "(restored sessions are read-only).")
+            
+            c1, c2, c3 = st.columns([2, 1, 1])
+            with c1:
+                batch_limit = st.number_input("Documents in this run", min_value=1,
+                                              max_value=max(len(pending_docs), 1),
+                                              value=max(min(len(pending_docs), 20), 1))
+            with c2:
+                if ProposalScanner.is_running():
+                    if st.button("⏹️ Stop", use_container_width=True):
+                        ProposalScanner.stop()
+                        st.toast("Stopping after the documents in flight...")
+                else:
+                    if st.button("▶️ Start Batch Scan", type="primary", use_container_width=True,
+                                 disabled=not pending_docs or not can_write):
+                        try:
+                            ProposalScanner.run_in_background(int(batch_limit))
+                            started = True
+                        except Exception as e:
+                            st.error(f"Could not start the batch scan: {e}")
+                            started = False
+                        if started:
+                            time.sleep(1)
+                            st.rerun()
+            with c3:
+                if st.button("🔄 Refresh", use_container_width=True):
+                    st.rerun()
+            
+            if staged:
+                st.markdown("##### Staged results")
+                if st.button(f"✅ Approve all {len(staged)} staged scans as extracted", disabled=not can_write):
+                    totals = {'inserted': 0, 'regulations_created': 0}
+                    errors = []
+                    for scan in staged:
+                        try:
+                            result = ProposalScanner.approve(scan)
+                        except Exception as e:
+                            errors.append(f"{(scan.get('documents') or {}).get('symbol', scan['document_id'])}: {e}")
+                            continue
+                        totals['inserted'] += result['inserted']
+                        totals['regulations_created'] += result['regulations_created']
+                    st.success(f"✅ Saved {totals['inserted']} proposals "
+                               f"({totals['regulations_created']} regulations auto-created)")
+                    if errors:
+                        # Failed scans stay staged; shown instead of rerunning
+                        st.error(f"❌ {len(errors)} of {len(staged)} scans could not be approved:\n\n"
+                                 + "\n".join(f"- {error}" for error in errors))
+                    else:
+                        st.rerun()
+                
+                for scan in staged:
+                    doc = scan.get('documents') or {}
+                    sess = scan.get('sessions') or {}
+                    r1, r2, r3, r4 = st.columns([4, 1, 1, 1])
+                    r1.markdown(f"**{doc.get('symbol', scan['document_id'])}** · Session {sess.get('code')} "
+                                f"({sess.get('year')}) · {scan.get('proposal_count') or 0} proposals")
+                    if r2.button("📝 Review", key=f"review_{scan['document_id']}"):
+                        st.session_state['staging_proposals'] = scan.get('proposals') or []
+                        st.session_state['staging_doc_id'] = scan['document_id']
+                        st.session_state['staging_session_id'] = scan['session_id']
+                        st.session_state['staging_from_scan'] = True
+                        st.rerun()
+                    if r3.button("✅ Approve", key=f"approve_{scan['document_id']}", disabled=not can_write):
+                        try:
+                            result = ProposalScanner.approve(scan)
+                        except Exception as e:
+                            st.error(f"Could not approve {doc.get('symbol', scan['document_id'])}: {e}")
+                        else:
+                            st.toast(f"Saved {result['inserted']} proposals")
+                            st.rerun()
+                    if r4.button("🗑️ Reject", key=f"reject_{scan['document_id']}", disabled=not can_write):
+                        try:
+                            ProposalScanner.reject(scan)
+                        except Exception as e:
+                            st.error(f"Could not reject {doc.get('symbol', scan['document_id'])}: {e}")
+                        else:
+                            st.rerun()
+            
+            if failed:
+                with st.expander(f"❌ {len(failed)} failed scans (retried by the next run, "
+                                 f"up to {Config.PROPOSAL_SCAN_MAX_ATTEMPTS} attempts)"):
+                    for scan in failed:
+                        doc = scan.get('documents') or {}
+                        st.caption(f"{doc.get('symbol', scan['document_id'])} · attempt {scan['attempts']}: {scan.get('error')}")
+
     # STAGING AREA
     if 'staging_proposals' in st.session_state and st.session_state['staging_proposals']:
         st.markdown("---")
@@ -119,6 +228,7 @@ if page == "🚀 Scan & Ingest":
             st.caption("Please review the extracted data. Edit descriptions or details if needed. Click 'Save' to finalize.")
         
         # Convert to DataFrame for Editor
+        import pandas as pd  # loaded on first use
         df = pd.DataFrame(st.session_state['staging_proposals'])
         
         # Ensure regex columns exist
@@ -188,26 +298,15 @@ if page == "🚀 Scan & Ingest":
             
             # Insert
             try:
-                # Use Admin Client for all write ops
-                client = SupabaseClient.get_admin_client()
-                
-                # 1. Ensure Regulations Exist (Fix: Foreign Key Violation)
-                unique_regs = list(set([r['regulation_id'] for r in clean_records if r['regulation_id']]))
-                
-                if unique_regs:
-                    existing = client.table("regulations").select("id").in_("id", unique_regs).execute()
-                    existing_ids = {item['id'] for item in existing.data}
-                    
-                    missing_regs = [rid for rid in unique_regs if rid not in existing_ids]
-                    
-                    if missing_regs:
-                        # Auto-create missing regulations
-                        new_reg_data = [{"id": rid, "title": f"Regulation {rid}", "topic": "Unknown - Auto-created"} for rid in missing_regs]
-                        client.table("regulations").insert(new_reg_data).execute()
-                        st.toast(f"✅ Auto-created {len(missing_regs)} missing regulations in library.")
-                
-                # 2. Insert Proposals
-                res = client.table("adopted_proposals").insert(clean_records).execute()
+                # Regulations missing from the library are auto-created (foreign key)
+                if st.session_state.get('staging_from_scan'):
+                    # Marks the batch scan approved before inserting (no duplicates on retry)
+                    result = ProposalScanner.approve({'document_id': doc_id, 'session_id': sess_id}, clean_records)
+                else:
+                    result = SupabaseClient.save_adopted_proposals(clean_records)
+                st.session_state.pop('staging_from_scan', None)
+                if result['regulations_created']:
+                    st.toast(f"✅ Auto-created {result['regulations_created']} missing regulations in library.")
                 st.success(f"✅ Successfully saved {len(clean_records)} proposals!")
                 # Clear staging
                 del st.session_state['staging_proposals']
@@ -228,35 +327,34 @@ if page == "🚀 Scan & Ingest":
 elif page == "📊 Dashboard":
     st.markdown("### 📚 Adopted Proposals Library")
     
+    PAGE_SIZE = 100
+    SORT_COLUMNS = {
+        "Created At (Default)": "created_at",
+        "Regulation": "regulation",
+        "Series": "series",
+        "Entry Date": "entry_date",
+        "Status": "status",
+        "Session": "session"
+    }
+    
     try:
-        client = SupabaseClient.get_client()
-        res = client.table("adopted_proposals").select("*, sessions(code, year)").order("created_at", desc=True).limit(500).execute()
+        # Filter options with counts over the whole table (one RPC, already in display order)
+        all_facets = SupabaseClient.get_adopted_proposals_facets()
         
-        data = res.data
-        if not data:
+        if not all_facets['regulation'] and not all_facets['session']:
             st.info("No proposals found. Go to 'Scan' tab.")
         else:
-            # Flatten session info
-            flat_data = []
-            for item in data:
-                s = item.get('sessions') or {}
-                item['session_label'] = f"WP.29 {s.get('code','?')} ({s.get('year','?')})"
-                flat_data.append(item)
-            
-            df_dash = pd.DataFrame(flat_data)
+            session_labels = {f['value']: f['label'] for f in all_facets['session']}
             
-            # 1. Regulation Filter (Sorted Numeric)
+            # 1. Regulation Filter (Sorted Numeric by regulation_number)
             col_filter1, col_filter2 = st.columns(2)
             with col_filter1:
-                raw_regs = list(set(df_dash['regulation_id'].dropna()))
-                # Use custom sort key
-                all_regs = sorted(raw_regs, key=reg_sort_key)
+                all_regs = [f['value'] for f in all_facets['regulation']]
                 sel_regs = st.multiselect("Filter Regulation", all_regs)
             
             with col_filter2:
                 # Session Filter
-                all_sessions = sorted(list(set(df_dash['session_label'].dropna())))
-                sel_sessions = st.multiselect("Filter Session", all_sessions)
+                sel_sessions = st.multiselect("Filter Session", list(session_labels), format_func=lambda x: session_labels[x])
 
             # Advanced Filters Expander (Opened if any active)
             # We don't want to force it open/closed on re-run unless we track state, but standard expander is fine.
@@ -265,56 +363,58 @@ elif page == "📊 Dashboard":
                 with c1:
                     search_desc = st.text_input("Search Description", placeholder="e.g. Braking...")
                 with c2:
-                    all_status = sorted(list(set(df_dash['status'].dropna())))
+                    all_status = [f['value'] for f in all_facets['status']]
                     sel_status = st.multiselect("Filter Status", all_status)
                 with c3:
-                    all_series = sorted(list(set(df_dash['series'].dropna())))
+                    all_series = [f['value'] for f in all_facets['series']]
                     sel_series = st.multiselect("Filter Series", all_series)
             
             # Sorting (User Request)
             col_sort1, col_sort2 = st.columns(2)
             with col_sort1:
-                sort_col = st.selectbox("Sort By", ["Created At (Default)", "Regulation", "Series", "Entry Date", "Status", "Session"])
+                sort_col = st.selectbox("Sort By", list(SORT_COLUMNS))
             with col_sort2:
                 sort_order = st.radio("Order", ["Descending", "Ascending"], horizontal=True, label_visibility="collapsed")
-
-            # Apply Filters
-            if sel_regs:
-                df_dash = df_dash[df_dash['regulation_id'].isin(sel_regs)]
-            if sel_sessions:
-                df_dash = df_dash[df_dash['session_label'].isin(sel_sessions)]
-            if search_desc:
-                df_dash = df_dash[df_dash['description'].str.contains(search_desc, case=False, na=False)]
-            if sel_status:
-                df_dash = df_dash[df_dash['status'].isin(sel_status)]
-            if sel_series:
-                df_dash = df_dash[df_dash['series'].isin(sel_series)]
-            
-            # Apply Sorting
-            ascending = True if sort_order == "Ascending" else False
-            if sort_col == "Regulation":
-                # Use custom sort key logic if possible, or just standard sort
-                # Since 'reg_num' logic is below in group view, let's replicate simplistic version or just string sort
-                # For robust reg sort we need the extraction again
-                df_dash['reg_num'] = df_dash['regulation_id'].apply(reg_sort_key)
-                df_dash = df_dash.sort_values('reg_num', ascending=ascending)
-            elif sort_col == "Series":
-                df_dash = df_dash.sort_values('series', ascending=ascending, na_position='last')
-            elif sort_col == "Entry Date":
-                df_dash = df_dash.sort_values('entry_date', ascending=ascending, na_position='last')
-            elif sort_col == "Status":
-                df_dash = df_dash.sort_values('status', ascending=ascending)
-            elif sort_col == "Session":
-                df_dash = df_dash.sort_values('session_label', ascending=ascending)
-            else:
-                # Default Created At
-                df_dash = df_dash.sort_values('created_at', ascending=ascending)
             
             # View Mode
             view_mode = st.radio("View", ["Table", "Grouped"], horizontal=True)
+
+            # Filters, sorting and paging run in SQL
+            filters = {
+                'regulation_ids': sel_regs,
+                'session_ids': sel_sessions,
+                'statuses': sel_status,
+                'series': sel_series,
+                'search': search_desc.strip()
+            }
+            if view_mode == "Grouped":
+                # Grouped View (Sorted by Reg Number)
+                sort, descending = "regulation", False
+            else:
+                sort, descending = SORT_COLUMNS[sort_col], sort_order == "Descending"
+            
+            # Back to the first page when the query changes
+            query_key = repr((sorted(filters.items()), sort, descending))
+            if st.session_state.get('dash_query_key') != query_key:
+                st.session_state.dash_query_key = query_key
+                st.session_state.dash_page = 1
+            
+            proposals, total_items = SupabaseClient.query_adopted_proposals(
+                filters, sort=sort, descending=descending,
+                limit=PAGE_SIZE, offset=(st.session_state.dash_page - 1) * PAGE_SIZE
+            )
+            
+            # Flatten session info
+            for item in proposals:
+                s = item.get('sessions') or {}
+                item['session_label'] = f"WP.29 {s.get('code','?')} ({s.get('year','?')})"
+            
+            st.caption(f"{total_items} proposals")
             
             if view_mode == "Table":
                 st.caption("You can edit descriptions directly here (click Save Changes to persist).")
+                import pandas as pd
+                df_dash = pd.DataFrame(proposals)
                 
                 # Configure grid
                 edited_dash = st.data_editor(
@@ -326,6 +426,7 @@ elif page == "📊 Dashboard":
                         "created_at": None,
                         "updated_at": None,
                         "sessions": None,
+                        "regulation_number": None,
                         "regulation_id": st.column_config.TextColumn("Reg", width="small", help="Regulation ID"),
                         "series": st.column_config.TextColumn("Series", width="small"),
                         "supplement": st.column_config.TextColumn("Suppl.", width="small"),
@@ -375,24 +476,45 @@ elif page == "📊 Dashboard":
                         st.error(f"Error saving: {str(e)}")
                             
             else:
-                # Grouped View (Sorted by Reg Number)
-                df_dash['reg_num'] = df_dash['regulation_id'].apply(reg_sort_key)
-                df_dash = df_dash.sort_values('reg_num')
-                
-                grouped = df_dash.groupby("regulation_id", sort=False) # Already sorted
+                # Group headers show the full count per regulation, rows come from the current page
+                group_counts = {
+                    f['value']: f['count']
+                    for f in SupabaseClient.get_adopted_proposals_facets(filters)['regulation']
+                }
                 
-                for reg, group in grouped:
-                    with st.expander(f"**{reg}** ({len(group)} updates)"):
+                from itertools import groupby
+                for reg, group in groupby(proposals, key=lambda p: p.get('regulation_id')):
+                    group = list(group)
+                    with st.expander(f"**{reg}** ({group_counts.get(reg, len(group))} updates)"):
                         # Sort group by date desc
-                        group = group.sort_values('created_at', ascending=False)
-                        for i, row in group.iterrows():
+                        group.sort(key=lambda p: p.get('created_at') or '', reverse=True)
+                        for row in group:
                             st.markdown(f"**{row['session_label']}** - {row['status']}")
                             st.markdown(f"**Series**: {row['series']} | **Suppl**: {row['supplement']} | **Date**: {row['entry_date']}")
                             st.info(row['description'])
                             st.divider()
+            
+            # Pagination
+            total_pages = max(1, (total_items + PAGE_SIZE - 1) // PAGE_SIZE)
+            if total_pages > 1:
+                pg_col1, pg_col2, pg_col3 = st.columns([1, 2, 1])
+                with pg_col1:
+                    if st.session_state.dash_page > 1:
+                        if st.button("⬅️ Previous Page"):
+                            st.session_state.dash_page -= 1
+                            st.rerun()
+                with pg_col2:
+                    st.markdown(f"<div style='text-align: center'>Page <b>{st.session_state.dash_page}</b> of <b>{total_pages}</b></div>", unsafe_allow_html=True)
+                with pg_col3:
+                    if st.session_state.dash_page < total_pages:
+                        if st.button("Next Page ➡️"):
+                            st.session_state.dash_page += 1
+                            st.rerun()
 
     except Exception as e:
         if "relation" in str(e) and "does not exist" in str(e):
              st.error("Table `adopted_proposals` not found. Please ask Admin to run `init_adopted_proposals.sql`.")
+        elif "function" in str(e).lower() and "adopted_proposals" in str(e):
+             st.error("Dashboard query functions not found. Please ask Admin to run `init_adopted_proposals_query.sql`.")
         else:
              st.error(f"Error loading dashboard: {e}")
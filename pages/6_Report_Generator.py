@@ -5,11 +5,9 @@ Generate session summaries grouped by regulation
 import streamlit as st
 from supabase_client import SupabaseClient
 from gemini_client import GeminiClient
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import io
-from datetime import datetime
+from report_service import ReportService
+from config import Config
+import time
 
 st.set_page_config(page_title="Report Generator", page_icon="📊", layout="wide")
 
@@ -63,114 +61,205 @@ with col2:
 # GENERATE REPORT
 # ============================================================================
 
+def build_full_summary():
+    """Assemble the markdown report from the stored sections, in regulation order"""
+    return ReportService.build_markdown(
+        st.session_state.session_info, st.session_state.report_order, st.session_state.report_sections
+    )
+
+def render_section(container, reg_id):
+    """Show one section (pending, generated or failed) in its placeholder"""
+    section = st.session_state.report_sections.get(reg_id)
+    with container.container():
+        with st.expander(f"📋 {reg_id}", expanded=True):
+            if section is None:
+                st.caption("⏳ Generating...")
+            elif section['error']:
+                st.error(f"Error generating summary after {section['attempts']} attempt(s): {section['error']}")
+            else:
+                st.markdown(section['text'])
+                if section.get('cached'):
+                    st.caption(f"💾 From cache ({section['cached'][:16].replace('T', ' ')})")
+                else:
+                    retried = f", {section['attempts']} attempts" if section['attempts'] > 1 else ""
+                    st.caption(f"{section['seconds']:.1f}s{retried}")
+
+def cache_error(error):
+    """Classify a session_reports error: ('missing' | 'denied' | 'other', message)"""
+    text = str(error)
+    lowered = text.lower()
+    if "42p01" in lowered or "pgrst205" in lowered or "does not exist" in lowered or "could not find the table" in lowered:
+        return ('missing', text)
+    if "42501" in lowered or "row-level security" in lowered or "permission denied" in lowered:
+        return ('denied', text)
+    return ('other', text)
+
+def save_section(result):
+    """Store a generated section in session_reports (the report still works if the cache is unavailable)"""
+    reg_id = result['regulation']
+    if not SupabaseClient.has_user_session():
+        # RLS only lets signed-in users write the cache (cookie-restored sessions run as anon)
+        st.session_state.report_cache_error = ('signed_out', '')
+        return
+    try:
+        ReportService.save_section(
+            st.session_state.session_info['session_id'], st.session_state.report_fingerprints[reg_id],
+            st.session_state.report_docs[reg_id], result
+        )
+    except Exception as e:
+        st.session_state.report_cache_error = cache_error(e)
+
+def load_cached_sections(fingerprints):
+    """Cached sections of the selected session whose documents, model and prompt are unchanged"""
+    try:
+        return ReportService.load_cached_sections(st.session_state.session_info['session_id'], fingerprints)
+    except Exception as e:
+        st.session_state.report_cache_error = cache_error(e)
+        return {}
+
+def generate_sections(reg_ids):
+    """Generate reg_ids in parallel; sections are shown in regulation order as they complete"""
+    for reg_id in reg_ids:
+        st.session_state.report_sections.pop(reg_id, None)
+    
+    st.markdown("### 📄 Generated Summary")
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    placeholders = {reg_id: st.empty() for reg_id in st.session_state.report_order}
+    for reg_id, container in placeholders.items():
+        render_section(container, reg_id)
+    
+    info = st.session_state.session_info
+    total = len(reg_ids)
+    start = time.perf_counter()
+    for done, result in enumerate(GeminiClient.summarize_regulations(
+            {reg_id: st.session_state.report_docs[reg_id] for reg_id in reg_ids},
+            info['group'], info['code']), start=1):
+        st.session_state.report_sections[result['regulation']] = result
+        if not result['error']:
+            save_section(result)
+        render_section(placeholders[result['regulation']], result['regulation'])
+        progress_bar.progress(done / total)
+        status_text.markdown(f"**Completed:** {result['regulation']} ({done}/{total})")
+    
+    # Sum of the per-section times = what the one-at-a-time loop would have taken
+    st.session_state.report_timing = {
+        'elapsed': time.perf_counter() - start,
+        'sequential': sum(st.session_state.report_sections[r]['seconds'] for r in reg_ids),
+        'sections': total,
+        'cached': sum(1 for section in st.session_state.report_sections.values() if section.get('cached')),
+    }
+    st.session_state.generated_summary = build_full_summary()
+    status_text.markdown("**Analysis Complete!** ✅")
+
 st.markdown("---")
 st.markdown("### 2️⃣ Generate Report")
 
-if st.button("🤖 Generate Summary", type="primary", use_container_width=True):
-    with st.spinner("Generating report..."):
-        try:
-            # Fetch all documents from session
-            documents = SupabaseClient.get_documents_by_session(selected_session['id'])
-            
-            if not documents:
-                st.warning("No documents found in this session")
-                st.stop()
-            
-            # Group by regulation
-            by_regulation = {}
-            for doc in documents:
-                # Handle potential None values explicitly
-                reg_id = doc.get('regulation_ref_id')
-                if not reg_id:
-                    reg_id = 'General Topics'
-                
-                if reg_id not in by_regulation:
-                    by_regulation[reg_id] = []
-                by_regulation[reg_id].append(doc)
-            
-            # Generate summary
-            st.markdown("### 📄 Generated Summary")
-            
-            full_summary = f"# Session Report: {selected_group} Session {selected_session['code']} ({selected_session['year']})\n\n"
-            
-            if selected_session.get('dates'):
-                full_summary += f"**Dates:** {selected_session['dates']}\n\n"
-            
-            full_summary += "---\n\n"
-            
-            # Generate for each regulation
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            total_regs = len(by_regulation)
-            
-            for idx, (reg_id, docs) in enumerate(by_regulation.items()):
-                status_text.markdown(f"**Processing:** {reg_id} ({idx + 1}/{total_regs})...")
-                
-                # Update progress at relative start (e.g. 0% for first item of many, or 10% buffering)
-                # We'll update to 'completed' percentage AFTER the work.
-                
-                st.markdown(f"#### Processing: {reg_id}")
-                
-                # Build document list
-                doc_list = "\n".join([
-                    f"- **{doc['symbol']}**: {doc['title']} (by {doc['author']})"
-                    for doc in docs
-                ])
-                
-                # Use Gemini to summarize
-                prompt = f"""
-Summarize the key discussions and decisions for regulation {reg_id} based on these documents from {selected_group} Session {selected_session['code']}:
-
-{doc_list}
+regenerate_all = st.checkbox(
+    "Regenerate all sections",
+    help="Ignore the cached sections. By default only regulations whose documents changed are regenerated."
+)
 
-Provide a structured summary covering:
-1. Main topics discussed
-2. Key proposals and authors
-3. Decisions or outcomes (if mentioned)
-4. Next steps or pending items
+if st.button("🤖 Generate Summary", type="primary", use_container_width=True):
+    try:
+        # Fetch all documents from session
+        documents = SupabaseClient.get_documents_by_session(selected_session['id'])
+        
+        if not documents:
+            st.warning("No documents found in this session")
+            st.stop()
+        
+        # Attach the stored per-document summaries (reduce over them instead of titles only)
+        summarized = ReportService.attach_summaries(documents)
+        st.session_state.report_summary_coverage = (summarized, len(documents))
+        
+        # Group by regulation (in regulation order)
+        by_regulation = ReportService.group_by_regulation(documents)
+        
+        # Store in session state for retries and download
+        st.session_state.report_docs = by_regulation
+        st.session_state.report_order = list(by_regulation)
+        st.session_state.report_fingerprints = {
+            reg_id: GeminiClient.report_fingerprint(docs) for reg_id, docs in by_regulation.items()
+        }
+        st.session_state.report_cache_error = None
+        st.session_state.session_info = {
+            'session_id': selected_session['id'],
+            'group': selected_group,
+            'code': selected_session['code'],
+            'year': selected_session['year'],
+            'dates': selected_session.get('dates')
+        }
+        
+        # Reuse the sections whose inputs did not change
+        st.session_state.report_sections = (
+            {} if regenerate_all else load_cached_sections(st.session_state.report_fingerprints)
+        )
+        to_generate = [r for r in st.session_state.report_order if r not in st.session_state.report_sections]
+        
+        if to_generate:
+            generate_sections(to_generate)
+        else:
+            st.session_state.report_timing = None
+            st.session_state.generated_summary = build_full_summary()
+        st.session_state.report_just_generated = True
+        st.rerun()
+    
+    except Exception as e:
+        st.error(f"Error generating report: {e}")
+        st.exception(e)
 
-Be concise but comprehensive. Use bullet points for clarity.
-"""
-                
-                try:
-                    # Use GeminiClient to summarize directly
-                    # We construct a specific prompt for summarization
-                    summary_prompt = f"""
-                    You are an expert UN regulation analyst.
-                    {prompt}
-                    """
-                    response = GeminiClient.get_model().generate_content(summary_prompt)
-                    summary_text = response.text
-                except Exception as e:
-                    summary_text = f"Error generating summary: {e}"
-                
-                # Add to full summary
-                section = f"## {reg_id}\n\n{summary_text}\n\n"
-                full_summary += section
-                
-                # Display in UI
-                with st.expander(f"📋 {reg_id}", expanded=True):
-                    st.markdown(summary_text)
-                
-                # Update progress after completion
-                progress_bar.progress((idx + 1) / total_regs)
-            
-            status_text.markdown("**Analysis Complete!** ✅")
-            
-            # Store in session state for download
-            st.session_state.generated_summary = full_summary
-            st.session_state.session_info = {
-                'group': selected_group,
-                'code': selected_session['code'],
-                'year': selected_session['year']
-            }
-            
+if 'report_sections' in st.session_state and 'generated_summary' in st.session_state:
+    sections = st.session_state.report_sections
+    failed = [reg_id for reg_id in st.session_state.report_order if sections.get(reg_id, {}).get('error')]
+    timing = st.session_state.get('report_timing')
+    
+    if st.session_state.pop('report_just_generated', False):
+        if failed:
+            st.warning(f"⚠️ Report generated with {len(failed)} failed section(s)")
+        else:
             st.success("✅ Report generated successfully!")
-        
-        except Exception as e:
-            st.error(f"Error generating report: {e}")
-            st.exception(e)
+    
+    if timing:
+        speedup = timing['sequential'] / timing['elapsed'] if timing['elapsed'] else 1.0
+        cached_note = f", {timing['cached']} from cache" if timing.get('cached') else ""
+        st.caption(
+            f"⏱️ {timing['sections']} section(s) generated in {timing['elapsed']:.1f}s "
+            f"(sequential: ~{timing['sequential']:.1f}s, {speedup:.1f}x with "
+            f"{Config.REPORT_CONCURRENCY} parallel requests){cached_note}"
+        )
+    elif sections:
+        st.caption(f"💾 All {len(sections)} section(s) loaded from cache, no regeneration needed")
+    
+    summarized, total_docs = st.session_state.get('report_summary_coverage', (0, 0))
+    if total_docs and summarized < total_docs:
+        st.caption(
+            f"📝 {summarized}/{total_docs} documents have a stored summary; the others are described "
+            "by symbol and title only (run `summarize_documents.py` to backfill)"
+        )
+    
+    if st.session_state.get('report_cache_error'):
+        kind, message = st.session_state.report_cache_error
+        if kind == 'missing':
+            st.warning(
+                f"⚠️ Report cache unavailable ({message}). "
+                "Run `init_session_reports.sql` to keep generated sections between runs."
+            )
+        elif kind == 'signed_out':
+            st.info("ℹ️ Generated sections are only cached for users signed in with their password.")
+        elif kind == 'denied':
+            st.warning(f"⚠️ Generated sections could not be cached: permission denied ({message}).")
+        else:
+            st.warning(f"⚠️ Report cache unavailable ({message}).")
+    
+    if failed and st.button(f"🔁 Retry {len(failed)} failed section(s)", use_container_width=True):
+        generate_sections(failed)
+        st.session_state.report_just_generated = True
+        st.rerun()
+    
+    st.markdown("### 📄 Generated Summary")
+    for reg_id in st.session_state.report_order:
+        render_section(st, reg_id)
 
 # ============================================================================
 # DOWNLOAD AS WORD
@@ -187,7 +276,7 @@ if 'generated_summary' in st.session_state:
         st.download_button(
             label="📥 Download as Markdown",
             data=st.session_state.generated_summary,
-            file_name=f"{st.session_state.session_info['group']}_Session_{st.session_state.session_info['code']}_Report.md",
+            file_name=ReportService.report_file_name(st.session_state.session_info, "md"),
             mime="text/markdown",
             use_container_width=True
         )
@@ -196,42 +285,15 @@ if 'generated_summary' in st.session_state:
         # Generate Word document
         if st.button("📄 Generate Word Document", use_container_width=True):
             try:
-                # Create Word document
-                doc = Document()
-                
-                # Title
-                title = doc.add_heading(
-                    f"{st.session_state.session_info['group']} Session {st.session_state.session_info['code']} Report",
-                    level=0
+                docx_bytes = ReportService.build_docx(
+                    st.session_state.generated_summary, st.session_state.session_info
                 )
-                title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Subtitle
-                subtitle = doc.add_paragraph(f"Year: {st.session_state.session_info['year']}")
-                subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                doc.add_paragraph()
-                
-                # Add summary content (parse markdown to add headings)
-                lines = st.session_state.generated_summary.split('\n')
-                for line in lines:
-                    if line.startswith('## '):
-                        doc.add_heading(line[3:], level=1)
-                    elif line.startswith('# '):
-                        doc.add_heading(line[2:], level=0)
-                    elif line.strip():
-                        doc.add_paragraph(line)
-                
-                # Save to bytes
-                buffer = io.BytesIO()
-                doc.save(buffer)
-                buffer.seek(0)
                 
                 # Download button
                 st.download_button(
                     label="📥 Download Word Document",
-                    data=buffer,
-                    file_name=f"{st.session_state.session_info['group']}_Session_{st.session_state.session_info['code']}_Report.docx",
+                    data=docx_bytes,
+                    file_name=ReportService.report_file_name(st.session_state.session_info, "docx"),
                     mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                     use_container_width=True
                 )
@@ -240,3 +302,49 @@ if 'generated_summary' in st.session_state:
             
             except Exception as e:
                 st.error(f"Error creating Word document: {e}")
+
+# ============================================================================
+# EXPORTED REPORTS (export_reports.py)
+# ============================================================================
+
+st.markdown("---")
+st.markdown(f"### 📦 Exported Reports: {selected_group}")
+st.caption(
+    "Reports of whole groups or years are exported in the background with "
+    "`python export_reports.py --group GRE` (or `--year 2024`); rerun the command to resume."
+)
+
+try:
+    exports = {row['session_id']: row for row in SupabaseClient.get_report_exports([s['id'] for s in sessions])}
+except Exception:
+    exports = None
+    st.info("Run `init_report_exports.sql` to enable background report exports.")
+
+if exports is not None:
+    exported_sessions = [s for s in sessions if s['id'] in exports]
+    if not exported_sessions:
+        st.caption("No exported reports for this group yet.")
+    
+    status_icons = {'done': '✅', 'partial': '⚠️', 'failed': '❌', 'running': '⏳', 'pending': '🕒'}
+    # One storage request for every download link of the list
+    signed_urls = SupabaseClient.get_signed_urls(
+        [exports[s['id']].get(key) for s in exported_sessions for key in ('markdown_path', 'docx_path')], 3600
+    )
+    for session in sorted(exported_sessions, key=lambda s: (s['year'], str(s['code'])), reverse=True):
+        export = exports[session['id']]
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            finished = (export.get('finished_at') or '')[:16].replace('T', ' ')
+            detail = export.get('error') or f"{export.get('sections') or 0} sections"
+            st.markdown(
+                f"{status_icons.get(export['status'], '')} **Session {session['code']} ({session['year']})** "
+                f"· {detail} · {finished}"
+            )
+        with col2:
+            if export.get('markdown_path'):
+                st.link_button("📥 Markdown", signed_urls[export['markdown_path']],
+                               use_container_width=True)
+        with col3:
+            if export.get('docx_path'):
+                st.link_button("📥 Word", signed_urls[export['docx_path']],
+                               use_container_width=True)
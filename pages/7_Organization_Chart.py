@@ -4,8 +4,6 @@ Visual hierarchy of WP29, Groups, and Task Forces
 """
 import streamlit as st
 from supabase_client import SupabaseClient
-import plotly.graph_objects as go
-import pandas as pd
 
 st.set_page_config(page_title="Organization Chart", page_icon="📊", layout="wide")
 
@@ -165,6 +163,7 @@ try:
 
     # 4. Draw with Plotly
     # ------------------------------------------------
+    import plotly.graph_objects as go  # loaded on first use
     
     # Edges
     trace_edges = go.Scatter(
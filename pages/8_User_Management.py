@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from auth_utils import require_auth, check_permission
 from supabase_client import SupabaseClient
 import time
@@ -34,6 +33,7 @@ if not profiles:
         st.info("No users found yet.")
 else:
     # Convert to DataFrame for display
+    import pandas as pd  # loaded on first use
     df = pd.DataFrame(profiles)
     
     # Reorder columns for better view
@@ -1,6 +1,5 @@
 import streamlit as st
 import os
-import google.generativeai as genai
 from config import Config
 from auth_utils import require_auth
 
@@ -38,6 +37,7 @@ st.markdown("### 2. Connection Test")
 
 if st.button("Test Google Gemini Connection"):
     try:
+        import google.generativeai as genai
         genai.configure(api_key=google_key)
         model = genai.GenerativeModel('models/gemini-2.0-flash')
         response = model.generate_content("Hello, simply say 'OK'")
@@ -46,3 +46,16 @@ if st.button("Test Google Gemini Connection"):
         st.error(f"Connection Failed: {str(e)}")
         st.info("If this fails with 'API_KEY_INVALID', check Google Cloud Console for IP Restrictions.")
 
+
+st.markdown("---")
+st.markdown("### 3. Connection Pool")
+
+from supabase_client import SupabaseClient
+stats = SupabaseClient.get_connection_stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Requests", stats['requests'])
+col2.metric("New Connections", stats['new_connections'])
+col3.metric("TLS Handshakes", stats['tls_handshakes'])
+col4.metric("Reuse", f"{stats['reuse_ratio']:.0%}" if stats['reuse_ratio'] is not None else "N/A")
+st.caption(f"HTTP/2 responses: {stats['http2_responses']} • Pool size: {Config.HTTP_POOL_SIZE} • "
+           f"Keep-alive: {Config.HTTP_KEEPALIVE_EXPIRY:.0f}s (since server start, all sessions)")
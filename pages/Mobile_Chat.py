@@ -5,7 +5,6 @@ Simplified interface for smartphone usage.
 import streamlit as st
 from embedding_service import EmbeddingService
 from gemini_client import GeminiClient
-from supabase_client import SupabaseClient
 from auth_utils import require_auth
 
 # Mobile Configuration: Collapsed sidebar, wide layout
@@ -111,36 +110,14 @@ if user_query:
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             try:
-                # 1. Search
-                relevant_chunks = EmbeddingService.search_with_reranking(user_query, limit=10) # Matching desktop limit
+                # 1. Search (citations are enriched and signed inside the pipeline)
+                relevant_chunks = EmbeddingService.search_with_reranking(
+                    user_query, limit=10, enrich=True  # Matching desktop limit
+                )
                 
                 # 2. Enrich Citations
-                enriched_chunks = []
+                enriched_chunks = relevant_chunks
                 if relevant_chunks:
-                    for chunk in relevant_chunks:
-                        # Get document info (Simplified retrieval)
-                        # ... (Reusing logic but keeping it compact)
-                        file_url = None
-                        if chunk['source_type'] == 'document':
-                            doc = SupabaseClient.get_client().table("documents").select("symbol, title, file_url").eq("id", chunk['source_id']).execute()
-                            if doc.data:
-                                chunk['symbol'] = doc.data[0]['symbol']
-                                file_url = doc.data[0].get('file_url')
-                        elif chunk['source_type'] == 'interpretation':
-                            interp = SupabaseClient.get_client().table("interpretations").select("title, file_url").eq("id", chunk['source_id']).execute()
-                            if interp.data:
-                                chunk['symbol'] = "Interpretation"
-                                file_url = interp.data[0].get('file_url')
-                        else:
-                            reg = SupabaseClient.get_client().table("regulation_versions").select("regulation_id, series, file_url").eq("id", chunk['source_id']).execute()
-                            if reg.data:
-                                chunk['symbol'] = f"Reg {reg.data[0]['regulation_id']}"
-                                file_url = reg.data[0].get('file_url')
-                        
-                        if file_url:
-                            chunk['signed_url'] = SupabaseClient.get_signed_url(file_url)
-                        enriched_chunks.append(chunk)
-
                     # 3. Generate Answer
                     response = GeminiClient.chat_with_context(user_query, enriched_chunks)
                 else:
@@ -4,7 +4,6 @@ Display all sessions organized hierarchically with document counts
 """
 import streamlit as st
 from supabase_client import SupabaseClient
-import pandas as pd
 
 st.set_page_config(page_title="My Meetings", page_icon="📅", layout="wide")
 
@@ -22,28 +21,17 @@ st.markdown("Browse all sessions organized by working group hierarchy")
 def load_sessions_with_counts():
     """Load all sessions with document counts, grouped by type"""
     try:
-        client = SupabaseClient.get_client()
-        
-        # Get all sessions
-        sessions_resp = client.table("sessions").select("*").execute()
-        if not sessions_resp.data:
+        # One query: sessions + group info + trigger-maintained doc_count
+        sessions = SupabaseClient.get_all_sessions_with_counts()
+        if not sessions:
             return []
         
-        # Get all working groups
-        groups_resp = client.table("groups").select("*").execute()
-        groups = {g['id']: g for g in groups_resp.data} if groups_resp.data else {}
-        
         # Build sessions with counts
         sessions_with_counts = []
-        for session in sessions_resp.data:
+        for session in sessions:
             # Get group info - in groups table, 'id' is the code (GRE, WP.29, etc.)
-            group = groups.get(session['group_id'], {})
+            group = session.get('groups') or {}
             parent_id = group.get('parent_group_id')
-            parent_group = groups.get(parent_id, {}) if parent_id else {}
-            
-            # Count documents for this session
-            doc_count_resp = client.table("documents").select("id", count="exact").eq("session_id", session['id']).execute()
-            doc_count = doc_count_resp.count if doc_count_resp.count else 0
             
             sessions_with_counts.append({
                 'session_id': session['id'],
@@ -53,8 +41,9 @@ def load_sessions_with_counts():
                 'group_name': group.get('full_name', 'Unknown'),
                 'group_type': group.get('type', 'Unknown'),  # GR, TF, IWG, etc.
                 'parent_id': parent_id,
-                'parent_code': parent_group.get('id'),  # id IS the code
-                'doc_count': doc_count
+                'parent_code': parent_id,  # id IS the code
+                'doc_count': session.get('doc_count', 0),
+                'embedded_doc_count': session.get('embedded_doc_count', 0)
             })
         
         return sessions_with_counts
@@ -1,8 +1,7 @@
 """
 PDF processing utilities for UNECE WP.29 Archive
-Text extraction and chunking using PyMuPDF (fitz)
+Text extraction and chunking using PyMuPDF (fitz, imported on first use)
 """
-import fitz  # PyMuPDF
 from typing import List
 import io
 
@@ -17,6 +16,7 @@ class PDFProcessor:
         Returns empty string on error
         """
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(stream=pdf_bytes, filetype="pdf")
             if len(doc) == 0:
                 doc.close()
@@ -39,6 +39,7 @@ class PDFProcessor:
         Extract all text from a PDF
         """
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(stream=pdf_bytes, filetype="pdf")
             text_parts = []
             
@@ -112,6 +113,7 @@ class PDFProcessor:
     def get_page_count(pdf_bytes: bytes) -> int:
         """Get number of pages in PDF"""
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(stream=pdf_bytes, filetype="pdf")
             count = len(doc)
             doc.close()
@@ -119,3 +121,30 @@ class PDFProcessor:
         except Exception as e:
             print(f"Error getting page count: {e}")
             return 0
+    
+    @staticmethod
+    def extract_page_texts(pdf_bytes: bytes) -> List[str]:
+        """Text of every page, in page order (for page-level searches)"""
+        import fitz  # PyMuPDF
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            return [page.get_text() for page in doc]
+        finally:
+            doc.close()
+    
+    @staticmethod
+    def slice_pages(pdf_bytes: bytes, pages: List[int]) -> bytes:
+        """
+        New in-memory PDF with only the given pages (0-based, kept in order).
+        Unused objects are dropped so the result is small.
+        """
+        import fitz  # PyMuPDF
+        src = fitz.open(stream=pdf_bytes, filetype="pdf")
+        out = fitz.open()
+        try:
+            for page_num in sorted(set(pages)):
+                out.insert_pdf(src, from_page=page_num, to_page=page_num)
+            return out.tobytes(garbage=3, deflate=True)
+        finally:
+            out.close()
+            src.close()
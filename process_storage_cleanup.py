@@ -0,0 +1,35 @@
+"""
+Remove storage objects queued by bulk deletions (storage_cleanup_queue).
+Needs SUPABASE_SERVICE_KEY: the queue is only accessible to the service role.
+"""
+from config import Config
+from supabase_client import SupabaseClient
+
+client = SupabaseClient.get_admin_client()
+
+print("=" * 70)
+print("PROCESS STORAGE CLEANUP QUEUE")
+print("=" * 70)
+
+pending = client.table("storage_cleanup_queue").select("id", count="exact", head=True).execute().count or 0
+print(f"\nQueued objects: {pending}")
+
+total_removed = 0
+while True:
+    removed = SupabaseClient.process_storage_cleanup()
+    total_removed += removed
+    if removed == 0:
+        break
+    print(f"  [OK] Removed {removed} objects")
+
+remaining = client.table("storage_cleanup_queue").select("id", count="exact", head=True) \
+    .lt("attempts", Config.STORAGE_CLEANUP_MAX_ATTEMPTS).execute().count or 0
+given_up = client.table("storage_cleanup_queue").select("id", count="exact", head=True) \
+    .gte("attempts", Config.STORAGE_CLEANUP_MAX_ATTEMPTS).execute().count or 0
+
+print(f"\n{'='*70}")
+print(f"SUMMARY")
+print(f"{'='*70}")
+print(f"Removed: {total_removed}")
+print(f"Still queued (failed, see last_error): {remaining}")
+print(f"Given up after {Config.STORAGE_CLEANUP_MAX_ATTEMPTS} attempts (see last_error): {given_up}")
@@ -0,0 +1,187 @@
+"""
+Batch scanner for adopted proposals
+Scans every WP.29 report not scanned yet, a few at a time under the Gemini
+quota, and stages the results in proposal_scans for bulk review. Progress is
+persisted per document, so a long backfill can be stopped and resumed.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from config import Config
+from extract_proposals import ProposalExtractor
+from supabase_client import SupabaseClient
+
+class RateLimiter:
+    """Spaces calls evenly to at most per_minute, across threads"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ProposalScanner:
+    """Resumable, quota-aware batch scanning of WP.29 reports"""
+
+    QUOTA_RETRIES = 3  # extra attempts when Gemini answers 429 / quota exhausted
+
+    _stop = threading.Event()
+    _running = threading.Lock()  # one batch per process (CLI or page trigger)
+
+    @staticmethod
+    def is_quota_error(error: Exception) -> bool:
+        text = str(error).lower()
+        return "429" in text or "quota" in text or "resource exhausted" in text or "resourceexhausted" in text
+
+    @staticmethod
+    def scan_document(doc: Dict, limiter: RateLimiter) -> Dict:
+        """
+        Scan one document and stage the result. Quota errors are retried with
+        backoff; other errors mark the scan 'failed' (retried by the next run
+        until PROPOSAL_SCAN_MAX_ATTEMPTS).
+        """
+        previous = SupabaseClient.get_proposal_scans(document_ids=[doc['id']])
+        attempts = (previous[0]['attempts'] if previous else 0) + 1
+        SupabaseClient.save_proposal_scan(doc['id'], {
+            'session_id': doc.get('session_id'),
+            'status': 'running',
+            'attempts': attempts,
+            'error': None,
+            'started_at': datetime.now(timezone.utc).isoformat()
+        })
+
+        start = time.perf_counter()
+        fields = {}
+        for retry in range(ProposalScanner.QUOTA_RETRIES + 1):
+            limiter.wait()
+            try:
+                proposals = ProposalExtractor.extract_proposals_from_doc(doc['id'])
+                fields = {
+                    'status': 'staged' if proposals else 'empty',
+                    'proposals': proposals or [],
+                    'proposal_count': len(proposals or []),
+                }
+                break
+            except Exception as e:
+                fields = {'status': 'failed', 'error': str(e)}
+                if not ProposalScanner.is_quota_error(e) or retry == ProposalScanner.QUOTA_RETRIES:
+                    break
+                time.sleep(min(30 * 2 ** retry, 300))
+
+        fields['seconds'] = round(time.perf_counter() - start, 1)
+        fields['finished_at'] = datetime.now(timezone.utc).isoformat()
+        SupabaseClient.save_proposal_scan(doc['id'], fields)
+        return {'document_id': doc['id'], **fields}
+
+    @staticmethod
+    def run(limit: Optional[int] = None, max_workers: Optional[int] = None,
+            progress_callback: Optional[Callable[[int, int, Dict, Dict], None]] = None) -> Dict[str, int]:
+        """
+        Scan the pending documents (at most limit), PROPOSAL_SCAN_CONCURRENCY at
+        a time and PROPOSAL_SCAN_RPM Gemini requests per minute.
+        stop() ends the run after the documents in flight; the rest stay pending.
+
+        Args:
+            progress_callback: Optional callback(done, total, document, result)
+
+        Returns:
+            {'staged', 'empty', 'failed', 'remaining'}
+        """
+        if not ProposalScanner._running.acquire(blocking=False):
+            raise RuntimeError("A batch scan is already running")
+        try:
+            ProposalScanner._stop.clear()
+            max_workers = max_workers or Config.PROPOSAL_SCAN_CONCURRENCY
+            docs = SupabaseClient.get_unscanned_proposal_documents(
+                limit or 1000, Config.PROPOSAL_SCAN_MAX_ATTEMPTS, Config.PROPOSAL_SCAN_RUNNING_TIMEOUT
+            )
+            limiter = RateLimiter(Config.PROPOSAL_SCAN_RPM)
+            counts = {'staged': 0, 'empty': 0, 'failed': 0, 'remaining': 0}
+
+            def run_one(doc: Dict) -> Optional[Dict]:
+                if ProposalScanner._stop.is_set():
+                    return None  # left pending for the next run
+                return ProposalScanner.scan_document(doc, limiter)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                run_one = SupabaseClient.bind_session(run_one)
+                futures = {executor.submit(run_one, doc): doc for doc in docs}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'status': 'failed', 'error': str(e)}
+                    if result is None:
+                        counts['remaining'] += 1
+                        continue
+                    counts[result['status']] += 1
+                    if progress_callback:
+                        progress_callback(done, len(docs), futures[future], result)
+            return counts
+        finally:
+            ProposalScanner._running.release()
+
+    @staticmethod
+    def run_in_background(limit: Optional[int] = None) -> threading.Thread:
+        """Start run() in a daemon thread (page trigger); progress is read back from proposal_scans"""
+        thread = threading.Thread(target=SupabaseClient.bind_session(ProposalScanner.run), args=(limit,),
+                                  name="proposal-scan", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def is_running() -> bool:
+        return ProposalScanner._running.locked()
+
+    @staticmethod
+    def stop():
+        """Ask the current run to stop after the documents in flight"""
+        ProposalScanner._stop.set()
+
+    # -------------------------------------------------------------------------
+    # Review
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def approve(scan: Dict, records: Optional[List[Dict]] = None) -> Dict[str, int]:
+        """
+        Mark the scan approved, then save its proposals (or the reviewed records)
+        to adopted_proposals. The status goes first so a retry never inserts the
+        proposals twice; it is reset to 'staged' if the insert fails.
+        """
+        rows = records if records is not None else [
+            {
+                "regulation_id": p.get("regulation_id"),
+                "series": p.get("series"),
+                "supplement": p.get("supplement"),
+                "entry_date": p.get("entry_date"),
+                "description": p.get("description"),
+                "status": p.get("status") or "Adopted",
+                "document_code": p.get("document_code"),
+                "source_doc_id": scan['document_id'],
+                "session_id": scan['session_id']
+            }
+            for p in scan.get('proposals') or []
+            if p.get("description")
+        ]
+        SupabaseClient.save_proposal_scan(scan['document_id'], {'status': 'approved'})
+        try:
+            return SupabaseClient.save_adopted_proposals(rows)
+        except Exception:
+            SupabaseClient.save_proposal_scan(scan['document_id'], {'status': 'staged'})
+            raise
+
+    @staticmethod
+    def reject(scan: Dict):
+        """Discard a staged scan (the document is not rescanned)"""
+        SupabaseClient.save_proposal_scan(scan['document_id'], {'status': 'rejected'})
@@ -0,0 +1,84 @@
+"""
+Reconcile the storage buckets with the database (needs init_reconciliation.sql)
+
+Streams unece-archive / chunks_cache and the documents, interpretations,
+regulation_versions, report_exports and embeddings tables in sorted order and
+lists what is left over:
+  archive    PDFs / exports nobody references, references to missing PDFs
+  chunks     chunk JSONs without an embedding, embeddings without their chunk JSON
+  embeddings embeddings whose document / interpretation / regulation version is gone
+Report only by default; --delete removes the orphans in batches with the
+service role (SUPABASE_SERVICE_KEY required; references to missing files are
+never deleted). Replaces check_orphaned_files.py,
+cleanup_orphaned.py and clean_orphaned_embeddings.sql.
+
+Usage: python reconcile_storage.py [--check archive chunks embeddings] [--report orphans.csv]
+                                   [--delete] [--min-age-hours 24] [--page-size 1000]
+"""
+import argparse
+import csv
+import sys
+from config import Config
+from reconciler import Reconciler
+
+SHOWN_PER_KIND = 20  # findings printed per check and kind; the report has all of them
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--check", nargs="+", choices=Reconciler.CHECKS, help="checks to run (default all)")
+    parser.add_argument("--report", help="write every finding to this CSV file")
+    parser.add_argument("--delete", action="store_true", help="remove orphan objects and embeddings")
+    parser.add_argument("--min-age-hours", type=float, help="skip newer orphans (default RECONCILE_MIN_AGE_HOURS)")
+    parser.add_argument("--page-size", type=int, help="rows per stream page (default RECONCILE_PAGE_SIZE)")
+    opts = parser.parse_args()
+    if opts.delete and not Config.SUPABASE_SERVICE_KEY:
+        parser.error("--delete needs SUPABASE_SERVICE_KEY in .env (rows hidden by RLS would look like orphans)")
+
+    print("=" * 70)
+    print(f"RECONCILE STORAGE ({'DELETE' if opts.delete else 'report only'}: {', '.join(opts.check or Reconciler.CHECKS)})")
+    print("=" * 70)
+
+    report_file = open(opts.report, "w", newline="", encoding="utf-8") if opts.report else None
+    writer = None
+    if report_file:
+        writer = csv.DictWriter(report_file, fieldnames=["check", "kind", "target", "key", "size", "created_at"])
+        writer.writeheader()
+
+    shown = {}
+
+    def on_finding(finding):
+        if writer:
+            writer.writerow(finding)
+        label = (finding['check'], finding['kind'])
+        shown[label] = shown.get(label, 0) + 1
+        if shown[label] <= SHOWN_PER_KIND:
+            print(f"  [{finding['kind'].upper()}] {finding['check']} {finding['target']}: {finding['key']}")
+        elif shown[label] == SHOWN_PER_KIND + 1:
+            print(f"  ... more {finding['kind']} items in {finding['check']}" + (f" (see {opts.report})" if opts.report else ""))
+
+    reconciler = Reconciler(delete=opts.delete, min_age_hours=opts.min_age_hours,
+                            page_size=opts.page_size, on_finding=on_finding)
+    try:
+        counts = reconciler.run(opts.check)
+    finally:
+        if report_file:
+            report_file.close()
+
+    print(f"\n{'='*70}")
+    print(f"SUMMARY")
+    print(f"{'='*70}")
+    for check, c in counts.items():
+        print(f"{check}: {c['scanned']} scanned, {c['matched']} referenced, {c['orphan']} orphan, "
+              f"{c['recent']} recent (skipped), {c['missing']} missing, {c['deleted']} deleted")
+    for error in reconciler.errors:
+        print(f"  [ERROR] {error}")
+    if not opts.delete and any(c['orphan'] for c in counts.values()):
+        print("\nRun again with --delete to remove the orphans.")
+
+    if reconciler.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Storage / database reconciliation
+Compares the storage buckets with the rows that reference them as sorted
+streams (init_reconciliation.sql) and reports, or removes in batches, what is
+left over: archive PDFs and chunk JSONs nobody references, embeddings whose
+source row is gone, and references to files that no longer exist.
+Only one page per stream and one deletion batch are held in memory, so the
+run scales to millions of objects.
+"""
+import heapq
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from supabase_client import SupabaseClient
+
+class Reconciler:
+    """
+    Merge-diff of sorted, keyset-paged streams. Keyset paging (key > last key)
+    also keeps the streams stable while orphans behind the cursor are deleted.
+    """
+
+    # Embeddings first: the chunk objects of deleted orphan embeddings are
+    # then reported by the chunks check of the same run
+    CHECKS = ("embeddings", "archive", "chunks")
+    ARCHIVE_SOURCES = ("documents", "interpretations", "regulation_versions", "report_exports")
+    EMBEDDING_SOURCES = {
+        "document": "documents",
+        "interpretation": "interpretations",
+        "regulation": "regulation_versions",
+    }
+    IGNORED_SUFFIXES = (".emptyFolderPlaceholder",)  # created by the dashboard for empty folders
+    ZERO_UUID = "00000000-0000-0000-0000-000000000000"
+
+    def __init__(self, delete: bool = False, min_age_hours: Optional[float] = None,
+                 page_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 on_finding: Optional[Callable[[Dict], None]] = None):
+        """
+        Args:
+            delete: Remove orphan objects / embeddings (default: report only;
+                    needs SUPABASE_SERVICE_KEY). References to missing files
+                    are only reported.
+            min_age_hours: Orphan objects younger than this are skipped, as an
+                    upload may still be waiting for its row (default RECONCILE_MIN_AGE_HOURS)
+            page_size: Rows per stream page (default RECONCILE_PAGE_SIZE)
+            batch_size: Objects / source ids per deletion request (default STORAGE_REMOVE_BATCH)
+            on_finding: Optional callback(finding) for every orphan, recent or missing item
+        """
+        if delete and not Config.SUPABASE_SERVICE_KEY:
+            # Without the service role, RLS can hide referencing rows and turn
+            # every file they use into an "orphan"
+            raise RuntimeError("Deleting orphans needs SUPABASE_SERVICE_KEY (set it in .env)")
+        self.delete = delete
+        self.min_age_hours = Config.RECONCILE_MIN_AGE_HOURS if min_age_hours is None else min_age_hours
+        self.page_size = page_size or Config.RECONCILE_PAGE_SIZE
+        self.batch_size = batch_size or SupabaseClient.STORAGE_REMOVE_BATCH
+        self.on_finding = on_finding
+        self.cutoff = datetime.now(timezone.utc) - timedelta(hours=self.min_age_hours)
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.errors: List[str] = []
+
+    @property
+    def client(self):
+        """Service-role client (sees every row regardless of RLS); anon for report-only runs without the key"""
+        if Config.SUPABASE_SERVICE_KEY:
+            return SupabaseClient.get_admin_client()
+        return SupabaseClient.get_client()
+
+    # -------------------------------------------------------------------------
+    # Sorted streams
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def keyset(fetch: Callable[[Optional[str], int], List], key: Callable[[Any], str],
+               page_size: int) -> Iterator:
+        """Rows of fetch(after, limit) page by page, after = key of the last row"""
+        after = None
+        while True:
+            rows = fetch(after, page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = key(rows[-1])
+
+    def _rpc_rows(self, name: str, params: Dict[str, Any]) -> List[Dict]:
+        return self.client.rpc(name, params).execute().data or []
+
+    def _rpc_stream(self, name: str, params: Dict[str, Any], column: str) -> Iterator[str]:
+        """Keys of a keyset-paged RPC (p_after / p_limit)"""
+        def fetch(after, limit):
+            rows = self._rpc_rows(name, {**params, "p_after": after, "p_limit": limit})
+            return [row[column] for row in rows]
+        return self.keyset(fetch, lambda value: value, self.page_size)
+
+    def storage_objects(self, bucket: str) -> Iterator[Tuple[str, Dict]]:
+        """(path, object) of a bucket in path order"""
+        try:
+            self._rpc_rows("list_storage_objects", {"p_bucket": bucket, "p_after": "", "p_limit": 1})
+        except Exception as e:
+            print(f"list_storage_objects unavailable ({e}); listing {bucket} folder by folder")
+            yield from self._walk_bucket(bucket, "")
+            return
+
+        def fetch(after, limit):
+            return self._rpc_rows("list_storage_objects", {"p_bucket": bucket, "p_after": after or "", "p_limit": limit})
+        for row in self.keyset(fetch, lambda row: row["name"], self.page_size):
+            yield row["name"], row
+
+    def _walk_bucket(self, bucket: str, prefix: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        Fallback without the migration: depth-first listing through the storage
+        API. Sorting each folder by name (+ '/' for subfolders) yields full
+        paths in the same order as the RPC; one folder listing per level is
+        held in memory.
+        """
+        entries = []
+        offset = 0
+        while True:
+            page = self.client.storage.from_(bucket).list(prefix, {
+                "limit": self.page_size,
+                "offset": offset,
+                "sortBy": {"column": "name", "order": "asc"}
+            })
+            for entry in page:
+                folder = entry.get("id") is None
+                entries.append((entry["name"] + ("/" if folder else ""), entry))
+            if len(page) < self.page_size:
+                break
+            offset += len(page)
+
+        entries.sort(key=lambda item: item[0])
+        for name, entry in entries:
+            path = f"{prefix}/{name}" if prefix else name
+            if name.endswith("/"):
+                yield from self._walk_bucket(bucket, path.rstrip("/"))
+            else:
+                yield path, {
+                    "name": path,
+                    "size": (entry.get("metadata") or {}).get("size"),
+                    "created_at": entry.get("created_at")
+                }
+
+    def archive_references(self) -> Iterator[Tuple[str, str]]:
+        """(path, source table) of the archive paths referenced by any table, in path order (with duplicates)"""
+        return heapq.merge(*(
+            zip(self._rpc_stream("list_archive_references", {"p_source": source, "p_bucket": Config.STORAGE_BUCKET}, "path"),
+                itertools.repeat(source))
+            for source in self.ARCHIVE_SOURCES
+        ))
+
+    def chunk_references(self) -> Iterator[str]:
+        """embeddings.content_path in path order"""
+        return self._rpc_stream("list_chunk_references", {}, "path")
+
+    def embedding_sources(self, source_type: str) -> Iterator[str]:
+        """Distinct source ids of the embeddings of one source_type"""
+        return self._rpc_stream("list_embedding_sources", {"p_source_type": source_type}, "source_id")
+
+    def source_ids(self, table: str) -> Iterator[str]:
+        """Primary keys of a source table"""
+        def fetch(after, limit):
+            rows = self.client.table(table).select("id").gt("id", after or self.ZERO_UUID) \
+                .order("id").limit(limit).execute().data or []
+            return [row["id"] for row in rows]
+        return self.keyset(fetch, lambda value: value, self.page_size)
+
+    # -------------------------------------------------------------------------
+    # Merge-diff
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _ordered(stream: Iterator[Tuple[str, Any]], name: str) -> Iterator[Tuple[str, Any]]:
+        """Drop repeated keys; fail on a key out of order (a collation mismatch would report everything as orphan)"""
+        previous = None
+        for key, item in stream:
+            if previous is not None:
+                if key < previous:
+                    raise ValueError(f"{name} stream is not sorted: {key!r} after {previous!r}")
+                if key == previous:
+                    continue
+            previous = key
+            yield key, item
+
+    @staticmethod
+    def merge_diff(found: Iterator[Tuple[str, Any]], expected: Iterator[str]) -> Iterator[Tuple[str, str, Any]]:
+        """
+        Walk two sorted streams side by side.
+
+        Args:
+            found: (key, item) that exist, e.g. storage objects
+            expected: keys that should exist, e.g. referenced paths
+
+        Yields:
+            ('matched', key, item), ('orphan', key, item) for found only,
+            ('missing', key, None) for expected only
+        """
+        found = Reconciler._ordered(found, "found")
+        expected = Reconciler._ordered(((key, None) for key in expected), "expected")
+        f = next(found, None)
+        e = next(expected, None)
+        while f is not None or e is not None:
+            if e is None or (f is not None and f[0] < e[0]):
+                yield "orphan", f[0], f[1]
+                f = next(found, None)
+            elif f is None or e[0] < f[0]:
+                yield "missing", e[0], None
+                e = next(expected, None)
+            else:
+                yield "matched", f[0], f[1]
+                f = next(found, None)
+                e = next(expected, None)
+
+    # -------------------------------------------------------------------------
+    # Checks
+    # -------------------------------------------------------------------------
+
+    def _is_recent(self, item: Optional[Dict]) -> bool:
+        created = (item or {}).get("created_at")
+        if not created:
+            return False
+        try:
+            return datetime.fromisoformat(str(created).replace("Z", "+00:00")) > self.cutoff
+        except ValueError:
+            return False
+
+    def _emit(self, check: str, kind: str, target: str, key: str, item: Optional[Dict] = None):
+        if self.on_finding:
+            self.on_finding({
+                "check": check,
+                "kind": kind,
+                "target": target,
+                "key": key,
+                "size": (item or {}).get("size"),
+                "created_at": (item or {}).get("created_at")
+            })
+
+    def _reconcile(self, check: str, target: str, found: Iterator[Tuple[str, Any]], expected: Iterator[str],
+                   remove: Callable[[List[str]], Tuple[int, List[str]]], report_missing: bool = True):
+        counts = self.counts.setdefault(check, {
+            "scanned": 0, "matched": 0, "orphan": 0, "recent": 0, "missing": 0, "deleted": 0
+        })
+        batch: List[str] = []
+        matched = 0
+
+        def flush():
+            if not batch:
+                return
+            if not matched:
+                # Nothing referenced at all: more likely missing rows (RLS, wrong
+                # project, migration not run) than a bucket full of orphans
+                raise RuntimeError(f"{check}: no {target} entry is referenced; refusing to delete")
+            removed, errors = remove(list(batch))
+            counts["deleted"] += removed
+            self.errors.extend(f"{check}: {error}" for error in errors)
+            batch.clear()
+
+        for status, key, item in self.merge_diff(found, expected):
+            if status == "missing":
+                if report_missing:
+                    counts["missing"] += 1
+                    self._emit(check, "missing", target, key)
+                continue
+            counts["scanned"] += 1
+            if status == "matched":
+                counts["matched"] += 1
+                matched += 1
+            elif self._is_recent(item):
+                counts["recent"] += 1
+                self._emit(check, "recent", target, key, item)
+            else:
+                counts["orphan"] += 1
+                self._emit(check, "orphan", target, key, item)
+                if self.delete:
+                    batch.append(key)
+                    if len(batch) >= self.batch_size:
+                        flush()
+        flush()
+
+    def _visible(self, objects: Iterator[Tuple[str, Dict]]) -> Iterator[Tuple[str, Dict]]:
+        return ((path, item) for path, item in objects if not path.endswith(self.IGNORED_SUFFIXES))
+
+    def _delete_objects(self, bucket: str, paths: List[str]) -> Tuple[int, List[str]]:
+        with SupabaseClient.admin_scope():
+            return SupabaseClient.remove_storage_objects(bucket, paths)
+
+    def _delete_embeddings(self, source_type: str, source_ids: List[str]) -> Tuple[int, List[str]]:
+        try:
+            self.client.table("embeddings").delete() \
+                .eq("source_type", source_type).in_("source_id", source_ids).execute()
+            return len(source_ids), []
+        except Exception as e:
+            return 0, [f"{len(source_ids)} sources from {source_ids[0]}: {str(e)}"]
+
+    def _archive_paths(self, sources: Dict[str, set]) -> Iterator[str]:
+        """Distinct referenced archive paths; sources['current'] = tables referencing the last one"""
+        for path, refs in itertools.groupby(self.archive_references(), key=lambda ref: ref[0]):
+            sources["current"] = {source for _, source in refs}
+            yield path
+
+    def unmatched_archive_sources(self) -> List[str]:
+        """
+        Reference sources none of whose paths exists in the archive bucket (a
+        report-only pass). One table referencing nothing that exists - e.g. a
+        URL or bucket mismatch - would otherwise have all its files deleted.
+        """
+        bucket = Config.STORAGE_BUCKET
+        sources: Dict[str, set] = {}
+        referencing, matched = set(), set()
+        for status, _, _ in self.merge_diff(self._visible(self.storage_objects(bucket)), self._archive_paths(sources)):
+            if status != "orphan":
+                referencing |= sources["current"]
+            if status == "matched":
+                matched |= sources["current"]
+        return [source for source in self.ARCHIVE_SOURCES if source in referencing and source not in matched]
+
+    def check_archive(self):
+        """Archive objects nobody references / references to missing PDFs"""
+        bucket = Config.STORAGE_BUCKET
+        if self.delete:
+            unmatched = self.unmatched_archive_sources()
+            if unmatched:
+                raise RuntimeError(f"archive: no {bucket} object is referenced by {', '.join(unmatched)}; "
+                                   "refusing to delete")
+        self._reconcile("archive", bucket, self._visible(self.storage_objects(bucket)),
+                        self._archive_paths({}), lambda paths: self._delete_objects(bucket, paths))
+
+    def check_chunks(self):
+        """chunks_cache objects without an embedding / embeddings whose chunk JSON is missing"""
+        bucket = Config.CHUNKS_CACHE_BUCKET
+        self._reconcile("chunks", bucket, self._visible(self.storage_objects(bucket)),
+                        self.chunk_references(), lambda paths: self._delete_objects(bucket, paths))
+
+    def check_embeddings(self):
+        """Embeddings whose document / interpretation / regulation version is gone"""
+        for source_type, table in self.EMBEDDING_SOURCES.items():
+            self._reconcile("embeddings", f"{source_type} ({table})",
+                            ((source_id, None) for source_id in self.embedding_sources(source_type)),
+                            self.source_ids(table),
+                            lambda ids, source_type=source_type: self._delete_embeddings(source_type, ids),
+                            report_missing=False)
+
+    def run(self, checks: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Run the checks (default all, in CHECKS order).
+
+        Returns:
+            check -> {'scanned', 'matched', 'orphan', 'recent', 'missing', 'deleted'};
+            failed deletion batches are in self.errors
+        """
+        for check in self.CHECKS:
+            if checks is None or check in checks:
+                getattr(self, f"check_{check}")()
+        return self.counts
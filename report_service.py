@@ -0,0 +1,278 @@
+"""
+Session report service
+Builds session reports from the regulation sections (cached in session_reports),
+renders them as Markdown/Word and exports whole groups or years in the background
+"""
+import io
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from config import Config
+from gemini_client import GeminiClient
+from supabase_client import SupabaseClient
+
+class ReportService:
+    """Session report generation and export"""
+
+    EXPORT_FOLDER = "reports"  # in the archive bucket: reports/{group}/{year}/...
+
+    # =========================================================================
+    # BUILDING BLOCKS (shared with the Report Generator page)
+    # =========================================================================
+
+    @staticmethod
+    def regulation_order(reg_id: str):
+        """Sort key: R9 < R13 < R48 ..., 'General Topics' and other labels last"""
+        match = re.match(r'^R?(\d+)', reg_id)
+        return (0, int(match.group(1)), reg_id) if match else (1, 0, reg_id)
+
+    @staticmethod
+    def attach_summaries(documents: List[Dict]) -> int:
+        """
+        Add the stored per-document summary ('summary' key) to each document.
+        Returns how many documents have one (0 if document_summaries is unavailable).
+        """
+        try:
+            summaries = SupabaseClient.get_document_summaries([doc['id'] for doc in documents])
+        except Exception:
+            summaries = {}
+        for doc in documents:
+            doc['summary'] = summaries.get(doc['id'], {}).get('summary')
+        return len(summaries)
+
+    @staticmethod
+    def group_by_regulation(documents: List[Dict]) -> Dict[str, List[Dict]]:
+        """Documents per regulation ('General Topics' when none), in regulation order"""
+        by_regulation = {}
+        for doc in documents:
+            # Handle potential None values explicitly
+            reg_id = doc.get('regulation_ref_id') or 'General Topics'
+            by_regulation.setdefault(reg_id, []).append(doc)
+        return {reg_id: by_regulation[reg_id] for reg_id in sorted(by_regulation, key=ReportService.regulation_order)}
+
+    @staticmethod
+    def load_cached_sections(session_id: str, fingerprints: Dict[str, str]) -> Dict[str, Dict]:
+        """Cached sections of a session whose documents, model and prompt are unchanged (raises if unavailable)"""
+        rows = SupabaseClient.get_session_reports(session_id)
+        return {
+            row['regulation']: {
+                'regulation': row['regulation'], 'text': row['content'], 'error': None,
+                'seconds': row.get('generation_seconds') or 0.0, 'attempts': 1,
+                'cached': row.get('created_at') or ''
+            }
+            for row in rows
+            if row['input_hash'] == fingerprints.get(row['regulation'])
+            and row['model'] == Config.GEMINI_PRO_MODEL
+            and row['prompt_version'] == GeminiClient.REPORT_PROMPT_VERSION
+        }
+
+    @staticmethod
+    def save_section(session_id: str, fingerprint: str, docs: List[Dict], result: Dict):
+        """Store a generated section in session_reports"""
+        SupabaseClient.save_session_report(
+            session_id, result['regulation'], fingerprint,
+            Config.GEMINI_PRO_MODEL, GeminiClient.REPORT_PROMPT_VERSION, result['text'],
+            len(docs), result['seconds']
+        )
+
+    @staticmethod
+    def build_markdown(info: Dict, order: List[str], sections: Dict[str, Dict]) -> str:
+        """Assemble the markdown report (info: group, code, year, dates) from sections, in order"""
+        full_summary = f"# Session Report: {info['group']} Session {info['code']} ({info['year']})\n\n"
+        if info.get('dates'):
+            full_summary += f"**Dates:** {info['dates']}\n\n"
+        full_summary += "---\n\n"
+        for reg_id in order:
+            section = sections[reg_id]
+            summary_text = f"Error generating summary: {section['error']}" if section['error'] else section['text']
+            full_summary += f"## {reg_id}\n\n{summary_text}\n\n"
+        return full_summary
+
+    @staticmethod
+    def build_docx(markdown: str, info: Dict) -> bytes:
+        """Render the markdown report as a Word document"""
+        # python-docx is only needed for this export
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+        # Create Word document
+        doc = Document()
+
+        # Title
+        title = doc.add_heading(f"{info['group']} Session {info['code']} Report", level=0)
+        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        # Subtitle
+        subtitle = doc.add_paragraph(f"Year: {info['year']}")
+        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        doc.add_paragraph()
+
+        # Add summary content (parse markdown to add headings)
+        for line in markdown.split('\n'):
+            if line.startswith('## '):
+                doc.add_heading(line[3:], level=1)
+            elif line.startswith('# '):
+                doc.add_heading(line[2:], level=0)
+            elif line.strip():
+                doc.add_paragraph(line)
+
+        # Save to bytes
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def report_file_name(info: Dict, extension: str) -> str:
+        """e.g. GRE_Session_90_Report.md"""
+        return f"{info['group']}_Session_{info['code']}_Report.{extension}"
+
+    # =========================================================================
+    # HEADLESS GENERATION / EXPORT
+    # =========================================================================
+
+    @staticmethod
+    def generate_session_report(session: Dict) -> Dict:
+        """
+        Generate the report of one session outside Streamlit: cached sections are
+        reused, the others generated in parallel and cached.
+
+        Returns:
+            {'info', 'markdown', 'sections', 'generated', 'cached', 'failed'}
+        """
+        info = {
+            'session_id': session['id'],
+            'group': session['group_id'],
+            'code': session['code'],
+            'year': session['year'],
+            'dates': session.get('dates')
+        }
+        documents = SupabaseClient.get_documents_by_session(session['id'])
+        ReportService.attach_summaries(documents)
+        by_regulation = ReportService.group_by_regulation(documents)
+        order = list(by_regulation)
+        fingerprints = {reg_id: GeminiClient.report_fingerprint(docs) for reg_id, docs in by_regulation.items()}
+
+        try:
+            sections = ReportService.load_cached_sections(session['id'], fingerprints)
+        except Exception:
+            sections = {}
+        cached = len(sections)
+
+        to_generate = {reg_id: docs for reg_id, docs in by_regulation.items() if reg_id not in sections}
+        if to_generate:
+            for result in GeminiClient.summarize_regulations(to_generate, info['group'], info['code']):
+                sections[result['regulation']] = result
+                if not result['error']:
+                    reg_id = result['regulation']
+                    try:
+                        ReportService.save_section(session['id'], fingerprints[reg_id], by_regulation[reg_id], result)
+                    except Exception as e:
+                        # The section is still in this report; it is only regenerated next time
+                        print(f"Could not cache section {reg_id} of session {info['code']}: {e}")
+
+        return {
+            'info': info,
+            'markdown': ReportService.build_markdown(info, order, sections),
+            'sections': len(order),
+            'generated': len(to_generate),
+            'cached': cached,
+            'failed': sum(1 for section in sections.values() if section['error'])
+        }
+
+    @staticmethod
+    def export_session(session: Dict) -> Dict:
+        """
+        Generate one session report, upload the Markdown and Word files to the
+        archive bucket and record the export in report_exports.
+        Status is 'done', 'partial' (some sections failed, retried on resume) or 'failed'.
+        """
+        previous = SupabaseClient.get_report_exports([session['id']])
+        attempts = (previous[0]['attempts'] if previous else 0) + 1
+        SupabaseClient.save_report_export(session['id'], {
+            'status': 'running',
+            'attempts': attempts,
+            'error': None,
+            'started_at': datetime.now(timezone.utc).isoformat()
+        })
+
+        start = time.perf_counter()
+        try:
+            report = ReportService.generate_session_report(session)
+            info = report['info']
+            folder = f"{ReportService.EXPORT_FOLDER}/{re.sub(r'[^A-Za-z0-9._-]', '-', str(info['group']))}/{info['year']}"
+            md_path = f"{folder}/{re.sub(r'[^A-Za-z0-9._-]', '-', ReportService.report_file_name(info, 'md'))}"
+            docx_path = f"{folder}/{re.sub(r'[^A-Za-z0-9._-]', '-', ReportService.report_file_name(info, 'docx'))}"
+
+            SupabaseClient.upload_file(md_path, report['markdown'].encode('utf-8'), content_type="text/markdown")
+            SupabaseClient.upload_file(
+                docx_path, ReportService.build_docx(report['markdown'], info),
+                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+
+            fields = {
+                'status': 'partial' if report['failed'] else 'done',
+                'markdown_path': md_path,
+                'docx_path': docx_path,
+                'sections': report['sections'],
+                'cached_sections': report['cached'],
+                'failed_sections': report['failed'],
+                'error': f"{report['failed']} section(s) failed" if report['failed'] else None,
+            }
+        except Exception as e:
+            fields = {'status': 'failed', 'error': str(e)}
+
+        fields['seconds'] = round(time.perf_counter() - start, 1)
+        fields['finished_at'] = datetime.now(timezone.utc).isoformat()
+        SupabaseClient.save_report_export(session['id'], fields)
+        return {'session_id': session['id'], **fields}
+
+    @staticmethod
+    def export_reports(group_id: Optional[str] = None, year: Optional[int] = None,
+                       force: bool = False, max_workers: Optional[int] = None,
+                       progress_callback: Optional[Callable[[int, int, Dict, Dict], None]] = None) -> Dict[str, int]:
+        """
+        Export the reports of every session of a group and/or year, several
+        sessions in parallel (REPORT_EXPORT_CONCURRENCY, each one running up to
+        REPORT_CONCURRENCY Gemini calls).
+
+        Resumable: sessions whose export is already 'done' are skipped unless
+        force, so a failed or interrupted run only redoes the rest, and sections
+        generated before the interruption come from the session_reports cache.
+
+        Args:
+            progress_callback: Optional callback(done, total, session, result)
+
+        Returns:
+            {'done', 'partial', 'failed', 'skipped'}
+        """
+        max_workers = max_workers or Config.REPORT_EXPORT_CONCURRENCY
+        sessions = [
+            s for s in SupabaseClient.get_all_sessions_with_counts()
+            if (group_id is None or s['group_id'] == group_id) and (year is None or s['year'] == year)
+        ]
+        sessions.sort(key=lambda s: (s['group_id'], s['year'], str(s['code'])))
+
+        counts = {'done': 0, 'partial': 0, 'failed': 0, 'skipped': 0}
+        if not force:
+            exported = {
+                row['session_id'] for row in SupabaseClient.get_report_exports([s['id'] for s in sessions])
+                if row['status'] == 'done'
+            }
+            counts['skipped'] = sum(1 for s in sessions if s['id'] in exported)
+            sessions = [s for s in sessions if s['id'] not in exported]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            export_session = SupabaseClient.bind_session(ReportService.export_session)
+            futures = {executor.submit(export_session, s): s for s in sessions}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'status': 'failed', 'error': str(e)}
+                counts[result['status']] += 1
+                if progress_callback:
+                    progress_callback(done, len(sessions), futures[future], result)
+        return counts
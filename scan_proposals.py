@@ -0,0 +1,58 @@
+"""
+Batch-scan WP.29 reports for adopted proposals (resumable backfill)
+
+Scans every Report / Adopted Proposals document of the WP.29 sessions that has
+not been scanned yet and stages the results in proposal_scans; review and
+approve them on the Adopted Proposals page ("Batch Scan"). Ctrl+C stops after
+the documents in flight; rerun the command to resume.
+
+Usage: python scan_proposals.py [--limit N] [--workers N]
+"""
+import argparse
+import threading
+from proposal_scanner import ProposalScanner
+from supabase_client import SupabaseClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, help="max documents in this run")
+    parser.add_argument("--workers", type=int, help="documents in parallel (default PROPOSAL_SCAN_CONCURRENCY)")
+    opts = parser.parse_args()
+
+    print("=" * 70)
+    print("BATCH PROPOSAL SCAN")
+    print("=" * 70)
+
+    def report(done, total, doc, result):
+        label = f"{doc.get('symbol')} (session {doc.get('session_code')}, {doc.get('session_year')})"
+        detail = result.get('error') or f"{result.get('proposal_count', 0)} proposals"
+        print(f"  [{done}/{total}] [{result['status'].upper()}] {label}: {detail}")
+
+    outcome = {}
+    def run():
+        outcome.update(ProposalScanner.run(opts.limit, opts.workers, progress_callback=report))
+
+    # Service role: the scan writes proposal_scans / adopted_proposals without a signed-in user
+    with SupabaseClient.admin_scope():
+        worker = threading.Thread(target=SupabaseClient.bind_session(run), daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(timeout=0.5)
+    except KeyboardInterrupt:
+        print("\nStopping after the documents in flight (rerun to resume)...")
+        ProposalScanner.stop()
+        worker.join()
+
+    print(f"\n{'='*70}")
+    print(f"SUMMARY")
+    print(f"{'='*70}")
+    print(f"Staged for review: {outcome.get('staged', 0)}")
+    print(f"No proposals found: {outcome.get('empty', 0)}")
+    print(f"Failed (retried next run): {outcome.get('failed', 0)}")
+    print(f"Not started (stopped): {outcome.get('remaining', 0)}")
+
+
+if __name__ == "__main__":
+    main()
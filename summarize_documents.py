@@ -0,0 +1,48 @@
+"""
+Backfill per-document summaries (document_summaries) for documents ingested
+before init_document_summaries.sql, whose background summary failed (retried
+up to DOC_SUMMARY_MAX_ATTEMPTS times) or summarized with an older prompt
+(GeminiClient.DOC_SUMMARY_PROMPT_VERSION)
+
+Usage: python summarize_documents.py [batch_size]
+"""
+import sys
+from config import Config
+from summary_service import SummaryService
+from supabase_client import SupabaseClient
+
+BATCH = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+print("=" * 70)
+print("SUMMARIZE DOCUMENTS")
+print("=" * 70)
+
+def report(done, total, item, error):
+    if error:
+        print(f"  [FAIL] {item.get('symbol')}: {error}")
+    else:
+        print(f"  [OK] {item.get('symbol')}")
+
+total = {'summarized': 0, 'failed': 0}
+failed_batches = 0
+# Service role: document_summaries is written without a signed-in user
+with SupabaseClient.admin_scope():
+    while True:
+        result = SummaryService.summarize_pending(BATCH, progress_callback=report)
+        total['summarized'] += result['summarized']
+        total['failed'] += result['failed']
+        # Every failure is recorded, so a document leaves the queue after
+        # DOC_SUMMARY_MAX_ATTEMPTS and the loop ends when nothing is pending
+        if result['summarized'] + result['failed'] == 0:
+            break
+        # Safety net if the failures cannot be recorded (they would come back forever)
+        failed_batches = failed_batches + 1 if result['summarized'] == 0 else 0
+        if failed_batches > Config.DOC_SUMMARY_MAX_ATTEMPTS:
+            print("Stopping: the same documents keep failing")
+            break
+
+print(f"\n{'='*70}")
+print(f"SUMMARY")
+print(f"{'='*70}")
+print(f"Summarized: {total['summarized']}")
+print(f"Failed: {total['failed']}")
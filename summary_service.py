@@ -0,0 +1,106 @@
+"""
+Per-document summary service
+Writes a compact summary of each document once (map step), so session and
+regulation reports only reduce over stored summaries
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+from config import Config
+from gemini_client import GeminiClient
+from supabase_client import SupabaseClient
+from pdf_processor import PDFProcessor
+
+class SummaryService:
+    """Generate and store per-document summaries (init_document_summaries.sql)"""
+
+    @staticmethod
+    def summarize_document(document_id: str, pdf_bytes: bytes, symbol: str, title: str) -> str:
+        """Extract the PDF text, summarize it and store the summary. Returns the summary."""
+        text = PDFProcessor.extract_all_text(pdf_bytes).strip()
+        if not text:
+            raise ValueError("PDF contains no text")
+
+        summary = GeminiClient.summarize_document(text, symbol, title)
+        SupabaseClient.save_document_summary(
+            document_id, summary, Config.GEMINI_FLASH_MODEL,
+            GeminiClient.DOC_SUMMARY_PROMPT_VERSION, min(len(text), Config.DOC_SUMMARY_MAX_CHARS)
+        )
+        return summary
+
+    @staticmethod
+    def summarize_documents(items: List[Dict], max_workers: Optional[int] = None,
+                            progress_callback: Optional[Callable[[int, int, Dict, Optional[str]], None]] = None) -> Dict[str, int]:
+        """
+        Summarize several documents concurrently (at most DOC_SUMMARY_CONCURRENCY
+        Gemini calls in flight).
+
+        Args:
+            items: Dicts with 'id', 'symbol', 'title' and either 'pdf_bytes' or 'file_url'
+                   (downloaded from the archive bucket)
+            progress_callback: Optional callback(done, total, item, error)
+
+        Returns:
+            {'summarized': n, 'failed': n}
+        """
+        max_workers = max_workers or Config.DOC_SUMMARY_CONCURRENCY
+
+        def run(item: Dict):
+            try:
+                pdf_bytes = item.get('pdf_bytes')
+                if pdf_bytes is None:
+                    pdf_bytes = SupabaseClient.download_file(SupabaseClient._storage_path(item['file_url']))
+                SummaryService.summarize_document(item['id'], pdf_bytes, item.get('symbol') or '', item.get('title') or '')
+            except Exception as e:
+                # Counted so the backfill gives up after DOC_SUMMARY_MAX_ATTEMPTS
+                try:
+                    SupabaseClient.save_document_summary_failure(
+                        item['id'], str(e), Config.GEMINI_FLASH_MODEL, GeminiClient.DOC_SUMMARY_PROMPT_VERSION
+                    )
+                except Exception as record_error:
+                    print(f"Could not record summary failure for {item.get('symbol')}: {record_error}")
+                raise
+
+        result = {'summarized': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            run = SupabaseClient.bind_session(run)
+            futures = {executor.submit(run, item): item for item in items}
+            for done, future in enumerate(as_completed(futures), start=1):
+                error = None
+                try:
+                    future.result()
+                    result['summarized'] += 1
+                except Exception as e:
+                    error = str(e)
+                    result['failed'] += 1
+                if progress_callback:
+                    progress_callback(done, len(items), futures[future], error)
+        return result
+
+    @staticmethod
+    def summarize_in_background(items: List[Dict]) -> threading.Thread:
+        """
+        Summarize freshly ingested documents without blocking the page.
+        Failures are left for the backfill (summarize_documents.py retries
+        them up to DOC_SUMMARY_MAX_ATTEMPTS times).
+        """
+        thread = threading.Thread(
+            target=SupabaseClient.bind_session(SummaryService.summarize_documents), args=(items,),
+            name="document-summaries", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def summarize_pending(limit: int = 50, progress_callback=None) -> Dict[str, int]:
+        """
+        Backfill one batch (oldest first) of documents without a summary, with a
+        summary from an older DOC_SUMMARY_PROMPT_VERSION, or with fewer than
+        DOC_SUMMARY_MAX_ATTEMPTS failed attempts
+        """
+        pending = SupabaseClient.get_documents_without_summary(
+            limit, GeminiClient.DOC_SUMMARY_PROMPT_VERSION, Config.DOC_SUMMARY_MAX_ATTEMPTS
+        )
+        if not pending:
+            return {'summarized': 0, 'failed': 0}
+        return SummaryService.summarize_documents(pending, progress_callback=progress_callback)
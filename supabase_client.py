@@ -2,36 +2,406 @@
 Supabase client wrapper for UNECE WP.29 Archive
 Provides database and storage operations
 """
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from config import Config
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from datetime import datetime, timezone
+from collections import OrderedDict
+from contextlib import contextmanager
+import contextvars
+import copy
+import functools
+import sys
+import threading
+import time
+import httpx
 
 class SupabaseClient:
-    """Singleton Supabase client"""
+    """Supabase client access: shared anon client, per-session clients and admin client"""
     
     _instance: Optional[Client] = None
+    _admin_instance: Optional[Client] = None
     
+    # Per-session clients (own auth state after sign-in): session key -> (client, last_used)
+    _session_clients: "OrderedDict[str, Tuple[Client, float]]" = OrderedDict()
+    _session_lock = threading.Lock()
+    # Explicit session key for the current context ("" = force the shared client)
+    _session_key: contextvars.ContextVar = contextvars.ContextVar("supabase_session_key", default=None)
+    ADMIN_SESSION = "__service_role__"  # session key of admin_scope(): the service-role client
+    
+    # Shared HTTP connection pool (both clients) and its reuse counters
+    _http_client: Optional[httpx.Client] = None
+    _http_lock = threading.Lock()
+    _http_stats: Dict[str, int] = {
+        "requests": 0, "new_connections": 0, "tls_handshakes": 0, "http2_responses": 0
+    }
+    
+    # Process-wide reference-data cache: key -> (loaded_at, data)
+    _cache: Dict[str, tuple] = {}
+    _cache_lock = threading.Lock()
+    _cache_db_version: Optional[int] = None
+    _cache_version_checked_at: float = 0.0
+
+    # Bulk deletion: ids per delete_documents RPC call, paths per storage remove call
+    DELETE_BATCH_SIZE = 500
+    STORAGE_REMOVE_BATCH = 100
+    _cleanup_lock = threading.Lock()
+
     @classmethod
     def get_client(cls) -> Client:
-        """Get or create Supabase client instance"""
+        """
+        Get the Supabase client for the current caller: the Streamlit
+        session's own client once its user signed in (get_session_client),
+        otherwise the shared anon client.
+        """
+        key = cls._current_session_key()
+        if key == cls.ADMIN_SESSION:
+            return cls.get_admin_client()
+        if key is not None:
+            now = time.monotonic()
+            with cls._session_lock:
+                entry = cls._session_clients.get(key)
+                if entry and now - entry[1] < Config.CLIENT_POOL_IDLE_TTL:
+                    cls._session_clients[key] = (entry[0], now)
+                    cls._session_clients.move_to_end(key)
+                    return entry[0]
+        return cls._get_shared_client()
+    
+    @classmethod
+    def _get_shared_client(cls) -> Client:
+        """Get or create the shared anon client (no user signed in on it)"""
         if cls._instance is None:
+            Config.validate()
             cls._instance = create_client(
                 Config.SUPABASE_URL,
-                Config.SUPABASE_KEY
+                Config.SUPABASE_KEY,
+                options=ClientOptions(httpx_client=cls.get_http_client())
             )
         return cls._instance
     
+    # =========================================================================
+    # PER-SESSION CLIENTS
+    # =========================================================================
+    
+    @classmethod
+    def _current_session_key(cls) -> Optional[str]:
+        """Key of the caller's session: explicit session_scope, else the Streamlit session id"""
+        key = cls._session_key.get()
+        if key is not None:
+            return key or None
+        if "streamlit" not in sys.modules:
+            return None
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx(suppress_warning=True)
+        except Exception:
+            return None
+        return ctx.session_id if ctx else None
+    
+    @classmethod
+    @contextmanager
+    def session_scope(cls, session_key: Optional[str]):
+        """
+        Run a block as the given session (worker threads, scripts, tests).
+        session_scope(None) forces the shared anon client.
+        """
+        token = cls._session_key.set(session_key or "")
+        try:
+            yield
+        finally:
+            cls._session_key.reset(token)
+    
+    @classmethod
+    def has_user_session(cls) -> bool:
+        """
+        Whether get_client() runs as a signed-in user (or the service role)
+        rather than the shared anon client, e.g. before writes that RLS only
+        allows to authenticated users. Sessions restored from the login cookie
+        have no Supabase session and use the anon client.
+        """
+        key = cls._current_session_key()
+        if key == cls.ADMIN_SESSION:
+            return True
+        if key is None:
+            return False
+        with cls._session_lock:
+            entry = cls._session_clients.get(key)
+        return entry is not None and time.monotonic() - entry[1] < Config.CLIENT_POOL_IDLE_TTL
+    
+    @classmethod
+    def bind_session(cls, fn: Callable) -> Callable:
+        """
+        Wrap fn so it runs as the calling thread's session when submitted to a
+        worker thread (ThreadPoolExecutor, threading.Thread). The Streamlit
+        session is looked up through thread-local script state, which worker
+        threads do not have: unbound, they would get the shared anon client.
+        """
+        key = cls._current_session_key()
+        
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with cls.session_scope(key):
+                return fn(*args, **kwargs)
+        return run
+    
+    @classmethod
+    def admin_scope(cls):
+        """
+        Run a block (CLI batch jobs) with the service-role client; worker threads
+        started with bind_session inherit it.
+        """
+        if not Config.SUPABASE_SERVICE_KEY:
+            raise RuntimeError("SUPABASE_SERVICE_KEY is required for batch jobs (set it in .env)")
+        return cls.session_scope(cls.ADMIN_SESSION)
+    
+    @classmethod
+    def get_session_client(cls, session_key: Optional[str] = None) -> Client:
+        """
+        Get or create the current session's own client, used to sign a user in
+        without touching other sessions. Clients share the HTTP pool; the pool of
+        clients is bounded (CLIENT_POOL_SIZE, least recently used evicted first)
+        and clients idle for CLIENT_POOL_IDLE_TTL seconds are dropped.
+        """
+        key = session_key or cls._current_session_key()
+        if key is None or key == cls.ADMIN_SESSION:
+            raise RuntimeError("No Streamlit session: use session_scope() or pass session_key")
+        
+        now = time.monotonic()
+        with cls._session_lock:
+            entry = cls._session_clients.get(key)
+            if entry and now - entry[1] < Config.CLIENT_POOL_IDLE_TTL:
+                cls._session_clients[key] = (entry[0], now)
+                cls._session_clients.move_to_end(key)
+                return entry[0]
+        
+        Config.validate()
+        client = create_client(
+            Config.SUPABASE_URL,
+            Config.SUPABASE_KEY,
+            options=ClientOptions(httpx_client=cls.get_http_client())
+        )
+        
+        with cls._session_lock:
+            entry = cls._session_clients.get(key)
+            if entry and now - entry[1] < Config.CLIENT_POOL_IDLE_TTL:
+                # Created concurrently by another thread of the same session
+                evicted = [client]
+                client = entry[0]
+            else:
+                cls._session_clients[key] = (client, now)
+                cls._session_clients.move_to_end(key)
+                evicted = cls._evict_session_clients_locked(now)
+        
+        for old in evicted:
+            cls._close_session_client(old)
+        return client
+    
+    @classmethod
+    def _evict_session_clients_locked(cls, now: float) -> List[Client]:
+        """Drop idle clients, then least recently used ones over the pool size (lock held)"""
+        evicted = []
+        for key, (client, last_used) in list(cls._session_clients.items()):
+            if now - last_used >= Config.CLIENT_POOL_IDLE_TTL:
+                evicted.append(client)
+                del cls._session_clients[key]
+        while len(cls._session_clients) > Config.CLIENT_POOL_SIZE:
+            _, (client, _) = cls._session_clients.popitem(last=False)
+            evicted.append(client)
+        return evicted
+    
+    @staticmethod
+    def _close_session_client(client: Client):
+        """Forget an evicted client's session locally (stops its token refresh timer, no API call)"""
+        try:
+            client.auth._remove_session()
+        except Exception:
+            pass
+    
+    @classmethod
+    def release_session_client(cls, session_key: Optional[str] = None, sign_out: bool = True):
+        """Remove the current session's client (logout), signing its user out"""
+        key = session_key or cls._current_session_key()
+        if key is None:
+            return
+        with cls._session_lock:
+            entry = cls._session_clients.pop(key, None)
+        if not entry:
+            return
+        if sign_out:
+            try:
+                entry[0].auth.sign_out()
+            except Exception as e:
+                print(f"Error signing out: {e}")
+        cls._close_session_client(entry[0])
+    
+    @classmethod
+    def evict_idle_session_clients(cls) -> int:
+        """Drop idle session clients now; returns how many were evicted"""
+        with cls._session_lock:
+            evicted = cls._evict_session_clients_locked(time.monotonic())
+        for client in evicted:
+            cls._close_session_client(client)
+        return len(evicted)
+    
+    @classmethod
+    def get_admin_client(cls) -> Client:
+        """Get Supabase client with Service Role (Admin privileges), created once"""
+        if cls._admin_instance is None:
+            if not Config.SUPABASE_SERVICE_KEY:
+                raise ValueError("SUPABASE_SERVICE_KEY not found in .env")
+            cls._admin_instance = create_client(
+                Config.SUPABASE_URL,
+                Config.SUPABASE_SERVICE_KEY,
+                options=ClientOptions(httpx_client=cls.get_http_client())
+            )
+        return cls._admin_instance
+    
+    # =========================================================================
+    # HTTP CONNECTION POOL
+    # =========================================================================
+    
+    @classmethod
+    def get_http_client(cls) -> httpx.Client:
+        """
+        Shared httpx client used by the anon and service-role clients
+        (PostgREST, Storage, Auth). Keeps connections alive between
+        reruns so requests skip TCP/TLS setup; HTTP/2 multiplexes
+        concurrent requests over one connection when h2 is installed.
+        Auth headers are set per request, so sharing the pool is safe.
+        """
+        with cls._http_lock:
+            if cls._http_client is None:
+                limits = httpx.Limits(
+                    max_connections=Config.HTTP_POOL_SIZE,
+                    max_keepalive_connections=Config.HTTP_POOL_SIZE,
+                    keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+                )
+                options = dict(
+                    limits=limits,
+                    timeout=httpx.Timeout(Config.HTTP_TIMEOUT, connect=10.0),
+                    follow_redirects=True,
+                    event_hooks={"request": [cls._trace_request], "response": [cls._count_response]}
+                )
+                try:
+                    cls._http_client = httpx.Client(http2=Config.HTTP2, **options)
+                except ImportError:
+                    # h2 not installed: HTTP/1.1 keep-alive only
+                    cls._http_client = httpx.Client(**options)
+            return cls._http_client
+    
+    @classmethod
+    def _trace_request(cls, request: httpx.Request):
+        """Count requests and the connections/TLS handshakes they had to open (httpcore trace events)"""
+        def trace(event_name: str, info: Dict):
+            if event_name == "connection.connect_tcp.complete":
+                cls._bump_http_stat("new_connections")
+            elif event_name == "connection.start_tls.complete":
+                cls._bump_http_stat("tls_handshakes")
+        request.extensions["trace"] = trace
+        cls._bump_http_stat("requests")
+    
+    @classmethod
+    def _count_response(cls, response: httpx.Response):
+        if response.extensions.get("http_version") == b"HTTP/2":
+            cls._bump_http_stat("http2_responses")
+    
+    @classmethod
+    def _bump_http_stat(cls, name: str):
+        with cls._http_lock:
+            cls._http_stats[name] += 1
+    
+    @classmethod
+    def get_connection_stats(cls) -> Dict[str, Any]:
+        """
+        Connection reuse statistics of the shared pool since start-up:
+        requests, new_connections, tls_handshakes, http2_responses and
+        reuse_ratio (share of requests served on an already open connection),
+        plus session_clients (signed-in sessions in the client pool).
+        """
+        with cls._http_lock:
+            stats: Dict[str, Any] = dict(cls._http_stats)
+        requests = stats["requests"]
+        stats["reuse_ratio"] = round(1 - stats["new_connections"] / requests, 3) if requests else None
+        with cls._session_lock:
+            stats["session_clients"] = len(cls._session_clients)
+        return stats
+    
+    # =========================================================================
+    # REFERENCE-DATA CACHE
+    # =========================================================================
+    
+    @classmethod
+    def _cached(cls, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Return cached data for key, loading it on miss or expiry
+        (ttl seconds, default REFERENCE_CACHE_TTL).
+        Shared by all Streamlit sessions of this process; callers get a copy
+        so they can mutate results (sort, add fields) safely.
+        """
+        cls._check_cache_version()
+        now = time.monotonic()
+        with cls._cache_lock:
+            entry = cls._cache.get(key)
+        if entry and now - entry[0] < (ttl if ttl is not None else Config.REFERENCE_CACHE_TTL):
+            return copy.deepcopy(entry[1])
+        
+        # Loaded on the shared anon client: the result is shared by every session,
+        # so it must not depend on the signed-in user's RLS view
+        with cls.session_scope(None):
+            data = loader()
+        with cls._cache_lock:
+            cls._cache[key] = (now, data)
+        return copy.deepcopy(data)
+    
+    @classmethod
+    def _check_cache_version(cls):
+        """
+        Drop the cache when another process changed reference data.
+        The version is bumped by DB triggers (init_reference_cache.sql) and
+        polled at most every REFERENCE_CACHE_VERSION_POLL seconds.
+        """
+        now = time.monotonic()
+        if now - cls._cache_version_checked_at < Config.REFERENCE_CACHE_VERSION_POLL:
+            return
+        cls._cache_version_checked_at = now
+        try:
+            response = cls.get_client().table("reference_cache_version") \
+                .select("version").eq("id", 1).execute()
+        except Exception:
+            # Table not yet created: rely on TTL and local invalidation only
+            return
+        version = response.data[0]['version'] if response.data else None
+        with cls._cache_lock:
+            if version != cls._cache_db_version:
+                cls._cache_db_version = version
+                cls._cache.clear()
+    
+    @classmethod
+    def invalidate_cache(cls, *prefixes: str):
+        """
+        Drop cached entries whose key starts with one of the prefixes
+        (all entries if none given). Called after writes to cached tables.
+        """
+        with cls._cache_lock:
+            if not prefixes:
+                cls._cache.clear()
+                return
+            for key in list(cls._cache):
+                if key.startswith(prefixes):
+                    del cls._cache[key]
+    
     # =========================================================================
     # GROUPS
     # =========================================================================
     
     @staticmethod
     def get_all_groups() -> List[Dict]:
-        """Get all groups"""
-        client = SupabaseClient.get_client()
-        response = client.table("groups").select("*").execute()
-        return response.data
+        """Get all groups (cached)"""
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("groups").select("*").execute()
+            return response.data
+        return SupabaseClient._cached("groups", load)
     
     @staticmethod
     def create_group(group_id: str, full_name: str, group_type: str, 
@@ -45,14 +415,13 @@ class SupabaseClient:
             "parent_group_id": parent_id
         }
         response = client.table("groups").insert(data).execute()
+        SupabaseClient.invalidate_cache("groups")
         return response.data[0] if response.data else {}
     
     @staticmethod
     def get_group(group_id: str) -> Optional[Dict]:
-        """Get a specific group"""
-        client = SupabaseClient.get_client()
-        response = client.table("groups").select("*").eq("id", group_id).execute()
-        return response.data[0] if response.data else None
+        """Get a specific group (from the cached group list)"""
+        return next((g for g in SupabaseClient.get_all_groups() if g['id'] == group_id), None)
     
     # =========================================================================
     # SESSIONS
@@ -60,22 +429,25 @@ class SupabaseClient:
     
     @staticmethod
     def get_sessions_by_group(group_id: str) -> List[Dict]:
-        """Get all sessions for a group"""
-        client = SupabaseClient.get_client()
-        response = client.table("sessions").select("*").eq("group_id", group_id).execute()
-        return response.data
+        """Get all sessions for a group (cached)"""
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("sessions").select("*").eq("group_id", group_id).execute()
+            return response.data
+        return SupabaseClient._cached(f"sessions:{group_id}", load)
 
     @staticmethod
     def get_sessions_with_doc_counts(group_id: str) -> List[Dict]:
         """Get all sessions for a group with document counts"""
         client = SupabaseClient.get_client()
         
-        # 1. Get sessions
+        # 1. Get sessions (doc_count is maintained by triggers, see init_session_counters.sql)
         sessions = SupabaseClient.get_sessions_by_group(group_id)
-        if not sessions:
-            return []
-            
-        # 2. Get document counts for these sessions
+        if not sessions or 'doc_count' in sessions[0]:
+            return sessions
+        
+        # 2. Fallback for when the counter columns are not yet created:
+        # count documents for these sessions client-side
         # We fetch only session_id for all docs in these sessions to count them
         session_ids = [s['id'] for s in sessions]
         
@@ -103,6 +475,21 @@ class SupabaseClient:
                 
         return sessions
     
+    @staticmethod
+    def get_all_sessions_with_counts() -> List[Dict]:
+        """
+        Get all sessions with their group and the trigger-maintained counters
+        (doc_count, embedded_doc_count) in a single query.
+        Each session has a nested 'groups' dict (id, full_name, type, parent_group_id).
+        """
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("sessions").select(
+                "*, groups(id, full_name, type, parent_group_id)"
+            ).execute()
+            return response.data
+        return SupabaseClient._cached("sessions:*", load)
+    
     @staticmethod
     def create_session(group_id: str, code: str, year: int, 
                        dates: Optional[str] = None) -> Dict:
@@ -115,6 +502,7 @@ class SupabaseClient:
             "dates": dates
         }
         response = client.table("sessions").insert(data).execute()
+        SupabaseClient.invalidate_cache("sessions:")
         return response.data[0] if response.data else {}
     
     @staticmethod
@@ -135,6 +523,7 @@ class SupabaseClient:
             "dates": dates
         }
         response = client.table("sessions").update(data).eq("id", session_id).execute()
+        SupabaseClient.invalidate_cache("sessions:")
         return response.data[0] if response.data else {}
     
     # =========================================================================
@@ -143,10 +532,28 @@ class SupabaseClient:
     
     @staticmethod
     def get_all_regulations() -> List[Dict]:
-        """Get all regulations"""
-        client = SupabaseClient.get_client()
-        response = client.table("regulations").select("*").execute()
-        return response.data
+        """Get all regulations (cached)"""
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("regulations").select("*").execute()
+            return response.data
+        return SupabaseClient._cached("regulations", load)
+    
+    @staticmethod
+    def get_regulations_with_versions() -> List[Dict]:
+        """
+        Get all regulations with their versions nested under 'regulation_versions'
+        (one request, cached). Used by the Regulation Library explorer instead of
+        one get_regulation_versions call per regulation.
+        """
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("regulations") \
+                .select("*, regulation_versions(*)") \
+                .order("id") \
+                .execute()
+            return response.data
+        return SupabaseClient._cached("regulations:versions", load)
     
     @staticmethod
     def create_regulation(reg_id: str, title: str, topic: Optional[str] = None) -> Dict:
@@ -158,6 +565,7 @@ class SupabaseClient:
             "topic": topic
         }
         response = client.table("regulations").insert(data).execute()
+        SupabaseClient.invalidate_cache("regulations")
         return response.data[0] if response.data else {}
     
     @staticmethod
@@ -174,6 +582,7 @@ class SupabaseClient:
             "file_url": file_url
         }
         response = client.table("regulation_versions").insert(data).execute()
+        SupabaseClient.invalidate_cache("regulations:versions")
         return response.data[0] if response.data else {}
     
     @staticmethod
@@ -193,7 +602,8 @@ class SupabaseClient:
     def create_document(session_id: str, symbol: str, title: str, author: str,
                        doc_type: str, regulation_ref_id: Optional[str] = None,
                        regulation_mentioned: Optional[str] = None,
-                       file_url: Optional[str] = None, submission_date: Optional[str] = None) -> Dict:
+                       file_url: Optional[str] = None, submission_date: Optional[str] = None,
+                       content_sha256: Optional[str] = None) -> Dict:
         """Create a new document"""
         client = SupabaseClient.get_client()
         data = {
@@ -207,9 +617,46 @@ class SupabaseClient:
             "file_url": file_url,
             "submission_date": submission_date
         }
-        response = client.table("documents").insert(data).execute()
+        if content_sha256:
+            data["content_sha256"] = content_sha256
+        try:
+            response = client.table("documents").insert(data).execute()
+        except Exception as e:
+            # Fallback for when init_content_hash.sql has not been run yet
+            if "content_sha256" not in str(e):
+                raise
+            data.pop("content_sha256")
+            response = client.table("documents").insert(data).execute()
+        # Counter updates do not bump the cache version: refresh this process's session counts
+        SupabaseClient.invalidate_cache("sessions:")
         return response.data[0] if response.data else {}
     
+    @staticmethod
+    def content_storage_path(content_sha256: str) -> str:
+        """Content-addressed archive path of a document PDF"""
+        return f"documents/sha256/{content_sha256[:2]}/{content_sha256}.pdf"
+    
+    @staticmethod
+    def find_documents_by_hash(hashes: List[str]) -> Dict[str, Dict]:
+        """
+        Existing documents with these content hashes (indexed lookup) -> {sha256: document}.
+        Returns {} before init_content_hash.sql has been run.
+        """
+        hashes = list(dict.fromkeys(h for h in hashes if h))
+        if not hashes:
+            return {}
+        client = SupabaseClient.get_client()
+        try:
+            response = client.table("documents") \
+                .select("id, symbol, title, file_url, content_sha256, sessions(group_id, code, year)") \
+                .in_("content_sha256", hashes).execute()
+        except Exception as e:
+            # Only a missing column means "not migrated yet"; network / permission errors surface
+            if "content_sha256" not in str(e):
+                raise
+            return {}
+        return {doc["content_sha256"]: doc for doc in response.data or []}
+    
     @staticmethod
     def get_documents_by_session(session_id: str) -> List[Dict]:
         """Get all documents for a session"""
@@ -287,34 +734,228 @@ class SupabaseClient:
         return response.count
 
     @staticmethod
-    def get_documents_without_embeddings() -> List[Dict]:
-        """Find documents that don't have embeddings generated yet"""
+    def search_documents_ranked(filters: Dict[str, Any], search_text: Optional[str] = None,
+                                limit: int = 50, cursor: Optional[Dict] = None,
+                                direction: str = "next", with_count: bool = True) -> Dict:
+        """
+        Search documents one page at a time using keyset (cursor) pagination.
+        Uses the indexed full-text/trigram RPC (init_document_search.sql,
+        init_document_keyset.sql), results are ranked by relevance when search_text
+        is given, newest first otherwise.
+
+        Args:
+            cursor: None for the first page, otherwise a cursor returned by a previous call
+            direction: 'next' (rows after cursor) or 'prev' (rows before cursor)
+            with_count: Also return the total number of matches
+
+        Returns:
+            Dict with 'documents' (same shape as search_documents), 'total_count'
+            (None if not requested), 'next_cursor', 'prev_cursor', 'has_next', 'has_prev'
+        """
         client = SupabaseClient.get_client()
-        
-        # 1. Try Optimized DB-Side RPC (Best Scalability)
+        cursor = cursor or {}
+
+        # 1. Try Indexed DB-Side RPC
         try:
-            response = client.rpc("get_documents_without_embeddings").execute()
-            # If function exists and returns data, use it
-            return response.data
-        except Exception:
-            # Fallback for when RPC is not yet created
-            pass
+            # One extra row tells whether there is a page beyond this one
+            response = client.rpc("search_documents_ranked", {
+                "p_search_text": search_text or None,
+                "p_session_id": filters.get("session_id"),
+                "p_doc_type": filters.get("doc_type"),
+                "p_regulation_ref_id": filters.get("regulation_ref_id"),
+                "p_year": filters.get("year"),
+                "p_group_id": filters.get("group_id"),
+                "p_limit": limit + 1,
+                "p_cursor_rank": cursor.get("rank"),
+                "p_cursor_created_at": cursor.get("created_at"),
+                "p_cursor_id": cursor.get("id"),
+                "p_direction": direction,
+                "p_with_count": with_count
+            }).execute()
+            rows = response.data or []
+            total = rows[0]["total_count"] if rows else (0 if with_count else None)
+            if with_count and not rows and cursor:
+                total = SupabaseClient.get_documents_count(filters, search_text)
+            for row in rows:
+                row["doc"]["_rank"] = row["rank"]
+            documents = [row["doc"] for row in rows]
+        except Exception as e:
+            # 2. Fallback only when the RPC is not created yet: ILIKE scan, keyset on
+            # (created_at, id). Other errors surface: a ranked cursor fed to that
+            # keyset would silently return the wrong page.
+            if not SupabaseClient._is_missing_function(e):
+                raise
+            documents = SupabaseClient._search_documents_after(
+                filters, search_text, limit + 1, cursor, direction
+            )
+            total = SupabaseClient.get_documents_count(filters, search_text) if with_count else None
+
+        more = len(documents) > limit
+        if direction == "prev":
+            # Rows are newest first, the extra row is the one furthest from the cursor
+            documents = documents[1:] if more else documents
+            has_prev, has_next = more, bool(cursor)
+        else:
+            documents = documents[:limit]
+            has_prev, has_next = bool(cursor), more
+
+        def make_cursor(doc: Dict) -> Dict:
+            return {"rank": doc.pop("_rank", 0), "created_at": doc["created_at"], "id": doc["id"]}
+
+        cursors = [make_cursor(doc) for doc in documents]
+        return {
+            "documents": documents,
+            "total_count": total,
+            "prev_cursor": cursors[0] if cursors else None,
+            "next_cursor": cursors[-1] if cursors else None,
+            "has_prev": has_prev,
+            "has_next": has_next
+        }
+
+    @staticmethod
+    def _is_missing_function(error: Exception) -> bool:
+        """Whether an RPC failed because the function does not exist (migration not run)"""
+        text = str(error).lower()
+        return "pgrst202" in text or "42883" in text or "could not find the function" in text
+
+    @staticmethod
+    def _search_documents_after(filters: Dict[str, Any], search_text: Optional[str],
+                                limit: int, cursor: Dict, direction: str) -> List[Dict]:
+        """ILIKE search with keyset pagination on (created_at, id), newest first"""
+        client = SupabaseClient.get_client()
+        query = client.table("documents").select("*, sessions!inner(group_id, code, year)")
+
+        if "session_id" in filters:
+            query = query.eq("session_id", filters["session_id"])
+        if "doc_type" in filters:
+            query = query.eq("doc_type", filters["doc_type"])
+        if "regulation_ref_id" in filters:
+            query = query.eq("regulation_ref_id", filters["regulation_ref_id"])
+        if "year" in filters:
+            query = query.eq("sessions.year", filters["year"])
+        if "group_id" in filters:
+            query = query.eq("sessions.group_id", filters["group_id"])
+
+        if search_text:
+            text_filter = f"symbol.ilike.%{search_text}%,title.ilike.%{search_text}%,author.ilike.%{search_text}%,regulation_mentioned.ilike.%{search_text}%"
+            query = query.or_(text_filter)
+
+        backwards = direction == "prev"
+        if cursor:
+            op = "gt" if backwards else "lt"
+            created_at, doc_id = cursor["created_at"], cursor["id"]
+            query = query.or_(f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{doc_id})')
+
+        query = query.order("created_at", desc=not backwards).order("id", desc=not backwards)
+        response = query.limit(limit).execute()
+        documents = response.data
+        return documents[::-1] if backwards else documents
+
+    @staticmethod
+    def get_documents_without_embeddings(limit: int = 50, after: Optional[Dict] = None) -> List[Dict]:
+        """
+        Find documents that don't have embeddings generated yet, newest first.
+        Reads the trigger-maintained embedding_status (init_embedding_status.sql)
+        through its partial index, one page at a time.
+
+        Args:
+            limit: Page size
+            after: Last document of the previous page (created_at, id) to continue from
+        """
+        client = SupabaseClient.get_client()
+        query = client.table("documents") \
+            .select("id, file_url, doc_type, symbol, title, created_at, sessions(group_id, year, code)") \
+            .eq("embedding_status", "pending")
+        
+        if after:
+            created_at, doc_id = after["created_at"], after["id"]
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{doc_id})')
+        
+        response = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        return response.data
 
-        # 2. Fallback: Client-side diff (Good for < 100k docs)
-        # Get all documents
-        docs_response = client.table("documents").select("id, file_url, doc_type, symbol, title, sessions(group_id, year, code)").execute()
-        all_docs = docs_response.data
+    @staticmethod
+    def count_documents_without_embeddings() -> int:
+        """Count documents still waiting for embeddings (partial index count)"""
+        client = SupabaseClient.get_client()
+        response = client.table("documents").select("id", count="exact", head=True) \
+            .eq("embedding_status", "pending").execute()
+        return response.count or 0
+    
+    @staticmethod
+    def delete_documents(doc_ids: List[str]) -> Dict[str, Any]:
+        """
+        Delete documents with their embeddings, PDFs and chunk objects.
         
-        if not all_docs:
-            return []
-            
-        # Get all embedding source IDs with high limit
-        emb_response = client.table("embeddings").select("source_id", count="exact").limit(100000).execute()
-        existing_embedding_ids = {e['source_id'] for e in emb_response.data}
+        DB rows and embeddings go in one transaction (delete_documents RPC,
+        init_bulk_delete.sql), which also queues the chunks_cache objects;
+        PDFs are removed with batched storage calls and the queue is drained
+        in a background thread (process_storage_cleanup).
+        
+        Returns:
+            Dict with 'deleted' (ids), 'files_removed', 'failed_files'
+            (error messages) and 'chunks_queued'
+        """
+        client = SupabaseClient.get_client()
+        doc_ids = list(dict.fromkeys(str(d) for d in doc_ids))
+        result = {"deleted": [], "files_removed": 0, "failed_files": [], "chunks_queued": 0}
+        if not doc_ids:
+            return result
+        
+        rows = []
+        queued = True
+        for i in range(0, len(doc_ids), SupabaseClient.DELETE_BATCH_SIZE):
+            batch = doc_ids[i:i + SupabaseClient.DELETE_BATCH_SIZE]
+            try:
+                response = client.rpc("delete_documents", {"p_ids": batch}).execute()
+                rows.extend(response.data or [])
+            except Exception as e:
+                # Fallback for when RPC is not yet created: same steps, not transactional
+                print(f"RPC delete_documents failed, using fallback: {e}")
+                rows.extend(SupabaseClient._delete_documents_fallback(batch))
+                queued = False
+        
+        result["deleted"] = [r['document_id'] for r in rows]
+        result["chunks_queued"] = sum(r.get('chunks_queued') or 0 for r in rows)
+        
+        # PDFs: one storage call per batch instead of one per document.
+        # A file still referenced by another document (legacy duplicates) is kept.
+        file_urls = list({r['file_url'] for r in rows if r.get('file_url')})
+        still_used = set()
+        for i in range(0, len(file_urls), SupabaseClient.STORAGE_REMOVE_BATCH):
+            response = client.table("documents").select("file_url") \
+                .in_("file_url", file_urls[i:i + SupabaseClient.STORAGE_REMOVE_BATCH]).execute()
+            still_used.update(d['file_url'] for d in response.data or [])
+        pdf_paths = [SupabaseClient._storage_path(url) for url in file_urls if url not in still_used]
+        removed, errors = SupabaseClient.remove_storage_objects(Config.STORAGE_BUCKET, pdf_paths)
+        result["files_removed"] = removed
+        result["failed_files"] = errors
+        
+        if queued and result["chunks_queued"]:
+            threading.Thread(target=SupabaseClient.bind_session(SupabaseClient.process_storage_cleanup),
+                             daemon=True).start()
+        
+        SupabaseClient.invalidate_cache("sessions:")
+        return result
+    
+    @staticmethod
+    def _delete_documents_fallback(doc_ids: List[str]) -> List[Dict]:
+        """delete_documents without the RPC: embeddings, documents, then chunk objects directly"""
+        client = SupabaseClient.get_client()
+        docs = client.table("documents").select("id, symbol, file_url").in_("id", doc_ids).execute().data
+        chunks = client.table("embeddings").select("source_id, content_path") \
+            .eq("source_type", "document").in_("source_id", doc_ids).execute().data
         
-        # Find missing
-        missing_docs = [d for d in all_docs if d['id'] not in existing_embedding_ids]
-        return missing_docs
+        client.table("embeddings").delete().eq("source_type", "document").in_("source_id", doc_ids).execute()
+        client.table("documents").delete().in_("id", doc_ids).execute()
+        
+        chunk_paths = [c['content_path'] for c in chunks if c.get('content_path')]
+        SupabaseClient.remove_storage_objects(Config.CHUNKS_CACHE_BUCKET, chunk_paths)
+        return [
+            {"document_id": d['id'], "symbol": d.get('symbol'), "file_url": d.get('file_url'),
+             "chunks_queued": 0}
+            for d in docs
+        ]
     
     # =========================================================================
     # EMBEDDINGS
@@ -368,12 +1009,21 @@ class SupabaseClient:
         ).execute()
         return response.data
     
+    @staticmethod
+    def refresh_corpus_stats() -> List[Dict]:
+        """
+        Recount corpus_stats exactly (full scans of the source tables, admins only).
+        The function is only granted to the service role (SUPABASE_SERVICE_KEY).
+        """
+        response = SupabaseClient.get_admin_client().rpc("refresh_corpus_stats").execute()
+        return response.data
+    
     # =========================================================================
     # STORAGE
     # =========================================================================
     
     @staticmethod
-    def upload_file(file_path: str, file_bytes: bytes) -> str:
+    def upload_file(file_path: str, file_bytes: bytes, content_type: str = "application/pdf") -> str:
         """Upload file to Supabase storage and return public URL"""
         client = SupabaseClient.get_client()
         
@@ -382,7 +1032,7 @@ class SupabaseClient:
             file_path,
             file_bytes,
             file_options={
-                "content-type": "application/pdf",
+                "content-type": content_type,
                 "cache-control": "public, max-age=3600",
                 "content-disposition": "inline",  # Tell browser to display inline
                 "upsert": "true"
@@ -430,6 +1080,74 @@ class SupabaseClient:
         except Exception:
             return False
     
+    @staticmethod
+    def _storage_path(file_url: str) -> str:
+        """Path within the archive bucket for a public/signed file URL"""
+        return file_url.split(f'/{Config.STORAGE_BUCKET}/')[-1].split('?')[0]
+    
+    @staticmethod
+    def remove_storage_objects(bucket: str, paths: List[str]) -> Tuple[int, List[str]]:
+        """
+        Remove objects from a bucket, STORAGE_REMOVE_BATCH paths per request.
+        Returns (paths in successful batches, error messages of failed batches).
+        Missing objects are not an error.
+        """
+        client = SupabaseClient.get_client()
+        paths = list(dict.fromkeys(p for p in paths if p))
+        removed, errors = 0, []
+        for i in range(0, len(paths), SupabaseClient.STORAGE_REMOVE_BATCH):
+            batch = paths[i:i + SupabaseClient.STORAGE_REMOVE_BATCH]
+            try:
+                client.storage.from_(bucket).remove(batch)
+                removed += len(batch)
+            except Exception as e:
+                errors.append(f"{len(batch)} files from {batch[0]}: {str(e)}")
+        return removed, errors
+    
+    @staticmethod
+    def process_storage_cleanup(limit: int = 5000) -> int:
+        """
+        Remove objects queued in storage_cleanup_queue (e.g. chunk JSONs of
+        deleted documents). Failed batches stay queued with attempts/last_error
+        and are retried on the next run, up to STORAGE_CLEANUP_MAX_ATTEMPTS.
+        The queue is only accessible to the service role (init_bulk_delete.sql).
+        Returns the number of removed objects.
+        """
+        if not Config.SUPABASE_SERVICE_KEY:
+            print("Storage cleanup queue not processed: SUPABASE_SERVICE_KEY is not set")
+            return 0
+        client = SupabaseClient.get_admin_client()
+        with SupabaseClient._cleanup_lock:
+            try:
+                queue = client.table("storage_cleanup_queue").select("id, bucket, path, attempts") \
+                    .lt("attempts", Config.STORAGE_CLEANUP_MAX_ATTEMPTS) \
+                    .order("id").limit(limit).execute().data
+            except Exception as e:
+                print(f"Error reading storage cleanup queue: {e}")
+                return 0
+            
+            by_bucket: Dict[str, List[Dict]] = {}
+            for item in queue:
+                by_bucket.setdefault(item['bucket'], []).append(item)
+            
+            removed = 0
+            for bucket, items in by_bucket.items():
+                for i in range(0, len(items), SupabaseClient.STORAGE_REMOVE_BATCH):
+                    batch = items[i:i + SupabaseClient.STORAGE_REMOVE_BATCH]
+                    ids = [item['id'] for item in batch]
+                    try:
+                        client.storage.from_(bucket).remove([item['path'] for item in batch])
+                        client.table("storage_cleanup_queue").delete().in_("id", ids).execute()
+                        removed += len(batch)
+                    except Exception as e:
+                        print(f"Error removing queued objects from {bucket}: {e}")
+                        for item in batch:
+                            client.table("storage_cleanup_queue").update({
+                                "attempts": item['attempts'] + 1,
+                                "last_error": str(e)[:500]
+                            }).eq("id", item['id']).execute()
+            return removed
+    
     @staticmethod
     def get_signed_url(file_url: str, expires_in: int = 86400) -> str:
         """
@@ -463,6 +1181,28 @@ class SupabaseClient:
             # Fallback to public URL if signed URL fails
             return file_url
     
+    @staticmethod
+    def get_signed_urls(file_urls: List[str], expires_in: int = 86400) -> Dict[str, str]:
+        """
+        Signed URLs for several files in one storage request -> {file_url: signed URL}.
+        Files that cannot be signed map to their public URL, like get_signed_url.
+        """
+        file_urls = list(dict.fromkeys(u for u in file_urls if u))
+        if not file_urls:
+            return {}
+        signed = {file_url: file_url for file_url in file_urls}
+        paths = {file_url.split(f'/{Config.STORAGE_BUCKET}/')[-1]: file_url for file_url in file_urls}
+        try:
+            client = SupabaseClient.get_client()
+            response = client.storage.from_(Config.STORAGE_BUCKET).create_signed_urls(list(paths), expires_in)
+            for item in response or []:
+                url = item.get('signedURL') or item.get('signedUrl')
+                if url and item.get('path') in paths:
+                    signed[paths[item['path']]] = url
+        except Exception:
+            pass
+        return signed
+
     @staticmethod
     def upload_json(file_path: str, json_data: Dict) -> str:
         """Upload JSON data to chunks_cache bucket
@@ -520,10 +1260,12 @@ class SupabaseClient:
 
     @staticmethod
     def get_all_issuers() -> List[Dict]:
-        """Get all interpretation issuers"""
-        client = SupabaseClient.get_client()
-        response = client.table("issuers").select("*").execute()
-        return response.data
+        """Get all interpretation issuers (cached)"""
+        def load():
+            client = SupabaseClient.get_client()
+            response = client.table("issuers").select("*").execute()
+            return response.data
+        return SupabaseClient._cached("issuers", load)
 
     @staticmethod
     def create_issuer(name: str, code: str, i_type: str) -> Dict:
@@ -531,6 +1273,7 @@ class SupabaseClient:
         client = SupabaseClient.get_client()
         data = {"name": name, "code": code, "type": i_type}
         response = client.table("issuers").insert(data).execute()
+        SupabaseClient.invalidate_cache("issuers")
         return response.data[0] if response.data else {}
 
     @staticmethod
@@ -636,21 +1379,374 @@ class SupabaseClient:
         response = query.order("issue_date", desc=True).execute()
         return response.data
 
+    # Interpretation columns for list views (everything except the content_text transcription)
+    INTERPRETATION_LIST_COLUMNS = (
+        "id, title, issuer_id, issue_date, status, regulation_mentioned, comments, "
+        "file_url, is_public, session_id, created_by, created_at, issuers(name, code)"
+    )
+
     @staticmethod
-    def get_user_role(user_id: str) -> str:
-        """Get user role from profiles"""
+    def search_interpretations(filters: Dict[str, Any], search_text: Optional[str] = None,
+                               limit: int = 20, offset: int = 0,
+                               include_private: bool = False) -> Tuple[List[Dict], int]:
+        """
+        Search interpretations server-side, one page at a time, without content_text.
+        Uses the full-text RPC (init_interpretation_search.sql).
+
+        Args:
+            filters: Optional 'issuer_ids' (list), 'statuses' (list), 'regulation' (substring)
+
+        Returns:
+            (interpretations, total_count)
+        """
+        client = SupabaseClient.get_client()
+
+        # 1. Try Indexed DB-Side RPC
+        try:
+            response = client.rpc("search_interpretations", {
+                "p_search_text": search_text or None,
+                "p_issuer_ids": filters.get("issuer_ids") or None,
+                "p_statuses": filters.get("statuses") or None,
+                "p_regulation": filters.get("regulation") or None,
+                "p_include_private": include_private,
+                "p_limit": limit,
+                "p_offset": offset
+            }).execute()
+            rows = response.data or []
+            total = rows[0]["total_count"] if rows else 0
+            return [row["item"] for row in rows], total
+        except Exception:
+            # Fallback for when RPC is not yet created
+            pass
+
+        # 2. Fallback: PostgREST filters + ILIKE (content_text not searched)
+        query = client.table("interpretations").select(
+            SupabaseClient.INTERPRETATION_LIST_COLUMNS, count="exact"
+        )
+        if not include_private:
+            query = query.eq("is_public", True)
+        if filters.get("issuer_ids"):
+            query = query.in_("issuer_id", filters["issuer_ids"])
+        if filters.get("statuses"):
+            query = query.in_("status", filters["statuses"])
+        if filters.get("regulation"):
+            query = query.ilike("regulation_mentioned", f"%{filters['regulation']}%")
+        if search_text:
+            query = query.or_(f"title.ilike.%{search_text}%,comments.ilike.%{search_text}%,regulation_mentioned.ilike.%{search_text}%")
+
+        response = query.order("issue_date", desc=True).range(offset, offset + limit - 1).execute()
+        return response.data, response.count or 0
+
+    @staticmethod
+    def get_interpretation_content(interp_id: str) -> str:
+        """Get the content_text (transcription) of one interpretation"""
+        client = SupabaseClient.get_client()
+        response = client.table("interpretations").select("content_text").eq("id", interp_id).execute()
+        return (response.data[0].get("content_text") or "") if response.data else ""
+
+    # =========================================================================
+    # DOCUMENT SUMMARIES
+    # =========================================================================
+
+    SUMMARY_LOOKUP_BATCH = 200  # ids per IN (...) filter, keeps the URL short
+
+    @staticmethod
+    def get_document_summaries(doc_ids: List[str]) -> Dict[str, Dict]:
+        """Stored per-document summaries (init_document_summaries.sql) -> {document_id: row}"""
+        client = SupabaseClient.get_client()
+        ids = list(dict.fromkeys(doc_ids))
+        summaries = {}
+        for start in range(0, len(ids), SupabaseClient.SUMMARY_LOOKUP_BATCH):
+            batch = ids[start:start + SupabaseClient.SUMMARY_LOOKUP_BATCH]
+            response = client.table("document_summaries") \
+                .select("document_id, summary, model, prompt_version, updated_at") \
+                .in_("document_id", batch).not_.is_("summary", "null").execute()
+            for row in response.data or []:
+                summaries[row["document_id"]] = row
+        return summaries
+
+    @staticmethod
+    def save_document_summary(document_id: str, summary: str, model: str,
+                              prompt_version: str, source_chars: int) -> Dict:
+        """Insert or replace the summary of a document"""
+        client = SupabaseClient.get_client()
+        response = client.table("document_summaries").upsert({
+            "document_id": document_id,
+            "summary": summary,
+            "model": model,
+            "prompt_version": prompt_version,
+            "source_chars": source_chars,
+            "attempts": 0,
+            "attempt_version": None,
+            "error": None,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, on_conflict="document_id").execute()
+        return response.data[0] if response.data else {}
+
+    @staticmethod
+    def save_document_summary_failure(document_id: str, error: str, model: str, prompt_version: str) -> Dict:
+        """
+        Record a failed summary attempt with prompt_version. A stored (stale)
+        summary is kept; attempts restart when the prompt version changes.
+        """
+        client = SupabaseClient.get_client()
+        previous = client.table("document_summaries").select("attempts, attempt_version") \
+            .eq("document_id", document_id).execute().data
+        data = {
+            "attempts": previous[0]["attempts"] + 1 if previous and previous[0]["attempt_version"] == prompt_version else 1,
+            "attempt_version": prompt_version,
+            "error": error[:1000],
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        if previous:
+            response = client.table("document_summaries").update(data).eq("document_id", document_id).execute()
+        else:
+            response = client.table("document_summaries").insert({
+                "document_id": document_id, "model": model, "prompt_version": prompt_version, **data
+            }).execute()
+        return response.data[0] if response.data else {}
+
+    @staticmethod
+    def get_documents_without_summary(limit: int = 50, prompt_version: str = "1",
+                                      max_attempts: int = 3) -> List[Dict]:
+        """
+        Documents with a PDF to summarize, oldest first: no summary yet or a
+        summary from an older prompt_version, unless max_attempts attempts with
+        prompt_version already failed
+        """
+        client = SupabaseClient.get_client()
+        response = client.rpc("get_documents_without_summary", {
+            "p_limit": limit,
+            "p_prompt_version": prompt_version,
+            "p_max_attempts": max_attempts
+        }).execute()
+        return response.data
+
+    # =========================================================================
+    # SESSION REPORTS
+    # =========================================================================
+
+    @staticmethod
+    def get_session_reports(session_id: str) -> List[Dict]:
+        """Cached report sections of a session (init_session_reports.sql)"""
+        client = SupabaseClient.get_client()
+        response = client.table("session_reports").select("*").eq("session_id", session_id).execute()
+        return response.data
+
+    @staticmethod
+    def save_session_report(session_id: str, regulation: str, input_hash: str, model: str,
+                            prompt_version: str, content: str, document_count: int,
+                            generation_seconds: float) -> Dict:
+        """
+        Store a generated report section and drop the older versions of the same
+        (session, regulation), which can no longer match the current documents.
+        """
+        client = SupabaseClient.get_client()
+        response = client.table("session_reports").upsert({
+            "session_id": session_id,
+            "regulation": regulation,
+            "input_hash": input_hash,
+            "model": model,
+            "prompt_version": prompt_version,
+            "content": content,
+            "document_count": document_count,
+            "generation_seconds": generation_seconds
+        }, on_conflict="session_id,regulation,input_hash,model,prompt_version").execute()
+        row = response.data[0] if response.data else {}
+        if row.get("id"):
+            client.table("session_reports").delete() \
+                .eq("session_id", session_id).eq("regulation", regulation) \
+                .neq("id", row["id"]).execute()
+        return row
+
+    @staticmethod
+    def get_report_exports(session_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Exported session reports (init_report_exports.sql), optionally for some sessions"""
+        client = SupabaseClient.get_client()
+        if session_ids is None:
+            return client.table("report_exports").select("*").execute().data
+        ids = list(dict.fromkeys(session_ids))
+        rows = []
+        for start in range(0, len(ids), SupabaseClient.SUMMARY_LOOKUP_BATCH):
+            batch = ids[start:start + SupabaseClient.SUMMARY_LOOKUP_BATCH]
+            rows.extend(client.table("report_exports").select("*").in_("session_id", batch).execute().data or [])
+        return rows
+
+    @staticmethod
+    def save_report_export(session_id: str, fields: Dict[str, Any]) -> Dict:
+        """Create or update the export record of a session"""
+        client = SupabaseClient.get_client()
+        data = {"session_id": session_id, "updated_at": datetime.now(timezone.utc).isoformat(), **fields}
+        response = client.table("report_exports").upsert(data, on_conflict="session_id").execute()
+        return response.data[0] if response.data else {}
+
+    # =========================================================================
+    # ADOPTED PROPOSALS
+    # =========================================================================
+
+    @staticmethod
+    def _adopted_proposals_filter_params(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Map dashboard filters to the RPC parameters (empty lists -> no filter)"""
+        return {
+            "p_regulation_ids": filters.get("regulation_ids") or None,
+            "p_session_ids": filters.get("session_ids") or None,
+            "p_statuses": filters.get("statuses") or None,
+            "p_series": filters.get("series") or None,
+            "p_search": filters.get("search") or None
+        }
+
+    @staticmethod
+    def query_adopted_proposals(filters: Dict[str, Any], sort: str = "created_at",
+                                descending: bool = True, limit: int = 100,
+                                offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Filter, sort and paginate adopted proposals in SQL (init_adopted_proposals_query.sql).
+
+        Args:
+            filters: Optional 'regulation_ids', 'session_ids', 'statuses', 'series' (lists)
+                     and 'search' (description substring)
+            sort: 'created_at', 'regulation' (numeric), 'series', 'entry_date', 'status' or 'session'
+
+        Returns:
+            (proposals with nested 'sessions' {code, year}, total_count)
+        """
+        client = SupabaseClient.get_client()
+        params = SupabaseClient._adopted_proposals_filter_params(filters)
+        params.update({
+            "p_sort": sort,
+            "p_descending": descending,
+            "p_limit": limit,
+            "p_offset": offset
+        })
+        response = client.rpc("query_adopted_proposals", params).execute()
+        rows = response.data or []
+        total = rows[0]["total_count"] if rows else 0
+        return [row["item"] for row in rows], total
+
+    @staticmethod
+    def get_adopted_proposals_facets(filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict]]:
+        """
+        Grouping counts of adopted proposals per dimension, ordered for display.
+
+        Returns:
+            Dict {'regulation'|'session'|'status'|'series': [{value, label, sort_key, count}, ...]}
+        """
+        client = SupabaseClient.get_client()
+        params = SupabaseClient._adopted_proposals_filter_params(filters or {})
+        response = client.rpc("adopted_proposals_facets", params).execute()
+        facets = {"regulation": [], "session": [], "status": [], "series": []}
+        for row in response.data or []:
+            facets.setdefault(row["dimension"], []).append({
+                "value": row["value"],
+                "label": row["label"],
+                "sort_key": row["sort_key"],
+                "count": row["count"]
+            })
+        return facets
+
+    @staticmethod
+    def save_adopted_proposals(records: List[Dict]) -> Dict[str, int]:
+        """
+        Insert reviewed proposals, auto-creating regulations that are not in the
+        library yet (foreign key). Uses the service role for the writes.
+
+        Returns:
+            {'inserted': n, 'regulations_created': n}
+        """
+        client = SupabaseClient.get_admin_client()
+        
+        unique_regs = list(set([r['regulation_id'] for r in records if r.get('regulation_id')]))
+        missing_regs = []
+        if unique_regs:
+            existing = client.table("regulations").select("id").in_("id", unique_regs).execute()
+            existing_ids = {item['id'] for item in existing.data}
+            missing_regs = [rid for rid in unique_regs if rid not in existing_ids]
+            
+            if missing_regs:
+                new_reg_data = [{"id": rid, "title": f"Regulation {rid}", "topic": "Unknown - Auto-created"} for rid in missing_regs]
+                client.table("regulations").insert(new_reg_data).execute()
+                SupabaseClient.invalidate_cache("regulations")
+        
+        if records:
+            client.table("adopted_proposals").insert(records).execute()
+        return {"inserted": len(records), "regulations_created": len(missing_regs)}
+
+    @staticmethod
+    def get_unscanned_proposal_documents(limit: int = 1000, max_attempts: int = 3,
+                                         running_timeout: int = 30) -> List[Dict]:
+        """
+        WP.29 reports not scanned for adopted proposals yet (init_proposal_scans.sql);
+        'running' scans only once started more than running_timeout minutes ago
+        """
+        client = SupabaseClient.get_client()
+        response = client.rpc("get_unscanned_proposal_documents", {
+            "p_limit": limit,
+            "p_max_attempts": max_attempts,
+            "p_running_timeout": running_timeout
+        }).execute()
+        return response.data
+
+    @staticmethod
+    def get_proposal_scans(statuses: Optional[List[str]] = None,
+                           document_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Batch scan records with their document and session, newest first"""
+        client = SupabaseClient.get_client()
+        query = client.table("proposal_scans").select(
+            "*, documents(symbol, title), sessions(code, year)"
+        )
+        if statuses:
+            query = query.in_("status", statuses)
+        if document_ids:
+            query = query.in_("document_id", document_ids)
+        return query.order("updated_at", desc=True).execute().data
+
+    @staticmethod
+    def save_proposal_scan(document_id: str, fields: Dict[str, Any]) -> Dict:
+        """Create or update the scan record of a document"""
         client = SupabaseClient.get_client()
+        data = {"document_id": document_id, "updated_at": datetime.now(timezone.utc).isoformat(), **fields}
+        response = client.table("proposal_scans").upsert(data, on_conflict="document_id").execute()
+        return response.data[0] if response.data else {}
+
+    @staticmethod
+    def get_user_role(user_id: str) -> str:
+        """Get user role from profiles (cached, see get_user_profile)"""
         try:
-            # print(f"DEBUG: Fetching role for {user_id}")
-            response = client.table("profiles").select("role").eq("id", user_id).execute()
-            # print(f"DEBUG: Role response: {response.data}")
-            if response.data:
-                return response.data[0]['role']
+            profile = SupabaseClient.get_user_profile(user_id)
+            if profile and profile.get('role'):
+                return profile['role']
         except Exception as e:
             print(f"DEBUG: Error fetching role: {e}")
             pass
         return 'basic'  # Default fallback
 
+    @staticmethod
+    def get_user_profile(user_id: str) -> Optional[Dict]:
+        """
+        Get {'role', 'email'} of a user, None if there is no profile.
+        Cached per user for PROFILE_CACHE_TTL seconds: auth_utils resolves the
+        user on every fresh session and page load. Invalidated by
+        update_user_role / delete_user (and by profile writes in other
+        processes through the reference cache version).
+        Without SUPABASE_SERVICE_KEY the profile is read uncached on the
+        caller's own client (profiles are only readable by their owner).
+        """
+        def load(client):
+            response = client.table("profiles").select("role, email").eq("id", user_id).execute()
+            return response.data[0] if response.data else None
+
+        if not Config.SUPABASE_SERVICE_KEY:
+            # The cache loads on the anon client, which RLS shows no profile at all
+            return load(SupabaseClient.get_client())
+
+        key = f"profile:{user_id}"
+        profile = SupabaseClient._cached(key, lambda: load(SupabaseClient.get_admin_client()),
+                                         ttl=Config.PROFILE_CACHE_TTL)
+        if profile is None:
+            # Do not remember a missing profile (e.g. created right after sign-up)
+            SupabaseClient.invalidate_cache(key)
+        return profile
+
     @staticmethod
     def get_all_profiles() -> List[Dict]:
         """Get all user profiles (Admin only)"""
@@ -665,22 +1761,12 @@ class SupabaseClient:
         client = SupabaseClient.get_client()
         try:
             response = client.table("profiles").update({"role": new_role}).eq("id", user_id).execute()
+            SupabaseClient.invalidate_cache(f"profile:{user_id}")
             return True if response.data else False
         except Exception as e:
             print(f"Error updating role: {e}")
             return False
 
-    @staticmethod
-    def get_admin_client() -> Client:
-        """Get Supabase client with Service Role (Admin privileges)"""
-        if not Config.SUPABASE_SERVICE_KEY:
-            raise ValueError("SUPABASE_SERVICE_KEY not found in .env")
-            
-        return create_client(
-            Config.SUPABASE_URL,
-            Config.SUPABASE_SERVICE_KEY
-        )
-
     @staticmethod
     def create_user(email: str, password: str, full_name: str) -> bool:
         """Create a new user using Admin API"""
@@ -700,4 +1786,5 @@ class SupabaseClient:
         # Exceptions will be caught by the UI
         admin_client = SupabaseClient.get_admin_client()
         response = admin_client.auth.admin.delete_user(user_id)
+        SupabaseClient.invalidate_cache(f"profile:{user_id}")
         return True
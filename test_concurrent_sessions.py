@@ -0,0 +1,205 @@
+"""
+Test per-session Supabase clients under concurrent users
+
+Runs against a local stub of the Supabase Auth/REST API (no project needed):
+each simulated user signs in on its own session and repeatedly asks the stub
+"who am I?" (the stub answers from the bearer token it receives).
+
+1. Shared client (old behaviour): users sign in on one global client -> identities leak
+2. Shared client + lock: correct but every user waits for the others
+3. Session client pool: correct and concurrent, also in bound worker threads
+4. Pool bounds: size limit and idle eviction
+
+Usage: python test_concurrent_sessions.py [users] [requests_per_user]
+"""
+import base64
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import Config
+
+USERS = 16     # simulated users (first command-line argument)
+REQUESTS = 20  # requests per user (second argument)
+LATENCY = 0.01  # simulated server time per request (seconds)
+
+
+def b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def make_jwt(claims: dict) -> str:
+    return f"{b64({'alg': 'HS256', 'typ': 'JWT'})}.{b64(claims)}.signature"
+
+
+def jwt_claims(token: str) -> dict:
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+class StubSupabase(BaseHTTPRequestHandler):
+    """Just enough of /auth/v1 and /rest/v1 for sign-in and an identity query"""
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.startswith("/auth/v1/token"):
+            email = body["email"]
+            now = int(time.time())
+            claims = {"sub": email, "email": email, "role": "authenticated", "aud": "authenticated",
+                      "exp": now + 3600, "iat": now}
+            self._reply(200, {
+                "access_token": make_jwt(claims), "token_type": "bearer",
+                "expires_in": 3600, "expires_at": now + 3600, "refresh_token": f"refresh-{email}",
+                "user": {"id": email, "aud": "authenticated", "role": "authenticated", "email": email,
+                         "app_metadata": {}, "user_metadata": {}, "created_at": "2026-01-01T00:00:00Z"}
+            })
+        elif self.path.startswith("/auth/v1/logout"):
+            self._reply(204)
+        else:
+            self._reply(404, {"message": "not found"})
+
+    def do_GET(self):
+        if self.path.startswith("/rest/v1/whoami"):
+            time.sleep(LATENCY)
+            claims = jwt_claims(self.headers.get("Authorization", "Bearer x.e30.x").split(" ", 1)[1])
+            self._reply(200, [{"email": claims.get("email", "anon")}])
+        else:
+            self._reply(404, {"message": "not found"})
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSupabase)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def whoami(client):
+    return client.table("whoami").select("*").execute().data[0]["email"]
+
+
+def whoami_current():
+    return whoami(SupabaseClient.get_client())
+
+
+def run_users(user_fn):
+    """Run user_fn(i) for every simulated user in parallel; returns (mismatches, requests/s)"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=USERS) as pool:
+        mismatches = sum(pool.map(user_fn, range(USERS)))
+    elapsed = time.perf_counter() - start
+    return mismatches, USERS * REQUESTS / elapsed
+
+
+def main():
+    global USERS, REQUESTS, SupabaseClient
+    USERS = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else REQUESTS
+
+    print("=" * 70)
+    print(f"CONCURRENT SESSIONS TEST ({USERS} users x {REQUESTS} requests, {LATENCY*1000:.0f} ms server latency)")
+    print("=" * 70)
+
+    Config.SUPABASE_URL = start_stub()
+    Config.SUPABASE_KEY = make_jwt({"role": "anon"})
+    Config.GOOGLE_API_KEY = Config.GOOGLE_API_KEY or "unused"
+    Config.SUPABASE_SERVICE_KEY = None
+
+    from supabase import create_client, ClientOptions
+    from supabase_client import SupabaseClient  # after the stub URL/key are set
+
+    failures = []
+
+    # 1. One global client, everyone signs in on it (old behaviour)
+    global_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY,
+                                  options=ClientOptions(httpx_client=SupabaseClient.get_http_client()))
+
+    def global_user(i):
+        email = f"user{i}@example.com"
+        global_client.auth.sign_in_with_password({"email": email, "password": "x"})
+        return sum(whoami(global_client) != email for _ in range(REQUESTS))
+
+    leaks, rps = run_users(global_user)
+    print(f"\n1. Shared client           : {leaks:4d} wrong identities   {rps:8.0f} req/s")
+
+    # 2. Same, serialized with a lock (correct, no concurrency)
+    global_lock = threading.Lock()
+
+    def locked_user(i):
+        email = f"user{i}@example.com"
+        with global_lock:
+            global_client.auth.sign_in_with_password({"email": email, "password": "x"})
+            return sum(whoami(global_client) != email for _ in range(REQUESTS))
+
+    locked_mismatches, locked_rps = run_users(locked_user)
+    print(f"2. Shared client + lock    : {locked_mismatches:4d} wrong identities   {locked_rps:8.0f} req/s")
+
+    # 3. Session client pool
+    def pooled_user(i):
+        email = f"user{i}@example.com"
+        with SupabaseClient.session_scope(f"session-{i}"):
+            SupabaseClient.get_session_client().auth.sign_in_with_password({"email": email, "password": "x"})
+            wrong = sum(whoami(SupabaseClient.get_client()) != email for _ in range(REQUESTS))
+            # Worker threads started by the session (search stages, background jobs) keep its identity
+            with ThreadPoolExecutor(max_workers=1) as workers:
+                worker_identity = workers.submit(SupabaseClient.bind_session(whoami_current)).result()
+                wrong += worker_identity != email
+            # Cached/shared work still runs as anon, never as this user
+            with SupabaseClient.session_scope(None):
+                wrong += whoami(SupabaseClient.get_client()) != "anon"
+            SupabaseClient.release_session_client()
+            return wrong
+
+    pool_mismatches, pool_rps = run_users(pooled_user)
+    print(f"3. Session client pool     : {pool_mismatches:4d} wrong identities   {pool_rps:8.0f} req/s")
+
+    if pool_mismatches:
+        failures.append("session pool returned another user's identity")
+    if pool_rps <= locked_rps:
+        failures.append("session pool is not faster than the serialized shared client")
+
+    # 4. Pool bounds
+    Config.CLIENT_POOL_SIZE = 4
+    for i in range(10):
+        SupabaseClient.get_session_client(f"bounded-{i}")
+    size_after_fill = SupabaseClient.get_connection_stats()["session_clients"]
+
+    Config.CLIENT_POOL_IDLE_TTL = 0.05
+    time.sleep(0.1)
+    evicted = SupabaseClient.evict_idle_session_clients()
+    size_after_idle = SupabaseClient.get_connection_stats()["session_clients"]
+    print(f"\n4. Pool bounds             : size {size_after_fill} after 10 sessions (limit 4), "
+          f"{evicted} evicted when idle, {size_after_idle} left")
+
+    if size_after_fill > 4:
+        failures.append("pool exceeded CLIENT_POOL_SIZE")
+    if size_after_idle != 0:
+        failures.append("idle clients were not evicted")
+
+    stats = SupabaseClient.get_connection_stats()
+    print(f"\nHTTP pool: {stats['requests']} requests on {stats['new_connections']} connections "
+          f"(reuse {stats['reuse_ratio']:.0%})")
+
+    print(f"\n{'='*70}")
+    if failures:
+        print("❌ FAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"✅ Session pool is isolated and {pool_rps / locked_rps:.1f}x the throughput of the locked shared client")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Test the Gemini File API upload registry offline (LocalFileAPI stand-in)
+
+1. Same content twice -> one upload, second scan reuses it
+2. Different page slice of the same PDF -> separate upload
+3. Upload deleted remotely -> uploaded again
+4. Registry expiry -> re-upload, cleanup deletes the expired remote file
+5. Orphan cleanup -> removes uploads not in the registry once older than the
+   TTL (leaked by older scans), keeps recent ones (another host's registry)
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from gemini_files import GeminiFileRegistry, LocalFileAPI
+
+failures = []
+
+def check(label, condition):
+    print(f"  [{'OK' if condition else 'FAIL'}] {label}")
+    if not condition:
+        failures.append(label)
+
+print("=" * 70)
+print("GEMINI FILE REGISTRY TEST (offline)")
+print("=" * 70)
+
+api = LocalFileAPI()
+registry_path = os.path.join(tempfile.mkdtemp(), "registry.json")
+registry = GeminiFileRegistry(path=registry_path, api=api, ttl=3600)
+
+pdf = b"%PDF-1.7 report bytes" * 1000
+slice_a = b"%PDF-1.7 pages 12-15"
+slice_b = b"%PDF-1.7 pages 30-31"
+
+print("\n1. Rescan of the same report")
+first = registry.get_or_upload(slice_a, key=registry.content_key(pdf, "12-15"), display_name="WP29-190")
+second = registry.get_or_upload(slice_a, key=registry.content_key(pdf, "12-15"), display_name="WP29-190")
+check("one upload for two scans", api.uploads == 1)
+check("same remote file returned", first.name == second.name)
+
+print("\n2. Other pages of the same report")
+other = registry.get_or_upload(slice_b, key=registry.content_key(pdf, "30-31"))
+check("separate upload", api.uploads == 2 and other.name != first.name)
+
+print("\n3. Upload deleted remotely")
+api.delete_file(first.name)
+again = registry.get_or_upload(slice_a, key=registry.content_key(pdf, "12-15"))
+check("uploaded again", api.uploads == 3 and again.name != first.name)
+
+print("\n4. Expiry and cleanup")
+short = GeminiFileRegistry(path=registry_path, api=api, ttl=0.05)
+expiring = short.get_or_upload(b"%PDF-1.7 short lived")
+time.sleep(0.1)
+result = short.cleanup()
+check("expired entry dropped", result["dropped"] == 1 and len(short.entries()) == 2)
+check("expired remote file deleted", expiring.name not in api.files)
+registry.get_or_upload(slice_b, key=registry.content_key(pdf, "30-31"))
+check("live entries still reused", api.uploads == 4)
+
+print("\n5. Orphans")
+leaked_path = os.path.join(tempfile.mkdtemp(), "leaked.pdf")
+with open(leaked_path, "wb") as f:
+    f.write(b"%PDF-1.7 leaked")
+leaked = api.upload_file(path=leaked_path, display_name="leaked")
+leaked.create_time -= timedelta(hours=2)  # older than the registry TTL (1h)
+other_host = api.upload_file(path=leaked_path, display_name="other host")
+result = registry.cleanup(orphans=True)
+check("old leaked upload deleted", leaked.name not in api.files and result["deleted"] == 1)
+check("recent unknown upload kept", other_host.name in api.files)
+check("registered uploads kept", len(api.list_files()) == 3)
+
+result = registry.cleanup(delete_all=True)
+check("delete_all removes every registered upload", result["deleted"] == 2 and not registry.entries()
+      and [f.name for f in api.list_files()] == [other_host.name])
+
+print(f"\nUploads: {api.uploads}, deletes: {api.deletes}, registry hits: {registry.hits}")
+print(f"\n{'='*70}")
+if failures:
+    print(f"❌ FAILED: {', '.join(failures)}")
+    sys.exit(1)
+print("✅ Registry reuses uploads by content hash and cleans up expired/leaked files")
@@ -0,0 +1,202 @@
+"""
+Test the storage / database reconciler offline (in-memory streams)
+
+1. Merge-diff matches a set difference, with duplicate references
+2. Unsorted stream -> error instead of false orphans
+3. Keyset paging over pages of an in-memory table
+4. Full run: orphans reported and deleted in batches, recent uploads and
+   missing files only reported, nothing deleted when no reference matches,
+   when one reference table matches nothing, or without the service key
+5. One million objects diffed in constant memory
+"""
+import heapq
+import itertools
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+from reconciler import Reconciler
+
+# Deleting needs the service role; nothing here talks to Supabase
+service_key = Config.SUPABASE_SERVICE_KEY
+Config.SUPABASE_SERVICE_KEY = service_key or "offline-test"
+
+failures = []
+
+def check(label, condition):
+    print(f"  [{'OK' if condition else 'FAIL'}] {label}")
+    if not condition:
+        failures.append(label)
+
+
+class MemoryReconciler(Reconciler):
+    """Reconciler on in-memory buckets and tables"""
+
+    def __init__(self, buckets, references, chunks, embeddings, sources, **kwargs):
+        super().__init__(page_size=7, batch_size=3, **kwargs)
+        self.buckets = buckets          # bucket -> {path: object}
+        self.references = references    # source table -> archive paths (unsorted, duplicates)
+        self.chunks = chunks            # embeddings.content_path
+        self.embeddings = embeddings    # source_type -> source ids (duplicates)
+        self.sources = sources          # table -> ids
+        self.batches = []
+
+    def _page(self, values, after, limit):
+        return [v for v in sorted(values) if after is None or v > after][:limit]
+
+    def storage_objects(self, bucket):
+        objects = self.buckets[bucket]
+        for path in self.keyset(lambda after, limit: self._page(objects, after, limit), lambda v: v, self.page_size):
+            yield path, objects[path]
+
+    def archive_references(self):
+        return heapq.merge(*(
+            zip(self.keyset(lambda after, limit, paths=paths: self._page(paths, after, limit), lambda v: v, self.page_size),
+                itertools.repeat(source))
+            for source, paths in self.references.items()
+        ))
+
+    def chunk_references(self):
+        return self.keyset(lambda after, limit: self._page(self.chunks, after, limit), lambda v: v, self.page_size)
+
+    def embedding_sources(self, source_type):
+        ids = set(self.embeddings.get(source_type, []))
+        return self.keyset(lambda after, limit: self._page(ids, after, limit), lambda v: v, self.page_size)
+
+    def source_ids(self, table):
+        ids = self.sources.get(table, [])
+        return self.keyset(lambda after, limit: self._page(ids, after, limit), lambda v: v, self.page_size)
+
+    def _delete_objects(self, bucket, paths):
+        self.batches.append((bucket, paths))
+        for path in paths:
+            self.buckets[bucket].pop(path, None)
+        return len(paths), []
+
+    def _delete_embeddings(self, source_type, source_ids):
+        self.batches.append((source_type, source_ids))
+        self.embeddings[source_type] = [i for i in self.embeddings[source_type] if i not in source_ids]
+        return len(source_ids), []
+
+
+print("=" * 70)
+print("RECONCILER TEST (offline)")
+print("=" * 70)
+
+print("\n1. Merge-diff")
+random.seed(7)
+objects = sorted({f"GR{random.choice('BEFS')}/{random.randint(2020, 2025)}/{random.randint(1, 999)}.pdf" for _ in range(2000)})
+referenced = random.sample(objects, 1200) + [f"GRE/2019/{n}.pdf" for n in range(30)]
+result = list(Reconciler.merge_diff(((p, None) for p in objects), iter(sorted(referenced + referenced[:100]))))
+orphans = {key for status, key, _ in result if status == "orphan"}
+missing = {key for status, key, _ in result if status == "missing"}
+check("orphans = objects - references", orphans == set(objects) - set(referenced))
+check("missing = references - objects", missing == set(referenced) - set(objects))
+check("duplicate references matched once", sum(1 for s, _, _ in result if s == "matched") == 1200)
+
+print("\n2. Unsorted stream")
+try:
+    list(Reconciler.merge_diff(iter([("b", None), ("a", None)]), iter(["a"])))
+    check("out-of-order key raises", False)
+except ValueError:
+    check("out-of-order key raises", True)
+
+print("\n3. Keyset paging")
+table = [f"{n:05d}" for n in range(1000)]
+calls = []
+def fetch(after, limit):
+    calls.append(after)
+    return [v for v in table if after is None or v > after][:limit]
+check("all rows in order", list(Reconciler.keyset(fetch, lambda v: v, 300)) == table)
+check("4 pages", len(calls) == 4)
+
+print("\n4. Full run")
+old = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+new = datetime.now(timezone.utc).isoformat()
+doc_ids = [f"{n:08x}-0000-0000-0000-000000000000" for n in range(1, 11)]
+gone_ids = [f"{n:08x}-0000-0000-0000-000000000000" for n in range(11, 15)]
+archive = {f"GRE/2025/93/GRE-93-{n}.pdf": {"created_at": old, "size": 1000} for n in range(20)}
+archive["GRE/2025/93/GRE-93-upload.pdf"] = {"created_at": new, "size": 1000}
+archive["GRE/2025/93/.emptyFolderPlaceholder"] = {"created_at": old, "size": 0}
+chunks = {f"{i}/chunk_{c}.json": {"created_at": old} for i in doc_ids + gone_ids for c in range(2)}
+reconciler = MemoryReconciler(
+    buckets={"unece-archive": archive, "chunks_cache": chunks},
+    references={
+        "documents": [f"GRE/2025/93/GRE-93-{n}.pdf" for n in range(10)] + ["GRE/2025/93/GRE-93-5.pdf", "GRE/2025/93/lost.pdf"],
+        "interpretations": ["GRE/2025/93/GRE-93-10.pdf", "GRE/2025/93/GRE-93-11.pdf", "GRE/2025/93/GRE-93-5.pdf"],
+    },
+    chunks=[f"{i}/chunk_{c}.json" for i in doc_ids + gone_ids for c in range(2)],
+    embeddings={"document": doc_ids + gone_ids + doc_ids},
+    sources={"documents": doc_ids},
+    delete=True
+)
+# Deleting the orphan embeddings must also drop their content_path references
+original = reconciler._delete_embeddings
+def delete_embeddings(source_type, source_ids):
+    reconciler.chunks = [p for p in reconciler.chunks if p.split("/")[0] not in source_ids]
+    return original(source_type, source_ids)
+reconciler._delete_embeddings = delete_embeddings
+
+findings = []
+reconciler.on_finding = findings.append
+counts = reconciler.run()
+check("8 archive orphans deleted", counts["archive"]["orphan"] == 8 and counts["archive"]["deleted"] == 8)
+check("recent upload kept", "GRE/2025/93/GRE-93-upload.pdf" in archive and counts["archive"]["recent"] == 1)
+check("folder placeholder ignored", "GRE/2025/93/.emptyFolderPlaceholder" in archive)
+check("missing PDF reported", [f["key"] for f in findings if f["kind"] == "missing"] == ["GRE/2025/93/lost.pdf"])
+check("4 orphan embeddings deleted", counts["embeddings"]["deleted"] == 4)
+check("their 8 chunk JSONs deleted in the same run", counts["chunks"]["deleted"] == 8 and len(chunks) == 20)
+check("deletion batches of at most 3", all(len(batch) <= 3 for _, batch in reconciler.batches))
+
+empty = MemoryReconciler(buckets={"unece-archive": {f"a/{n}.pdf": {"created_at": old} for n in range(10)}},
+                         references={}, chunks=[], embeddings={}, sources={}, delete=True)
+try:
+    empty.run(["archive"])
+    check("no reference at all -> refuses to delete", False)
+except RuntimeError:
+    check("no reference at all -> refuses to delete", len(empty.buckets["unece-archive"]) == 10)
+
+# Interpretations stored with another bucket in their URLs: none of their paths match
+one_source = MemoryReconciler(
+    buckets={"unece-archive": {f"a/{n}.pdf": {"created_at": old} for n in range(10)}},
+    references={"documents": ["a/0.pdf", "a/1.pdf"], "interpretations": ["old-archive/a/5.pdf", "old-archive/a/6.pdf"]},
+    chunks=[], embeddings={}, sources={}, delete=True
+)
+check("unmatched source detected", one_source.unmatched_archive_sources() == ["interpretations"])
+try:
+    one_source.run(["archive"])
+    check("one table matching nothing -> refuses to delete", False)
+except RuntimeError:
+    check("one table matching nothing -> refuses to delete", len(one_source.buckets["unece-archive"]) == 10)
+
+Config.SUPABASE_SERVICE_KEY = None
+try:
+    MemoryReconciler(buckets={}, references={}, chunks=[], embeddings={}, sources={}, delete=True)
+    check("no service key -> delete refused", False)
+except RuntimeError:
+    check("no service key -> delete refused", True)
+Config.SUPABASE_SERVICE_KEY = service_key or "offline-test"
+
+print("\n5. One million objects")
+def objects_stream(n):
+    for i in range(n):
+        yield f"chunks/{i:09d}/chunk_0.json", None
+def references_stream(n):
+    for i in range(n):
+        if i % 10:
+            yield f"chunks/{i:09d}/chunk_0.json"
+tracemalloc.start()
+orphan_count = sum(1 for status, _, _ in Reconciler.merge_diff(objects_stream(1_000_000), references_stream(1_000_000))
+                   if status == "orphan")
+_, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+check("100,000 orphans found", orphan_count == 100_000)
+check(f"peak memory {peak / 1024:.0f} KB (< 1 MB)", peak < 1024 * 1024)
+
+print(f"\n{'='*70}")
+if failures:
+    print(f"❌ FAILED: {', '.join(failures)}")
+    sys.exit(1)
+print("✅ Reconciler diffs sorted streams in constant memory and deletes orphans safely")